@@ -0,0 +1,41 @@
+"""add_mood_aggregates
+
+Revision ID: 5c2e8a9d4f17
+Revises: bfa5f73d8589
+Create Date: 2026-10-18 10:12:41.508311
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8a9d4f17'
+down_revision = 'bfa5f73d8589'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('mood_aggregates',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('entry_count', sa.Integer(), nullable=False),
+    sa.Column('mood_sum', sa.Integer(), nullable=False),
+    sa.Column('level_1_count', sa.Integer(), nullable=False),
+    sa.Column('level_2_count', sa.Integer(), nullable=False),
+    sa.Column('level_3_count', sa.Integer(), nullable=False),
+    sa.Column('level_4_count', sa.Integer(), nullable=False),
+    sa.Column('level_5_count', sa.Integer(), nullable=False),
+    sa.Column('last_logged_date', sa.Date(), nullable=True),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('daily_buckets', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    # Rows are filled lazily on first /mood/stats or new log; run
+    # `python -m scripts.rebuild_mood_stats` to backfill everyone up front.
+
+
+def downgrade() -> None:
+    op.drop_table('mood_aggregates')
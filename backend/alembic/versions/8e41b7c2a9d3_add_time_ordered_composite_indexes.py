@@ -0,0 +1,43 @@
+"""add_time_ordered_composite_indexes
+
+Revision ID: 8e41b7c2a9d3
+Revises: 5c2e8a9d4f17
+Create Date: 2026-10-18 11:02:17.334920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e41b7c2a9d3'
+down_revision = '5c2e8a9d4f17'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns) for every per-user / per-group feed that is
+# filtered on one column and read newest first.
+INDEXES = [
+    ('ix_mood_logs_user_id_created_at', 'mood_logs', ['user_id', sa.text('created_at DESC')]),
+    ('ix_chat_messages_user_id_created_at', 'chat_messages', ['user_id', sa.text('created_at DESC')]),
+    ('ix_exercises_completed_user_id_completed_at', 'exercises_completed', ['user_id', sa.text('completed_at DESC')]),
+    ('ix_community_posts_group_id_created_at', 'community_posts', ['group_id', sa.text('created_at DESC')]),
+    ('ix_community_posts_created_at', 'community_posts', [sa.text('created_at DESC')]),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY avoids blocking writes on large tables, but cannot run inside
+    # a transaction, hence the autocommit block.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,54 @@
+"""add_id_tiebreaker_to_feed_indexes
+
+Revision ID: a7f3c91e5b20
+Revises: 8e41b7c2a9d3
+Create Date: 2026-10-18 12:26:05.117482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7f3c91e5b20'
+down_revision = '8e41b7c2a9d3'
+branch_labels = None
+depends_on = None
+
+# Keyset pagination orders by (timestamp DESC, id DESC), so the feed indexes
+# need id as a trailing column to serve both the ORDER BY and the cursor
+# comparison. (old name, new name, table, new columns)
+INDEXES = [
+    ('ix_mood_logs_user_id_created_at', 'ix_mood_logs_user_id_created_at_id', 'mood_logs',
+     ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    ('ix_chat_messages_user_id_created_at', 'ix_chat_messages_user_id_created_at_id', 'chat_messages',
+     ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    ('ix_exercises_completed_user_id_completed_at', 'ix_exercises_completed_user_id_completed_at_id', 'exercises_completed',
+     ['user_id', sa.text('completed_at DESC'), sa.text('id DESC')]),
+    ('ix_community_posts_group_id_created_at', 'ix_community_posts_group_id_created_at_id', 'community_posts',
+     ['group_id', sa.text('created_at DESC'), sa.text('id DESC')]),
+    ('ix_community_posts_created_at', 'ix_community_posts_created_at_id', 'community_posts',
+     [sa.text('created_at DESC'), sa.text('id DESC')]),
+]
+
+
+def upgrade() -> None:
+    # Build the replacement before dropping the old index so reads never lose
+    # index coverage.
+    with op.get_context().autocommit_block():
+        for old_name, new_name, table, columns in INDEXES:
+            op.create_index(
+                new_name, table, columns, unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(old_name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for old_name, new_name, table, columns in reversed(INDEXES):
+            op.create_index(
+                old_name, table, columns[:-1], unique=False,
+                postgresql_concurrently=True, if_not_exists=True,
+            )
+            op.drop_index(new_name, table_name=table, postgresql_concurrently=True, if_exists=True)
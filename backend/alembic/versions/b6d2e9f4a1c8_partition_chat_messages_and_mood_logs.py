@@ -0,0 +1,126 @@
+"""partition_chat_messages_and_mood_logs
+
+Revision ID: b6d2e9f4a1c8
+Revises: f3a9c2d7e6b1
+Create Date: 2026-10-18 17:20:41.503218
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2e9f4a1c8'
+down_revision = 'f3a9c2d7e6b1'
+branch_labels = None
+depends_on = None
+
+# Rebuilds chat_messages and mood_logs as tables partitioned by month on
+# created_at (UTC months, named <table>_yYYYYmMM) plus a DEFAULT partition for
+# rows outside every month, e.g. backfills into an archived month. Rows are
+# copied, so the tables are locked for the duration: run in a maintenance
+# window. `python -m scripts.manage_partitions` keeps future months created
+# and archives old ones afterwards.
+#
+# A partitioned table's primary key must contain the partition key, so it
+# becomes (id, created_at) and created_at becomes NOT NULL. ids keep coming
+# from the existing sequence and stay unique.
+MONTHS_AHEAD = 3
+
+# table -> columns other than id and created_at
+TABLES = {
+    'chat_messages': lambda: [
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('content', sa.Text(), nullable=True),
+    ],
+    'mood_logs': lambda: [
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('mood_level', sa.Integer(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+    ],
+}
+COLUMNS = {
+    'chat_messages': 'id, user_id, role, content, created_at',
+    'mood_logs': 'id, user_id, mood_level, notes, created_at',
+}
+
+CREATE_MONTHS = """
+DO $$
+DECLARE
+    month timestamp := date_trunc('month', coalesce((SELECT min(created_at) FROM {source}), now()) AT TIME ZONE 'UTC');
+    last_month timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{ahead} months';
+BEGIN
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF {table} FOR VALUES FROM (%L) TO (%L)',
+            '{table}_' || to_char(month, '"y"YYYY"m"MM'),
+            month AT TIME ZONE 'UTC',
+            (month + interval '1 month') AT TIME ZONE 'UTC'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END $$
+"""
+
+
+def _create_indexes(table: str) -> None:
+    op.create_index(op.f(f'ix_{table}_id'), table, ['id'], unique=False)
+    op.create_index(f'ix_{table}_user_id_created_at_id', table,
+                    ['user_id', sa.text('created_at DESC'), sa.text('id DESC')], unique=False)
+
+
+def _drop_indexes(table: str) -> None:
+    op.drop_index(f'ix_{table}_user_id_created_at_id', table_name=table)
+    op.drop_index(op.f(f'ix_{table}_id'), table_name=table)
+
+
+def upgrade() -> None:
+    for table, columns in TABLES.items():
+        old = f'{table}_unpartitioned'
+        _drop_indexes(table)
+        op.rename_table(table, old)
+        op.execute(f'ALTER INDEX {table}_pkey RENAME TO {old}_pkey')
+
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{table}_id_seq'::regclass)"), nullable=False),
+        *columns(),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id', 'created_at'),
+        postgresql_partition_by='RANGE (created_at)'
+        )
+        op.execute(CREATE_MONTHS.format(table=table, source=old, ahead=MONTHS_AHEAD))
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+
+        columns_sql = COLUMNS[table]
+        op.execute(
+            f'INSERT INTO {table} ({columns_sql}) '
+            f"SELECT {columns_sql.replace('created_at', 'coalesce(created_at, now())')} FROM {old}"
+        )
+        op.drop_table(old)
+        # Built after the copy; creating them on the parent creates them on every partition.
+        _create_indexes(table)
+
+
+def downgrade() -> None:
+    # Only rows in attached partitions come back; archived months stay in their files.
+    for table, columns in TABLES.items():
+        old = f'{table}_partitioned'
+        _drop_indexes(table)
+        op.rename_table(table, old)
+        op.execute(f'ALTER INDEX {table}_pkey RENAME TO {old}_pkey')
+
+        op.create_table(table,
+        sa.Column('id', sa.Integer(), server_default=sa.text(f"nextval('{table}_id_seq'::regclass)"), nullable=False),
+        *columns(),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+        op.execute(f'ALTER SEQUENCE {table}_id_seq OWNED BY {table}.id')
+        columns_sql = COLUMNS[table]
+        op.execute(f'INSERT INTO {table} ({columns_sql}) SELECT {columns_sql} FROM {old}')
+        op.drop_table(old)
+        _create_indexes(table)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from app.api import deps
 from app.api.endpoints import auth, users, mood, chat, exercises, community
 
+# Per user (or per client address when signed out), see app/core/rate_limit.py.
+limited = [Depends(deps.enforce_rate_limit)]
+
 api_router = APIRouter()
-api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
-api_router.include_router(mood.router, prefix="/mood", tags=["mood"])
-api_router.include_router(chat.router, prefix="/chat", tags=["chat"])
-api_router.include_router(exercises.router, prefix="/exercises", tags=["exercises"])
-api_router.include_router(community.router, prefix="/community", tags=["community"])
+api_router.include_router(auth.router, prefix="/auth", tags=["auth"], dependencies=limited)
+api_router.include_router(users.router, prefix="/users", tags=["users"], dependencies=limited)
+api_router.include_router(mood.router, prefix="/mood", tags=["mood"], dependencies=limited)
+api_router.include_router(chat.router, prefix="/chat", tags=["chat"], dependencies=limited)
+api_router.include_router(exercises.router, prefix="/exercises", tags=["exercises"], dependencies=limited)
+api_router.include_router(community.router, prefix="/community", tags=["community"], dependencies=limited)
@@ -0,0 +1,30 @@
+"""Shared rules for the bulk ingestion endpoints (`POST /mood/batch`, `/exercises/batch`).
+
+Offline-first clients queue entries while disconnected and upload them in one
+request, each with the time it was logged on the device. Entries without a
+time are stamped with the upload time.
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Sequence
+from fastapi import HTTPException
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+# Device clocks drift; entries this far ahead of the server clock are accepted.
+BATCH_CLOCK_SKEW = timedelta(minutes=5)
+
+def check_size(items: Sequence) -> None:
+    if not items:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_ITEMS} entries per batch")
+
+def entry_time(logged_at: Optional[datetime], now: datetime) -> datetime:
+    """Client timestamp as aware UTC (naive means UTC), or `now` if absent."""
+    if logged_at is None:
+        return now
+    if logged_at.tzinfo is None:
+        logged_at = logged_at.replace(tzinfo=timezone.utc)
+    if logged_at > now + BATCH_CLOCK_SKEW:
+        raise HTTPException(status_code=422, detail="Entry timestamp is in the future")
+    return logged_at.astimezone(timezone.utc)
@@ -1,40 +1,81 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.core import security
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import rate_limit, tokens
 from app.core.database import get_db
+from app.middleware.metrics import route_template
 from app.models import User
-from app.schemas import TokenData
-import os
-from dotenv import load_dotenv
+from app.schemas import Identity, TokenData
+from app.services import user_cache
 
-load_dotenv()
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-SECRET_KEY = os.getenv("SECRET_KEY", "secret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
+# Only the columns Identity carries; the password hash and onboarding JSON stay in the database.
+IDENTITY_COLUMNS = [getattr(User, name) for name in Identity.model_fields]
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+async def load_token_user(db: AsyncSession, token_data: TokenData) -> Optional[Identity]:
+    """The identity a verified token refers to, or None if the user is gone.
+
+    Served from `user_cache` when possible; on a miss the identity columns are
+    read by the `uid` claim (primary key) or, for older tokens, by email, and
+    cached.
+    """
+    cached = await user_cache.get(token_data.email)
+    if cached is not None:
+        return cached
+
+    query = select(*IDENTITY_COLUMNS).where(User.email == token_data.email)
+    if token_data.user_id is not None:
+        query = query.where(User.id == token_data.user_id)
+    user = (await db.execute(query)).first()
+    if user is None:
+        return None
+    return await user_cache.set(user)
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> User:
+async def get_current_user(
+    db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)
+) -> Identity:
+    """Resolve the bearer token to the user's identity.
+
+    The result is a `schemas.Identity` snapshot, not an ORM row: endpoints that
+    need other columns (e.g. `onboarding_data`) or modify the user must load
+    them from their session.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
-    except JWTError:
+        payload = tokens.decode_token(token)
+    except tokens.InvalidTokenError:
         raise credentials_exception
-    
-    user = db.query(User).filter(User.email == token_data.email).first()
+    user = await load_token_user(db, TokenData(email=payload["sub"], user_id=payload.get("uid")))
     if user is None:
         raise credentials_exception
     return user
+
+def _rate_limit_subject(request: Request) -> str:
+    """Who a call counts against: the token's user if it carries a valid one, else the client address.
+
+    Only the signature is checked (no database or cache lookup); the endpoint
+    still authenticates the call as usual.
+    """
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    if scheme.lower() == "bearer" and token:
+        try:
+            payload = tokens.decode_token(token)
+            return f"user:{payload.get('uid') or payload['sub']}"
+        except tokens.InvalidTokenError:
+            pass
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+async def enforce_rate_limit(request: Request) -> None:
+    """Router dependency: 429 with Retry-After once the caller exceeds their limits."""
+    route = f"{request.method} {route_template(request.scope)}"
+    refused = await rate_limit.check(_rate_limit_subject(request), route)
+    if refused is not None:
+        raise rate_limit.too_many_requests(refused)
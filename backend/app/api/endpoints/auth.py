@@ -1,43 +1,77 @@
-from datetime import timedelta
+import asyncio
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.core import security
+from sqlalchemy import select
+from sqlalchemy.orm import undefer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import deps
+from app.core import security, tokens
 from app.core.database import get_db
 from app.models import User
-from app.schemas import Token, UserCreate, User as UserSchema
+from app.schemas import Token, TokenData, TokenRefresh, UserCreate, User as UserSchema
+from app.services import user_cache
 
 router = APIRouter()
 
+def _issue_tokens(email: str, user_id: int) -> dict:
+    return {
+        "access_token": tokens.create_access_token(email, user_id=user_id),
+        "token_type": "bearer",
+        "refresh_token": tokens.create_refresh_token(email, user_id=user_id),
+    }
+
 @router.get("/test")
 def test_endpoint():
     return {"message": "Auth router is working"}
 
 @router.post("/login", response_model=Token)
-def login_access_token(
-    db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_access_token(
+    db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    result = await db.execute(select(User).where(User.email == form_data.username))
+    user = result.scalars().first()
+    if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+    try:
+        verified, new_hash = await security.verify_password_async(form_data.password, user.hashed_password)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Too many sign-ins right now, please retry", headers={"Retry-After": "1"})
+    if not verified:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    if new_hash:
+        # Stored with outdated Argon2 parameters; upgrade it while we have the password.
+        user.hashed_password = new_hash
+        await db.commit()
+        await db.refresh(user)
     
-    access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = security.create_access_token(
-        user.email, expires_delta=access_token_expires
-    )
-    refresh_token = security.create_refresh_token(user.email)
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "refresh_token": refresh_token
-    }
+    # Warm the identity cache so the client's first authenticated call is a hit.
+    await user_cache.set(user)
+    return _issue_tokens(user.email, user.id)
+
+@router.post("/refresh", response_model=Token)
+async def refresh_access_token(
+    body: TokenRefresh,
+    db: AsyncSession = Depends(get_db),
+) -> Any:
+    """Exchange a refresh token for a new token pair, without the password."""
+    try:
+        payload = tokens.decode_token(body.refresh_token, token_type="refresh")
+    except tokens.InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = await deps.load_token_user(db, TokenData(email=payload["sub"], user_id=payload.get("uid")))
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    return _issue_tokens(user.email, user.id)
 
 @router.post("/register", response_model=UserSchema)
-def register_user(
+async def register_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
 ) -> Any:
     try:
@@ -46,8 +80,8 @@ def register_user(
         
         # Check if user exists
         print("Checking if user exists...")
-        user = db.query(User).filter(User.email == user_in.email).first()
-        if user:
+        existing = await db.scalar(select(User.id).where(User.email == user_in.email))
+        if existing is not None:
             print(f"User already exists: {user_in.email}")
             raise HTTPException(
                 status_code=400,
@@ -57,7 +91,10 @@ def register_user(
         
         # Hash password
         print(f"Hashing password of length: {len(user_in.password)}")
-        hashed_password = security.get_password_hash(user_in.password)
+        try:
+            hashed_password = await security.get_password_hash_async(user_in.password)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Too many sign-ups right now, please retry", headers={"Retry-After": "1"})
         print(f"Password hashed successfully")
         
         # Create user
@@ -73,9 +110,9 @@ def register_user(
         print("Adding user to database...")
         db.add(user)
         print("Committing...")
-        db.commit()
+        await db.commit()
         print("Refreshing...")
-        db.refresh(user)
+        user = await db.get(User, user.id, options=[undefer(User.onboarding_data)], populate_existing=True)
         print(f"User created successfully: {user.email}, ID: {user.id}")
         print(f"=== REGISTRATION SUCCESS ===\n")
         
@@ -1,60 +1,58 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Any, AsyncIterator, List, Optional, Tuple
+import json
+import math
+import anyio
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
+from app.api.pagination import MAX_PAGE_SIZE, paginate, page
+from app.api.serialization import ListSerializer, json_response
+from app.core import rate_limit
+from app.core.database import AsyncSessionLocal
 from app.models import ChatMessage, User
-from app.schemas import ChatMessage as ChatMessageSchema, ChatRequest
-from app.services import ai
+from app.schemas import ChatMessage as ChatMessageSchema, ChatRequest, Identity
+from app.services import ai, chat_context, prompts
 import traceback
 
 router = APIRouter()
 
-@router.post("/", response_model=ChatMessageSchema)
-def chat_with_neeva(
-    *,
-    db: Session = Depends(deps.get_db),
-    chat_request: ChatRequest,
-    current_user: User = Depends(deps.get_current_user),
-) -> Any:
-    try:
-        # 1. Save user message
-        user_msg = ChatMessage(
-            user_id=current_user.id,
-            role="user",
-            content=chat_request.message
-        )
-        db.add(user_msg)
-        db.commit()
-        
-        # 2. Get conversation history (last 10 messages)
-        history = (
-            db.query(ChatMessage)
-            .filter(ChatMessage.user_id == current_user.id)
-            .order_by(ChatMessage.created_at.desc())
-            .limit(10)
-            .all()
-        )
-        history.reverse() # Oldest first
-        
-        formatted_history = [{"role": msg.role, "content": msg.content} for msg in history]
-        
-        # 3. Get user's onboarding data for personalization
-        user_context = current_user.onboarding_data or {}
-        
-        # 4. Generate AI response with personalization
-        ai_response_text = ai.get_chat_response(formatted_history, user_context)
-        
-        # 5. Save AI response
+chat_messages_json = ListSerializer(ChatMessageSchema)
+
+async def _save_user_message_and_get_context(
+    db: AsyncSession, user_id: int, message: str
+) -> Tuple[int, chat_context.ConversationContext]:
+    # 1. Save user message
+    user_msg = ChatMessage(
+        user_id=user_id,
+        role="user",
+        content=message
+    )
+    db.add(user_msg)
+    await db.commit()
+    message_id = user_msg.id
+
+    # 2. Recent turns that fit the token budget, plus the summary of older ones
+    context = await chat_context.build_context(db, user_id)
+    # End the read transaction and hand the connection back to the pool: the
+    # LLM call that follows can take tens of seconds and needs no database.
+    await db.close()
+    return message_id, context
+
+async def _save_assistant_message(user_id: int, content: str) -> dict:
+    # The request-scoped session may already be closed once a stream finishes,
+    # so replies are persisted through a session of their own.
+    async with AsyncSessionLocal() as db:
         ai_msg = ChatMessage(
-            user_id=current_user.id,
+            user_id=user_id,
             role="assistant",
-            content=ai_response_text
+            content=content
         )
         db.add(ai_msg)
-        db.commit()
-        db.refresh(ai_msg)
-        
-        # Return as dict to avoid ORM issues
+        await db.commit()
+        await db.refresh(ai_msg)
         return {
             "id": ai_msg.id,
             "user_id": ai_msg.user_id,
@@ -62,24 +60,162 @@ def chat_with_neeva(
             "content": ai_msg.content,
             "created_at": ai_msg.created_at
         }
+
+async def _discard_user_message(user_id: int, message_id: int) -> None:
+    """Delete a user turn Neeva was not allowed to answer (429), so retrying does not repeat it."""
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(ChatMessage).where(ChatMessage.user_id == user_id, ChatMessage.id == message_id))
+        await db.commit()
+
+async def _system_prompt(db: AsyncSession, user: Identity) -> str:
+    """The user's chat system prompt, personalized with their onboarding answers.
+
+    The onboarding answers are only read when no prompt compiled at the
+    identity's `updated_at` is cached, i.e. once per user and profile change.
+    """
+    cached = prompts.cached_chat_system_prompt(user.id, user.updated_at)
+    if cached is not None:
+        return cached
+    onboarding_data = await db.scalar(select(User.onboarding_data).where(User.id == user.id)) or {}
+    return prompts.chat_system_prompt(onboarding_data, user.id, user.updated_at)
+
+def _sse_event(data: Any, event: str = None) -> str:
+    payload = json.dumps(jsonable_encoder(data))
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+@router.post("/", response_model=ChatMessageSchema)
+async def chat_with_neeva(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    user_id = current_user.id
+    # 3. Get user's personalized system prompt
+    system_prompt = await _system_prompt(db, current_user)
+    try:
+        message_id, context = await _save_user_message_and_get_context(
+            db, user_id, chat_request.message
+        )
+        if context.has_unsummarized_overflow:
+            background_tasks.add_task(chat_context.update_summary, user_id)
+
+        # 4. Generate AI response with personalization
+        ai_response_text = await ai.get_chat_response_async(
+            context.messages, system_prompt, conversation_summary=context.summary, user_id=user_id
+        )
+
+        # 5. Save AI response
+        return await _save_assistant_message(user_id, ai_response_text)
+    except rate_limit.RateLimited as e:
+        await _discard_user_message(user_id, message_id)
+        raise rate_limit.too_many_requests(e)
     except Exception as e:
         print(f"Chat endpoint error: {e}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/stream")
+async def stream_chat_with_neeva(
+    *,
+    request: Request,
+    db: AsyncSession = Depends(deps.get_db),
+    chat_request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    """Stream Neeva's reply as Server-Sent Events.
+
+    Tokens arrive as `data: {"token": ...}` events, followed by a `done` event
+    carrying the saved message (same shape as `POST /chat/`). On disconnect the
+    Groq stream is closed and the partial reply is still saved. If the LLM
+    scheduler turns the reply away, an `error` event carries `retry_after` and
+    the user's message is dropped from the history.
+    """
+    user_id = current_user.id
+    system_prompt = await _system_prompt(db, current_user)
+    try:
+        message_id, context = await _save_user_message_and_get_context(
+            db, user_id, chat_request.message
+        )
+    except Exception as e:
+        print(f"Chat stream endpoint error: {e}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=str(e))
+    if context.has_unsummarized_overflow:
+        background_tasks.add_task(chat_context.update_summary, user_id)
+
+    async def event_stream() -> AsyncIterator[str]:
+        tokens = ai.stream_chat_response(
+            context.messages, system_prompt, conversation_summary=context.summary, user_id=user_id
+        )
+        parts: List[str] = []
+        finished = False
+        refused = False
+        saved = None
+        try:
+            async for token in tokens:
+                parts.append(token)
+                yield _sse_event({"token": token})
+                if await request.is_disconnected():
+                    print(f"Chat stream client disconnected (user {user_id})")
+                    return
+            finished = True
+        except rate_limit.RateLimited as e:
+            refused = True
+            yield _sse_event(
+                {"detail": "Neeva is busy right now. Please try again shortly.", "retry_after": math.ceil(e.retry_after)},
+                event="error",
+            )
+        except Exception as e:
+            print(f"Chat stream error: {e}")
+            print(traceback.format_exc())
+            yield _sse_event({"detail": "The response was interrupted. Please try again."}, event="error")
+        finally:
+            # Shielded so the Groq stream is closed and the reply saved (or the
+            # refused turn dropped) even when the client disconnected and the
+            # response task is being cancelled.
+            with anyio.CancelScope(shield=True):
+                await tokens.aclose()
+                if parts:
+                    saved = await _save_assistant_message(user_id, "".join(parts))
+                elif refused:
+                    await _discard_user_message(user_id, message_id)
+
+        if finished and saved:
+            yield _sse_event(saved, event="done")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.get("/history", response_model=List[ChatMessageSchema])
-def get_chat_history(
-    db: Session = Depends(deps.get_db),
+async def get_chat_history(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
-    limit: int = 50,
-    current_user: User = Depends(deps.get_current_user),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    preview_length: Optional[int] = Query(None, ge=1),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    messages = (
-        db.query(ChatMessage)
-        .filter(ChatMessage.user_id == current_user.id)
-        .order_by(ChatMessage.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    """Chat messages, newest first.
+
+    With `preview_length`, each `content` is cut to that many characters by the
+    database, so list views do not transfer whole messages.
+    """
+    overrides = {}
+    if preview_length:
+        overrides["content"] = func.substr(ChatMessage.content, 1, preview_length)
+    result = await db.execute(
+        paginate(
+            select(*chat_messages_json.columns(ChatMessage, **overrides)).where(ChatMessage.user_id == current_user.id),
+            ChatMessage.created_at, ChatMessage.id, limit, skip=skip, before=before,
+        )
     )
-    return messages
+    return json_response(chat_messages_json.dump(page(result.all(), response, limit)), response)
@@ -1,41 +1,52 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.api import deps
-from app.models import CommunityPost, CommunityGroup, User
-from app.schemas import CommunityPost as PostSchema, CommunityPostCreate, CommunityGroup as GroupSchema
+from app.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, paginate, page
+from app.api.serialization import ListSerializer, json_response
+from app.models import CommunityPost, CommunityGroup, GroupMember, PostComment, PostLike
+from app.schemas import (
+    CommunityPost as PostSchema, CommunityPostCreate, CommunityGroup as GroupSchema, GroupMembership,
+    PostComment as CommentSchema, PostCommentCreate, PostLikeStatus, Identity,
+)
+from app.services import counters, feed_cache
 
 router = APIRouter()
 
+posts_json = ListSerializer(PostSchema)
+comments_json = ListSerializer(CommentSchema)
+
 @router.get("/groups", response_model=List[GroupSchema])
-def get_groups(
-    db: Session = Depends(deps.get_db),
+async def get_groups(
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
 ) -> Any:
-    groups = db.query(CommunityGroup).offset(skip).limit(limit).all()
-    return groups
+    result = await db.execute(select(CommunityGroup).offset(skip).limit(limit))
+    return result.scalars().all()
 
 @router.post("/groups", response_model=GroupSchema)
-def create_group(
+async def create_group(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     name: str,
     description: str,
-    current_user: User = Depends(deps.get_current_user), # Only admin should do this ideally
+    current_user: Identity = Depends(deps.get_current_user), # Only admin should do this ideally
 ) -> Any:
     group = CommunityGroup(name=name, description=description)
     db.add(group)
-    db.commit()
-    db.refresh(group)
+    await db.commit()
+    await db.refresh(group)
     return group
 
 @router.post("/posts", response_model=PostSchema)
-def create_post(
+async def create_post(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     post_in: CommunityPostCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
     post = CommunityPost(
         content=post_in.content,
@@ -44,20 +55,157 @@ def create_post(
         user_id=current_user.id,
     )
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    await db.commit()
+    await db.refresh(post)
+    await feed_cache.add_post(post)
     return post
 
 @router.get("/posts", response_model=List[PostSchema])
-def get_posts(
-    db: Session = Depends(deps.get_db),
+async def get_posts(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
     group_id: int = None,
     skip: int = 0,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
 ) -> Any:
-    query = db.query(CommunityPost)
+    if not skip and not before and 0 < limit <= feed_cache.FEED_CACHE_POSTS:
+        # First pages are served pre-serialized from the feed cache.
+        body, next_cursor = await feed_cache.first_page(db, group_id, limit)
+        headers = {"ETag": feed_cache.etag(body), "Cache-Control": "no-cache"}
+        if next_cursor:
+            headers[NEXT_CURSOR_HEADER] = next_cursor
+        if if_none_match and headers["ETag"] in (tag.strip() for tag in if_none_match.split(",")):
+            return Response(status_code=304, headers=headers)
+        return Response(body, media_type="application/json", headers=headers)
+
+    query = select(*posts_json.columns(CommunityPost))
     if group_id:
-        query = query.filter(CommunityPost.group_id == group_id)
+        query = query.where(CommunityPost.group_id == group_id)
     
-    posts = query.order_by(CommunityPost.created_at.desc()).offset(skip).limit(limit).all()
-    return posts
+    result = await db.execute(
+        paginate(query, CommunityPost.created_at, CommunityPost.id, limit, skip=skip, before=before)
+    )
+    return json_response(posts_json.dump(page(result.all(), response, limit)), response)
+
+async def _insert_once(db: AsyncSession, row) -> bool:
+    """Insert a row keyed by (target, user); False if it already exists."""
+    try:
+        async with db.begin_nested():
+            db.add(row)
+        return True
+    except IntegrityError:
+        return False
+
+async def _get_post(db: AsyncSession, post_id: int) -> CommunityPost:
+    post = await db.get(CommunityPost, post_id)
+    if post is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return post
+
+async def _get_group(db: AsyncSession, group_id: int) -> CommunityGroup:
+    group = await db.get(CommunityGroup, group_id)
+    if group is None:
+        raise HTTPException(status_code=404, detail="Group not found")
+    return group
+
+# Counter columns are maintained by app.services.counters, never updated here,
+# so concurrent likes on one post do not queue on its row lock.
+
+@router.post("/posts/{post_id}/like", response_model=PostLikeStatus)
+async def like_post(
+    post_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    post = await _get_post(db, post_id)
+    added = await _insert_once(db, PostLike(post_id=post_id, user_id=current_user.id))
+    await db.commit()
+    if added:
+        counters.buffer.add("likes", post_id, 1)
+    likes = (post.likes_count or 0) + counters.buffer.pending("likes", post_id)
+    return {"post_id": post_id, "liked": True, "likes_count": likes}
+
+@router.delete("/posts/{post_id}/like", response_model=PostLikeStatus)
+async def unlike_post(
+    post_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    post = await _get_post(db, post_id)
+    result = await db.execute(
+        delete(PostLike).where(PostLike.post_id == post_id, PostLike.user_id == current_user.id)
+    )
+    await db.commit()
+    if result.rowcount:
+        counters.buffer.add("likes", post_id, -1)
+    likes = (post.likes_count or 0) + counters.buffer.pending("likes", post_id)
+    return {"post_id": post_id, "liked": False, "likes_count": likes}
+
+@router.post("/posts/{post_id}/comments", response_model=CommentSchema)
+async def create_comment(
+    post_id: int,
+    comment_in: PostCommentCreate,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    await _get_post(db, post_id)
+    comment = PostComment(
+        post_id=post_id,
+        user_id=current_user.id,
+        content=comment_in.content,
+        is_anonymous=comment_in.is_anonymous,
+    )
+    db.add(comment)
+    await db.commit()
+    await db.refresh(comment)
+    counters.buffer.add("comments", post_id, 1)
+    return comment
+
+@router.get("/posts/{post_id}/comments", response_model=List[CommentSchema])
+async def get_comments(
+    post_id: int,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+) -> Any:
+    result = await db.execute(
+        paginate(
+            select(*comments_json.columns(PostComment)).where(PostComment.post_id == post_id),
+            PostComment.created_at, PostComment.id, limit, skip=skip, before=before,
+        )
+    )
+    return json_response(comments_json.dump(page(result.all(), response, limit)), response)
+
+@router.post("/groups/{group_id}/join", response_model=GroupMembership)
+async def join_group(
+    group_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    group = await _get_group(db, group_id)
+    added = await _insert_once(db, GroupMember(group_id=group_id, user_id=current_user.id))
+    await db.commit()
+    if added:
+        counters.buffer.add("members", group_id, 1)
+    members = (group.member_count or 0) + counters.buffer.pending("members", group_id)
+    return {"group_id": group_id, "is_member": True, "member_count": members}
+
+@router.delete("/groups/{group_id}/join", response_model=GroupMembership)
+async def leave_group(
+    group_id: int,
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    group = await _get_group(db, group_id)
+    result = await db.execute(
+        delete(GroupMember).where(GroupMember.group_id == group_id, GroupMember.user_id == current_user.id)
+    )
+    await db.commit()
+    if result.rowcount:
+        counters.buffer.add("members", group_id, -1)
+    members = (group.member_count or 0) + counters.buffer.pending("members", group_id)
+    return {"group_id": group_id, "is_member": False, "member_count": members}
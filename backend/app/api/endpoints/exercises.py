@@ -1,59 +1,94 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.api import deps
-from app.models import ExerciseCompleted, User
-from app.schemas import ExerciseCompleted as ExerciseSchema, ExerciseCompletedCreate, ExerciseStats
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import batch, deps
+from app.api.pagination import MAX_PAGE_SIZE, paginate, page
+from app.api.serialization import ListSerializer, json_response
+from app.models import ExerciseCompleted
+from app.schemas import (
+    ExerciseCompleted as ExerciseSchema, ExerciseCompletedBatchItem, ExerciseCompletedCreate, ExerciseStats,
+    Identity,
+)
+from app.services import stats
 
 router = APIRouter()
 
+exercises_json = ListSerializer(ExerciseSchema)
+
 @router.post("/", response_model=ExerciseSchema)
-def complete_exercise(
+async def complete_exercise(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     exercise_in: ExerciseCompletedCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    exercise = ExerciseCompleted(
-        exercise_id=exercise_in.exercise_id,
-        duration_completed=exercise_in.duration_completed,
-        user_id=current_user.id,
+    exercise = await db.scalar(
+        insert(ExerciseCompleted)
+        .values(
+            exercise_id=exercise_in.exercise_id,
+            duration_completed=exercise_in.duration_completed,
+            user_id=current_user.id,
+        )
+        .returning(ExerciseCompleted)
     )
-    db.add(exercise)
-    db.commit()
-    db.refresh(exercise)
+    await db.commit()
     return exercise
 
+@router.post("/batch", response_model=List[ExerciseSchema])
+async def complete_exercises_batch(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    entries: List[ExerciseCompletedBatchItem],
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    """Store exercises completed offline, in one INSERT ... RETURNING."""
+    batch.check_size(entries)
+    now = datetime.now(timezone.utc)
+    result = await db.scalars(
+        insert(ExerciseCompleted).returning(ExerciseCompleted, sort_by_parameter_order=True),
+        [
+            {
+                "user_id": current_user.id,
+                "exercise_id": entry.exercise_id,
+                "duration_completed": entry.duration_completed,
+                "completed_at": batch.entry_time(entry.completed_at, now),
+            }
+            for entry in entries
+        ],
+    )
+    exercises = result.all()
+    await db.commit()
+    return exercises
+
 @router.get("/stats", response_model=ExerciseStats)
-def get_exercise_stats(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+async def get_exercise_stats(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    total_seconds = db.query(func.sum(ExerciseCompleted.duration_completed)).filter(ExerciseCompleted.user_id == current_user.id).scalar() or 0
-    total_minutes = int(total_seconds / 60)
-    
-    sessions_completed = db.query(ExerciseCompleted).filter(ExerciseCompleted.user_id == current_user.id).count()
+    summary = await stats.exercise_summary(db, current_user.id, current_user.timezone)
     
     return {
-        "total_minutes": total_minutes,
-        "sessions_completed": sessions_completed,
-        "streak": 0 # Implement streak logic later
+        "total_minutes": int(summary["value_sum"] / 60),
+        "sessions_completed": summary["total"],
+        "streak": stats.current_streak(summary),
     }
 
 @router.get("/history", response_model=List[ExerciseSchema])
-def get_exercise_history(
-    db: Session = Depends(deps.get_db),
+async def get_exercise_history(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
-    limit: int = 50,
-    current_user: User = Depends(deps.get_current_user),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    exercises = (
-        db.query(ExerciseCompleted)
-        .filter(ExerciseCompleted.user_id == current_user.id)
-        .order_by(ExerciseCompleted.completed_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    result = await db.execute(
+        paginate(
+            select(*exercises_json.columns(ExerciseCompleted)).where(ExerciseCompleted.user_id == current_user.id),
+            ExerciseCompleted.completed_at, ExerciseCompleted.id, limit, skip=skip, before=before,
+        )
     )
-    return exercises
+    rows = page(result.all(), response, limit, time_attr="completed_at")
+    return json_response(exercises_json.dump(rows), response)
@@ -1,81 +1,107 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.api import deps
-from app.models import MoodLog, User
-from app.schemas import MoodLog as MoodLogSchema, MoodLogCreate, MoodStats
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api import batch, deps
+from app.api.pagination import MAX_PAGE_SIZE, paginate, page
+from app.api.serialization import ListSerializer, json_response
+from app.models import MoodAggregate, MoodInsight, MoodLog
+from app.schemas import (
+    MoodInsight as MoodInsightSchema, MoodLog as MoodLogSchema, MoodLogBatchItem, MoodLogCreate, MoodStats,
+    Identity,
+)
+from app.services import ai, insights, mood_stats
 
 router = APIRouter()
 
+mood_logs_json = ListSerializer(MoodLogSchema)
+
 @router.post("/", response_model=MoodLogSchema)
-def create_mood_log(
+async def create_mood_log(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     mood_in: MoodLogCreate,
-    current_user: User = Depends(deps.get_current_user),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    mood_log = MoodLog(
-        mood_level=mood_in.mood_level,
-        notes=mood_in.notes,
-        user_id=current_user.id,
+    # RETURNING hands back id and created_at with the insert, so no refresh afterwards.
+    mood_log = await db.scalar(
+        insert(MoodLog)
+        .values(mood_level=mood_in.mood_level, notes=mood_in.notes, user_id=current_user.id)
+        .returning(MoodLog)
     )
-    db.add(mood_log)
-    db.commit()
-    db.refresh(mood_log)
+    agg = await mood_stats.record_mood_log(db, current_user.id, mood_in.mood_level, current_user.timezone)
+    queued = await insights.enqueue_if_due(db, current_user.id, agg.entry_count)
+    await db.commit()
+    if queued:
+        insights.pool.notify()
     return mood_log
 
+@router.post("/batch", response_model=List[MoodLogSchema])
+async def create_mood_logs_batch(
+    *,
+    db: AsyncSession = Depends(deps.get_db),
+    entries: List[MoodLogBatchItem],
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    """Store entries logged offline, in one INSERT ... RETURNING and one transaction."""
+    batch.check_size(entries)
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "user_id": current_user.id,
+            "mood_level": entry.mood_level,
+            "notes": entry.notes,
+            "created_at": batch.entry_time(entry.created_at, now),
+        }
+        for entry in entries
+    ]
+    result = await db.scalars(insert(MoodLog).returning(MoodLog, sort_by_parameter_order=True), rows)
+    mood_logs = result.all()
+    agg = await mood_stats.record_mood_logs(
+        db, current_user.id, [(row["mood_level"], row["created_at"]) for row in rows], current_user.timezone
+    )
+    queued = await insights.enqueue_if_due(db, current_user.id, agg.entry_count)
+    await db.commit()
+    if queued:
+        insights.pool.notify()
+    return mood_logs
+
 @router.get("/", response_model=List[MoodLogSchema])
-def read_mood_logs(
-    db: Session = Depends(deps.get_db),
+async def read_mood_logs(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_db),
     skip: int = 0,
-    limit: int = 100,
-    current_user: User = Depends(deps.get_current_user),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None,
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    mood_logs = (
-        db.query(MoodLog)
-        .filter(MoodLog.user_id == current_user.id)
-        .order_by(MoodLog.created_at.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
+    result = await db.execute(
+        paginate(
+            select(*mood_logs_json.columns(MoodLog)).where(MoodLog.user_id == current_user.id),
+            MoodLog.created_at, MoodLog.id, limit, skip=skip, before=before,
+        )
     )
-    return mood_logs
+    return json_response(mood_logs_json.dump(page(result.all(), response, limit)), response)
 
 @router.get("/stats", response_model=MoodStats)
-def get_mood_stats(
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+async def get_mood_stats(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    # Total entries
-    total_entries = db.query(MoodLog).filter(MoodLog.user_id == current_user.id).count()
-    
-    # Average mood
-    avg_mood = db.query(func.avg(MoodLog.mood_level)).filter(MoodLog.user_id == current_user.id).scalar() or 0
-    
-    # Weekly trend (last 7 days)
-    today = datetime.utcnow().date()
-    week_ago = today - timedelta(days=6)
-    weekly_logs = (
-        db.query(MoodLog)
-        .filter(MoodLog.user_id == current_user.id, MoodLog.created_at >= week_ago)
-        .all()
-    )
-    # Simplified trend logic
-    weekly_trend = [0] * 7 # Placeholder
-    
-    # Mood distribution
-    distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-    all_logs = db.query(MoodLog).filter(MoodLog.user_id == current_user.id).all()
-    for log in all_logs:
-        if log.mood_level in distribution:
-            distribution[log.mood_level] += 1
-            
-    return {
-        "total_entries": total_entries,
-        "average_mood": round(avg_mood, 1),
-        "streak": 0, # Implement streak logic later
-        "weekly_trend": weekly_trend,
-        "mood_distribution": distribution
-    }
+    agg = await db.get(MoodAggregate, current_user.id)
+    if agg is None:
+        agg = await mood_stats.rebuild_user(db, current_user.id, current_user.timezone)
+        await db.commit()
+    return mood_stats.to_stats(agg, current_user.timezone)
+
+@router.get("/insights", response_model=MoodInsightSchema)
+async def get_mood_insights(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
+) -> Any:
+    """The latest precomputed insight; generation happens in the background."""
+    insight = await db.get(MoodInsight, current_user.id)
+    if insight is None:
+        return {"content": ai.INSIGHTS_FALLBACK, "entry_count": 0, "generated_at": None}
+    return insight
@@ -1,31 +1,33 @@
 from typing import Any
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import undefer
 from app.api import deps
-from typing import Any
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.api import deps
-from app.schemas import User as UserSchema
+from app.schemas import Identity, User as UserSchema
 from app.models import User # Assuming User model is in app.models
+from app.services import prompts, user_cache
 
 router = APIRouter()
 
 @router.get("/me", response_model=UserSchema)
-def read_user_me(
-    current_user: User = Depends(deps.get_current_user),
+async def read_user_me(
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    return current_user
+    return await db.get(User, current_user.id, options=[undefer(User.onboarding_data)])
 
 @router.post("/onboarding", response_model=UserSchema)
-def update_onboarding(
+async def update_onboarding(
     data: dict,
-    db: Session = Depends(deps.get_db),
-    current_user: User = Depends(deps.get_current_user),
+    db: AsyncSession = Depends(deps.get_db),
+    current_user: Identity = Depends(deps.get_current_user),
 ) -> Any:
-    current_user.onboarding_data = data
-    current_user.onboarding_completed = True
-    db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    user = await db.get(User, current_user.id)
+    user.onboarding_data = data
+    user.onboarding_completed = True
+    db.add(user)
+    await db.commit()
+    user = await db.get(User, user.id, options=[undefer(User.onboarding_data)], populate_existing=True)
+    await user_cache.invalidate(user.email)
+    prompts.invalidate_user(user.id)
+    return user
@@ -0,0 +1,54 @@
+"""Keyset (cursor) pagination for newest-first feeds.
+
+A cursor is an opaque token for the `(timestamp, id)` of the last row a client
+has seen. Pages are fetched with `WHERE (timestamp, id) < cursor`, which walks
+the `(..., timestamp DESC, id DESC)` indexes directly, so page N costs the same
+as page 1. The next cursor goes back in the `X-Next-Cursor` response header,
+which leaves the list response body unchanged for existing clients.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Largest `limit` a list endpoint accepts.
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(timestamp: datetime, row_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query: Select, time_column, id_column, limit: int, skip: int = 0, before: Optional[str] = None) -> Select:
+    """Order newest first and restrict to one page (plus one row to detect more).
+
+    With a `before` cursor the offset is ignored; `skip` remains for clients
+    that still page by offset.
+    """
+    query = query.order_by(time_column.desc(), id_column.desc())
+    if before:
+        timestamp, row_id = decode_cursor(before)
+        # The plain bound on the timestamp is implied by the row comparison, but
+        # only it lets Postgres prune partitions newer than the cursor.
+        query = query.where(time_column <= timestamp, tuple_(time_column, id_column) < (timestamp, row_id))
+    elif skip:
+        query = query.offset(skip)
+    return query.limit(limit + 1)
+
+def page(rows: Sequence, response: Response, limit: int, time_attr: str = "created_at") -> list:
+    """Trim the lookahead row and publish the next cursor if there is more."""
+    rows = list(rows)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(getattr(last, time_attr), last.id)
+    return rows
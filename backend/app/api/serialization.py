@@ -0,0 +1,35 @@
+"""Fast path for list endpoints: column rows in, JSON bytes out.
+
+Returning ORM objects through `response_model` costs an ORM instance per row,
+a Pydantic validation, a conversion back to Python primitives and then a JSON
+encode. List endpoints instead select only the schema's columns (plain row
+tuples, no identity map) and let a `TypeAdapter` validate and encode the whole
+page in one call inside pydantic-core. `response_model` stays on the route for
+the OpenAPI schema; the returned `Response` bypasses it.
+"""
+from typing import List, Sequence
+from fastapi import Response
+from pydantic import TypeAdapter
+
+class ListSerializer:
+    def __init__(self, schema):
+        self.schema = schema
+        self.adapter = TypeAdapter(List[schema])
+
+    def columns(self, model, **overrides) -> list:
+        """The model columns backing the schema's fields, in field order.
+
+        `overrides` replaces a field's column with a SQL expression labelled
+        with the field name (e.g. a truncated text column).
+        """
+        return [
+            overrides[name].label(name) if name in overrides else getattr(model, name)
+            for name in self.schema.model_fields
+        ]
+
+    def dump(self, rows: Sequence) -> bytes:
+        return self.adapter.dump_json(self.adapter.validate_python(rows, from_attributes=True))
+
+def json_response(body: bytes, response: Response) -> Response:
+    """Send pre-encoded JSON with the headers set on the injected `response` (e.g. X-Next-Cursor)."""
+    return Response(body, media_type="application/json", headers=dict(response.headers))
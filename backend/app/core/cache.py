@@ -0,0 +1,100 @@
+"""Small key/value cache with pluggable backends.
+
+`MemoryCache` keeps entries in-process (TTL + LRU), which is enough for a single
+worker. `RedisCache` talks to anything that speaks the redis-py asyncio API
+(`get`, `set(..., px=...)`, `delete`), so several workers share one cache and
+tests can pass a local fake client. Values are always bytes.
+"""
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "memory" or "redis"
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+class MemoryCache(CacheBackend):
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+class RedisCache(CacheBackend):
+    def __init__(self, client, namespace: str):
+        self.client = client
+        self.namespace = namespace
+
+    def _key(self, key: str) -> str:
+        return f"neeva:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self._key(key))
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self._key(key), value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self._key(key) for key in keys))
+
+_redis_client = None
+
+def get_redis_client():
+    """Shared redis.asyncio client for REDIS_URL, created on first use."""
+    global _redis_client
+    if _redis_client is None:
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package") from e
+        _redis_client = redis.from_url(REDIS_URL)
+    return _redis_client
+
+def create_cache(namespace: str, maxsize: int = 10000, backend: str = None) -> CacheBackend:
+    backend = backend or CACHE_BACKEND
+    if backend == "redis":
+        return RedisCache(get_redis_client(), namespace)
+    if backend == "memory":
+        return MemoryCache(maxsize)
+    raise ValueError(f"Unknown cache backend: {backend}")
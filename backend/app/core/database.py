@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine
+from typing import AsyncIterator
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from app.core import metrics, profiling
+from app.core.log import get_logger
 import os
 from dotenv import load_dotenv
 
@@ -8,14 +13,107 @@ load_dotenv()
 
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool tuning for the async engine.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 20))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# asyncpg caches prepared statements per connection, which breaks behind a
+# transaction-mode pooler (e.g. Supabase on port 6543). Set to 0 there.
+DB_STATEMENT_CACHE_SIZE = os.getenv("DB_STATEMENT_CACHE_SIZE")
+# Statements slower than this are always logged (text only; parameters can
+# hold user content). Set to 0 to disable.
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", 0.5))
+SLOW_QUERY_MAX_CHARS = 2000
+
+sql_logger = get_logger("sql")
+
+_ASYNC_DRIVERS = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgresql+psycopg": "postgresql+asyncpg",
+}
+
+def _async_database_url(url: str) -> str:
+    """Derive the async driver URL from DATABASE_URL unless one is given explicitly."""
+    explicit = os.getenv("ASYNC_DATABASE_URL")
+    if explicit:
+        return explicit
+    parsed = make_url(url)
+    drivername = _ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+# Used by every API endpoint and script, so queries are awaited on the event
+# loop instead of holding a worker thread each. Alembic builds its own sync
+# engine from DATABASE_URL (psycopg2).
+ASYNC_DATABASE_URL = _async_database_url(SQLALCHEMY_DATABASE_URL)
+_async_connect_args = {}
+if DB_STATEMENT_CACHE_SIZE is not None and make_url(ASYNC_DATABASE_URL).get_driver_name() == "asyncpg":
+    _async_connect_args["prepared_statement_cache_size"] = int(DB_STATEMENT_CACHE_SIZE)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+)
+# expire_on_commit=False so committed objects can still be serialized without
+# an implicit (and, under asyncio, illegal) lazy reload.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("neeva_slow_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["neeva_slow_query_start"].pop()
+    profile = profiling.current()
+    if profile is not None:
+        profile.record_query(statement, parameters, elapsed)
+    if SLOW_QUERY_SECONDS and elapsed >= SLOW_QUERY_SECONDS:
+        sql_logger.warning(
+            "slow query",
+            extra={"fields": {
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": statement[:SLOW_QUERY_MAX_CHARS],
+                "executemany": executemany,
+            }},
+        )
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    starts = conn.info.get("neeva_slow_query_start") if conn is not None else None
+    if starts:
+        starts.pop()
+
+event.listen(async_engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+event.listen(async_engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+event.listen(async_engine.sync_engine, "handle_error", _handle_error)
+metrics.instrument_engine(async_engine.sync_engine)
+
+def _pool_connections() -> dict:
+    pool = async_engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {
+        ("checked_out",): pool.checkedout(),
+        ("idle",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+        ("capacity",): pool.size() + DB_MAX_OVERFLOW,
+    }
+
+metrics.Gauge(
+    "neeva_db_pool_connections",
+    "Async engine pool connections; checked_out near capacity means requests queue for a connection.",
+    _pool_connections,
+    labelnames=("state",),
+)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,253 @@
+"""In-process metrics: labelled counters, histograms and gauges, rendered in the
+Prometheus text format at `/metrics`.
+
+Deliberately tiny and dependency-free. Updates are plain dict operations so
+recording on hot paths costs next to nothing; with METRICS_ENABLED=false the
+request middleware and engine listeners are not installed at all and every
+update returns immediately. Gauges are computed when scraped.
+
+`/metrics` is only served when METRICS_TOKEN is set, to scrapers that send it
+as a bearer token; otherwise it answers 404.
+"""
+import os
+import secrets
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Sequence, Tuple
+import anyio.to_thread
+from sqlalchemy import event
+from app.core.log import get_logger
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+REGISTRY: list = []
+
+logger = get_logger("metrics")
+
+def _label_key(labelnames: Sequence[str], labels: dict) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labelnames: Sequence[str], key: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, key)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in list(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label key -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple[str, ...], list] = {}
+        REGISTRY.append(self)
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = _label_key(self.labelnames, labels)
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total, count) in list(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+class Gauge:
+    """A value read at scrape time from `callback`.
+
+    The callback returns a number, or a dict of label tuple -> number when the
+    gauge has labels. Callbacks run on the event loop inside `/metrics`.
+    """
+
+    def __init__(self, name: str, documentation: str, callback: Callable, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        REGISTRY.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.callback()
+        except Exception:
+            logger.warning("Metrics gauge %s failed", self.name, exc_info=True)
+            return lines
+        if not isinstance(values, dict):
+            values = {(): values}
+        for key, value in values.items():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+def scrape_authorized(scheme: str, token: str) -> bool:
+    """Whether an `Authorization: <scheme> <token>` header may read `/metrics`."""
+    return scheme.lower() == "bearer" and secrets.compare_digest(token, METRICS_TOKEN)
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "neeva_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    LATENCY_BUCKETS,
+    labelnames=("method", "route", "status"),
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "neeva_db_queries_per_request",
+    "SQL statements executed per HTTP request.",
+    QUERY_COUNT_BUCKETS,
+    labelnames=("route",),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "neeva_db_time_per_request_seconds",
+    "Time spent executing SQL per HTTP request.",
+    LATENCY_BUCKETS,
+    labelnames=("route",),
+)
+DB_QUERY_DURATION = Histogram(
+    "neeva_db_query_duration_seconds",
+    "Latency of individual SQL statements.",
+    LATENCY_BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "neeva_llm_prompt_tokens",
+    "Estimated prompt tokens per chat request, by prompt segment.",
+    TOKEN_BUCKETS,
+    labelnames=("segment",),
+)
+LLM_REQUEST_DURATION = Histogram(
+    "neeva_llm_request_duration_seconds",
+    "LLM completion latency (until the last token for streams).",
+    LLM_LATENCY_BUCKETS,
+    labelnames=("model", "kind"),
+)
+LLM_USAGE_TOKENS = Counter(
+    "neeva_llm_usage_tokens_total",
+    "Tokens reported by the provider: prompt (in), completion (out) and cached prompt.",
+    labelnames=("model", "kind"),
+)
+LLM_ERRORS = Counter(
+    "neeva_llm_errors_total",
+    "Failed LLM calls by exception type.",
+    labelnames=("model", "kind", "error"),
+)
+LLM_CACHE_LOOKUPS = Counter(
+    "neeva_llm_cache_lookups_total",
+    "LLM response cache lookups by result (hit, semantic_hit or miss); hit rate = hits / all.",
+    labelnames=("kind", "result"),
+)
+LLM_CACHE_SAVED_TOKENS = Counter(
+    "neeva_llm_cache_saved_tokens_total",
+    "Provider tokens not spent because a cached response was served.",
+    labelnames=("model",),
+)
+RATE_LIMITED = Counter(
+    "neeva_rate_limited_total",
+    "Calls refused with 429, by the limit that refused them (user, route or llm).",
+    labelnames=("scope",),
+)
+
+# [query count, seconds in SQL] for the HTTP request being handled.
+_request_db: ContextVar[Optional[list]] = ContextVar("request_db", default=None)
+
+def start_request_db_tracking():
+    return _request_db.set([0, 0.0])
+
+def finish_request_db_tracking(token, route: str) -> None:
+    queries, seconds = _request_db.get()
+    _request_db.reset(token)
+    DB_QUERIES_PER_REQUEST.observe(queries, route=route)
+    DB_TIME_PER_REQUEST.observe(seconds, route=route)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("neeva_query_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["neeva_query_start"].pop()
+    DB_QUERY_DURATION.observe(elapsed)
+    current = _request_db.get()
+    if current is not None:
+        current[0] += 1
+        current[1] += elapsed
+
+def _handle_error(exception_context):
+    starts = exception_context.connection.info.get("neeva_query_start") if exception_context.connection else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(engine) -> None:
+    """Time every statement on `engine` (a sync Engine; pass `.sync_engine` for async)."""
+    if not METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+def _threadpool_usage() -> dict:
+    # Sync endpoints, dependencies and run_in_threadpool share this limiter.
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    return {
+        ("busy",): limiter.borrowed_tokens,
+        ("queued",): limiter.statistics().tasks_waiting,
+        ("capacity",): limiter.total_tokens,
+    }
+
+Gauge(
+    "neeva_threadpool_threads",
+    "Default worker threadpool usage; queued > 0 means sync work is waiting for a thread.",
+    _threadpool_usage,
+    labelnames=("state",),
+)
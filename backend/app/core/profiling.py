@@ -0,0 +1,174 @@
+"""Opt-in per-request profiling.
+
+A profiled request gets a cProfile call graph of the event loop thread and a
+list of every SQL statement it ran (text, parameters, duration). Each capture
+is written to a bounded on-disk ring buffer: PROFILE_MAX_ENTRIES slots, each a
+`<slot>.json` summary plus a `<slot>.prof` pstats dump that snakeviz or
+`python -m scripts.show_profiles` can open.
+
+Nothing here runs unless PROFILING_ENABLED is set. A request is then profiled
+when it carries `X-Profile: <PROFILING_TOKEN>` or is picked by
+PROFILE_SAMPLE_RATE. Only one request is profiled at a time: the profiler sees
+the whole loop thread, so concurrent requests show up in the call graph too,
+while SQL statements are attributed exactly. Work in threads (Argon2 hashing,
+sync endpoints) appears as time waiting on the loop.
+"""
+import cProfile
+import json
+import marshal
+import os
+import pstats
+import tempfile
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import List, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Admin switch; without it the middleware is not installed.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+# Header trigger requires this exact value, so clients cannot profile at will.
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_HEADER = "X-Profile"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "neeva-profiles"))
+PROFILE_MAX_ENTRIES = int(os.getenv("PROFILE_MAX_ENTRIES", 100))
+# Per-profile caps so one pathological request cannot produce a huge file.
+PROFILE_MAX_STATEMENTS = int(os.getenv("PROFILE_MAX_STATEMENTS", 500))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", 40))
+PROFILE_MAX_PARAM_CHARS = 200
+
+@dataclass
+class RequestProfile:
+    request_id: Optional[str]
+    method: str
+    path: str
+    started_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    statements: List[dict] = field(default_factory=list)
+    dropped_statements: int = 0
+    sql_seconds: float = 0.0
+
+    def record_query(self, statement: str, parameters, seconds: float) -> None:
+        self.sql_seconds += seconds
+        if len(self.statements) >= PROFILE_MAX_STATEMENTS:
+            self.dropped_statements += 1
+            return
+        params = repr(parameters)
+        if len(params) > PROFILE_MAX_PARAM_CHARS:
+            params = params[:PROFILE_MAX_PARAM_CHARS] + "..."
+        self.statements.append({
+            "statement": statement,
+            "parameters": params,
+            "duration_ms": round(seconds * 1000, 3),
+        })
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+_profiling_active = False
+
+def current() -> Optional[RequestProfile]:
+    return _current.get()
+
+def try_start(request_id: Optional[str], method: str, path: str):
+    """Begin profiling this request; returns a handle, or None if another one is running."""
+    global _profiling_active
+    if _profiling_active:
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler (e.g. a debugger) already owns the hooks.
+        return None
+    _profiling_active = True
+    profile = RequestProfile(request_id=request_id, method=method, path=path)
+    return profiler, profile, _current.set(profile), time.perf_counter()
+
+def finish(handle, status: int) -> tuple:
+    """Stop profiling; returns (summary dict, pstats marshal bytes) for `ring.write`."""
+    global _profiling_active
+    profiler, profile, token, start = handle
+    profiler.disable()
+    _profiling_active = False
+    _current.reset(token)
+    duration = time.perf_counter() - start
+
+    profiler.create_stats()
+    stats = pstats.Stats(profiler)
+    functions = []
+    for (filename, lineno, name), (cc, ncalls, tottime, cumtime, _) in stats.stats.items():
+        functions.append({
+            "function": f"{filename}:{lineno}({name})",
+            "calls": ncalls,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    functions.sort(key=lambda f: f["cumtime_ms"], reverse=True)
+
+    summary = {
+        "request_id": profile.request_id,
+        "method": profile.method,
+        "path": profile.path,
+        "status": status,
+        "started_at": profile.started_at.isoformat(),
+        "duration_ms": round(duration * 1000, 3),
+        "sql_ms": round(profile.sql_seconds * 1000, 3),
+        "sql_count": len(profile.statements) + profile.dropped_statements,
+        "sql_dropped": profile.dropped_statements,
+        "statements": profile.statements,
+        "top_functions": functions[:PROFILE_TOP_FUNCTIONS],
+    }
+    # Same format as cProfile's dump_stats, so pstats.Stats(path) loads it.
+    return summary, marshal.dumps(stats.stats)
+
+class ProfileRing:
+    """Fixed number of profile slots on disk; the oldest slot is overwritten next."""
+
+    def __init__(self, directory: str, capacity: int):
+        self.directory = directory
+        self.capacity = max(capacity, 1)
+        self._next: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _slot_path(self, slot: int, suffix: str) -> str:
+        return os.path.join(self.directory, f"{slot:04d}{suffix}")
+
+    def _first_slot(self) -> int:
+        # Resume after a restart: fill an empty slot, else overwrite the oldest.
+        oldest, oldest_mtime = 0, None
+        for slot in range(self.capacity):
+            path = self._slot_path(slot, ".json")
+            if not os.path.exists(path):
+                return slot
+            mtime = os.path.getmtime(path)
+            if oldest_mtime is None or mtime < oldest_mtime:
+                oldest, oldest_mtime = slot, mtime
+        return oldest
+
+    def entries(self) -> List[str]:
+        """Summary files, newest first."""
+        if not os.path.isdir(self.directory):
+            return []
+        paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".json")]
+        return sorted(paths, key=os.path.getmtime, reverse=True)
+
+    def write(self, summary: dict, stats: bytes) -> str:
+        """Blocking; call from a thread."""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._next is None:
+                self._next = self._first_slot()
+            slot, self._next = self._next, (self._next + 1) % self.capacity
+        summary = dict(summary, slot=slot, stats_file=os.path.basename(self._slot_path(slot, ".prof")))
+        for suffix, data in ((".prof", stats), (".json", json.dumps(summary, default=str, indent=1).encode())):
+            path = self._slot_path(slot, suffix)
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return self._slot_path(slot, ".json")
+
+ring = ProfileRing(PROFILE_DIR, PROFILE_MAX_ENTRIES)
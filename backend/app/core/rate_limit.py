@@ -0,0 +1,175 @@
+"""Token-bucket rate limits, per user and per route.
+
+A bucket holds up to `capacity` tokens and refills continuously at
+`capacity / period`; a call takes tokens or learns how long until enough have
+refilled (the Retry-After). `MemoryBuckets` keeps buckets in-process, which is
+enough for a single worker. `RedisBuckets` updates each bucket atomically with
+a Lua script on anything that speaks the redis-py asyncio API (`eval`), so all
+workers share the limits and tests can pass a local fake client. The backend
+follows CACHE_BACKEND unless RATE_LIMIT_BACKEND is set.
+
+`deps.enforce_rate_limit` applies USER_RATE to every API call, per user (or
+per client address when signed out), and ROUTE_RATES on top for expensive
+routes; `services.llm_scheduler` keeps its tokens-per-minute budget in the
+same backend.
+"""
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from app.core import cache, metrics
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+# "memory" or "redis"
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", cache.CACHE_BACKEND)
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+@dataclass(frozen=True)
+class Rate:
+    capacity: float
+    period: float  # Seconds to refill an empty bucket
+
+    @property
+    def per_second(self) -> float:
+        return self.capacity / self.period
+
+def parse_rate(value: str) -> Rate:
+    """'10/minute' -> Rate(10, 60)."""
+    count, _, unit = value.partition("/")
+    return Rate(float(count), PERIODS[unit.strip()])
+
+# Every call counts against the caller's own bucket...
+USER_RATE = parse_rate(os.getenv("RATE_LIMIT_USER", "120/minute"))
+# ...and these routes (method + route path) against a bucket of their own.
+ROUTE_RATES = {
+    "POST /api/auth/login": parse_rate(os.getenv("RATE_LIMIT_LOGIN", "10/minute")),
+    "POST /api/auth/register": parse_rate(os.getenv("RATE_LIMIT_LOGIN", "10/minute")),
+    "POST /api/chat/": parse_rate(os.getenv("RATE_LIMIT_CHAT", "10/minute")),
+    "POST /api/chat/stream": parse_rate(os.getenv("RATE_LIMIT_CHAT", "10/minute")),
+    "POST /api/community/posts": parse_rate(os.getenv("RATE_LIMIT_POSTS", "20/minute")),
+    "POST /api/community/posts/{post_id}/comments": parse_rate(os.getenv("RATE_LIMIT_POSTS", "20/minute")),
+    "POST /api/mood/batch": parse_rate(os.getenv("RATE_LIMIT_BATCH", "10/minute")),
+    "POST /api/exercises/batch": parse_rate(os.getenv("RATE_LIMIT_BATCH", "10/minute")),
+}
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float, scope: str):
+        super().__init__(f"Rate limited ({scope}), retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+        self.scope = scope
+
+def too_many_requests(error: RateLimited) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, please slow down",
+        headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))},
+    )
+
+class Buckets(ABC):
+    @abstractmethod
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        """Take `cost` tokens; returns 0 on success, else seconds until they would be there.
+
+        Nothing is taken when the call is refused. A negative cost returns
+        tokens (capped at capacity).
+        """
+
+class MemoryBuckets(Buckets):
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        # key -> (tokens, monotonic time of last update)
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (rate.capacity, now))
+        tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+        wait = 0.0
+        if cost > tokens:
+            wait = (cost - tokens) / rate.per_second
+        else:
+            tokens = min(rate.capacity, tokens - cost)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Evicting the least recently used bucket only forgets a mostly refilled one.
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self) -> None:
+        self._buckets.clear()
+
+# KEYS[1] bucket; ARGV capacity, tokens per second, cost. Uses the server clock
+# so workers with skewed clocks agree. Returns the wait as a string (Lua
+# numbers are truncated to integers on the way out).
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if cost > tokens then
+    wait = (cost - tokens) / rate
+else
+    tokens = math.min(capacity, tokens - cost)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+class RedisBuckets(Buckets):
+    def __init__(self, client, namespace: str = "ratelimit"):
+        self.client = client
+        self.namespace = namespace
+
+    async def take(self, key: str, rate: Rate, cost: float = 1) -> float:
+        wait = await self.client.eval(
+            TAKE_SCRIPT, 1, f"neeva:{self.namespace}:{key}", rate.capacity, rate.per_second, cost
+        )
+        return float(wait)
+
+def create_buckets(backend: str = None) -> Buckets:
+    backend = backend or RATE_LIMIT_BACKEND
+    if backend == "redis":
+        return RedisBuckets(cache.get_redis_client())
+    if backend == "memory":
+        return MemoryBuckets()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+buckets = create_buckets()
+
+async def check(subject: str, route: str) -> Optional[RateLimited]:
+    """Count one call by `subject` ("user:42", "ip:...") to `route` ("METHOD /path").
+
+    Returns the refusal if a limit is exceeded, else None.
+    """
+    if not RATE_LIMIT_ENABLED:
+        return None
+    wait = await buckets.take(subject, USER_RATE)
+    if wait:
+        metrics.RATE_LIMITED.inc(scope="user")
+        return RateLimited(wait, "user")
+    rate = ROUTE_RATES.get(route)
+    if rate is not None:
+        wait = await buckets.take(f"{route}:{subject}", rate)
+        if wait:
+            # A refused call should not also use up the caller's overall budget.
+            await buckets.take(subject, USER_RATE, -1)
+            metrics.RATE_LIMITED.inc(scope="route")
+            return RateLimited(wait, "route")
+    return None
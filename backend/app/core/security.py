@@ -1,18 +1,52 @@
-from datetime import datetime, timedelta
-from typing import Optional, Union, Any
-from jose import jwt
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from app.core import metrics
 
 load_dotenv()
 
-SECRET_KEY = os.getenv("SECRET_KEY", "secret")
-ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
-REFRESH_TOKEN_EXPIRE_DAYS = 30
+# Argon2 cost. Changing these is safe: stored hashes made with other
+# parameters still verify and are rehashed on the user's next login.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+# Threads reserved for hashing. argon2-cffi releases the GIL, so these run in
+# parallel without competing with the default threadpool used for other work.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 1))
+# Hashes running or queued at once; further callers wait up to the timeout.
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 8))
+PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS", 5))
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+def make_pwd_context(
+    time_cost: int = ARGON2_TIME_COST, memory_cost: int = ARGON2_MEMORY_COST, parallelism: int = ARGON2_PARALLELISM
+) -> CryptContext:
+    return CryptContext(
+        schemes=["argon2"],
+        deprecated="auto",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism,
+    )
+
+pwd_context = make_pwd_context()
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = asyncio.Semaphore(PASSWORD_HASH_MAX_PENDING)
+_hash_pending = {"running_or_queued": 0, "waiting": 0}
+
+metrics.Gauge(
+    "neeva_password_hash_queue",
+    "Password hashes on the hashing executor, and callers waiting for room in its queue.",
+    lambda: {
+        ("running_or_queued",): _hash_pending["running_or_queued"],
+        ("waiting",): _hash_pending["waiting"],
+        ("workers",): PASSWORD_HASH_WORKERS,
+    },
+    labelnames=("state",),
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,20 +55,27 @@ def get_password_hash(password: str) -> str:
     # Let passlib/bcrypt handle password truncation automatically
     return pwd_context.hash(password)
 
-def create_access_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
-
-def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+async def _run_hashing(func, *args):
+    # Raises asyncio.TimeoutError when the hashing queue stays full.
+    _hash_pending["waiting"] += 1
+    try:
+        await asyncio.wait_for(_hash_slots.acquire(), PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS)
+    finally:
+        _hash_pending["waiting"] -= 1
+    _hash_pending["running_or_queued"] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending["running_or_queued"] -= 1
+        _hash_slots.release()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the hashing executor.
+
+    Returns `(verified, new_hash)`; `new_hash` is set when the stored hash
+    was made with outdated parameters and should replace it.
+    """
+    return await _run_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_password_hash, password)
@@ -0,0 +1,104 @@
+"""JWT issuing and verification.
+
+Tokens carry a `kid` header naming the key that signed them. JWT_KEYS lists
+every key still accepted ("kid:secret,kid:secret") and new tokens are signed
+with JWT_ACTIVE_KID, so a key is rotated by adding the new one, switching the
+active kid, and dropping the old one once its tokens have expired. Tokens
+without a `kid` (issued before rotation support) verify against SECRET_KEY.
+
+Verified tokens are kept in a small LRU until they expire, so repeat requests
+with the same bearer token skip signature verification.
+"""
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Union
+from jose import JWTError, jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SECRET_KEY = os.getenv("SECRET_KEY", "secret")
+ALGORITHM = os.getenv("ALGORITHM", "HS256")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30))
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", 10000))
+
+def _parse_keys(raw: str) -> Dict[str, str]:
+    keys = {}
+    for item in raw.split(","):
+        if item.strip():
+            kid, _, secret = item.strip().partition(":")
+            keys[kid] = secret
+    return keys
+
+JWT_KEYS = _parse_keys(os.getenv("JWT_KEYS", "")) or {"default": SECRET_KEY}
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID") or next(iter(JWT_KEYS))
+
+class InvalidTokenError(Exception):
+    pass
+
+# token -> verified claims, oldest use first
+_verified: "OrderedDict[str, dict]" = OrderedDict()
+
+def _create_token(subject: Union[str, Any], token_type: str, expires_delta: timedelta, user_id: Optional[int]) -> str:
+    to_encode = {
+        "exp": datetime.now(timezone.utc) + expires_delta,
+        "sub": str(subject),
+        "type": token_type,
+    }
+    if user_id is not None:
+        to_encode["uid"] = user_id
+    return jwt.encode(
+        to_encode, JWT_KEYS[JWT_ACTIVE_KID], algorithm=ALGORITHM, headers={"kid": JWT_ACTIVE_KID}
+    )
+
+def create_access_token(
+    subject: Union[str, Any], expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None
+) -> str:
+    return _create_token(
+        subject, "access", expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES), user_id
+    )
+
+def create_refresh_token(
+    subject: Union[str, Any], expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None
+) -> str:
+    return _create_token(
+        subject, "refresh", expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), user_id
+    )
+
+def _verify(token: str) -> dict:
+    try:
+        kid = jwt.get_unverified_header(token).get("kid")
+        key = JWT_KEYS.get(kid) if kid else SECRET_KEY
+        if key is None:
+            raise InvalidTokenError(f"Unknown signing key {kid!r}")
+        return jwt.decode(token, key, algorithms=[ALGORITHM])
+    except JWTError as e:
+        raise InvalidTokenError(str(e))
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verified claims of `token`, which must be of `token_type`.
+
+    Raises InvalidTokenError. Tokens issued before the `type` claim existed
+    count as access tokens.
+    """
+    payload = _verified.get(token)
+    if payload is not None and payload["exp"] <= time.time():
+        del _verified[token]
+        raise InvalidTokenError("Signature has expired.")
+    if payload is None:
+        payload = _verify(token)
+        if "exp" in payload:
+            _verified[token] = payload
+            while len(_verified) > TOKEN_CACHE_MAX_ENTRIES:
+                _verified.popitem(last=False)
+    else:
+        _verified.move_to_end(token)
+
+    if payload.get("type", "access") != token_type:
+        raise InvalidTokenError(f"Expected a {token_type} token")
+    if not payload.get("sub"):
+        raise InvalidTokenError("Token has no subject")
+    return payload
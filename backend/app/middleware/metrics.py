@@ -0,0 +1,45 @@
+"""Pure ASGI middleware recording per-route latency and per-request DB usage.
+
+Only installed when METRICS_ENABLED is on. Routes are labelled by their path
+template (`/api/mood/`), never the raw URL, to keep label cardinality bounded.
+"""
+import time
+from app.core import metrics
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    # Newer FastAPI versions dispatch through included routers without
+    # flattening them, so the route's own path lacks the router prefix; the
+    # effective route context carries the full template.
+    context = scope.get("fastapi", {}).get("effective_route_context")
+    return getattr(context, "path_format", None) or route.path
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        start = time.perf_counter()
+        db_token = metrics.start_request_db_tracking()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = route_template(scope)
+            metrics.HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - start, method=scope["method"], route=route, status=status
+            )
+            metrics.finish_request_db_tracking(db_token, route)
@@ -0,0 +1,64 @@
+"""Pure ASGI middleware that profiles selected requests (see app.core.profiling).
+
+Only installed when PROFILING_ENABLED is on. Sits inside the request logger so
+captures carry the request ID, which is also how to find a profile afterwards.
+"""
+import asyncio
+import hmac
+import random
+from app.core import profiling
+from app.core.log import get_logger, request_id_var
+
+logger = get_logger("profiling")
+
+_HEADER = profiling.PROFILE_HEADER.lower().encode()
+
+def _requested(scope) -> bool:
+    if not profiling.PROFILING_TOKEN:
+        return False
+    for name, value in scope["headers"]:
+        if name == _HEADER:
+            return hmac.compare_digest(value, profiling.PROFILING_TOKEN.encode())
+    return False
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not (
+            _requested(scope)
+            or (profiling.PROFILE_SAMPLE_RATE and random.random() < profiling.PROFILE_SAMPLE_RATE)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        handle = profiling.try_start(request_id_var.get(), scope["method"], scope["path"])
+        if handle is None:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            summary, stats = profiling.finish(handle, status)
+            try:
+                path = await asyncio.to_thread(profiling.ring.write, summary, stats)
+            except OSError as e:
+                logger.warning("profile not saved", extra={"fields": {"error": repr(e)}})
+            else:
+                logger.info(
+                    "profile captured",
+                    extra={"fields": {
+                        "file": path, "path": summary["path"], "duration_ms": summary["duration_ms"],
+                        "sql_count": summary["sql_count"], "sql_ms": summary["sql_ms"],
+                    }},
+                )
@@ -0,0 +1,86 @@
+"""Pure ASGI request logging: request IDs, timing, status and slow-request traces.
+
+Unlike a BaseHTTPMiddleware it only wraps `send` to read the status, so
+responses (including SSE streams) pass through untouched.
+"""
+import asyncio
+import io
+import os
+import random
+import time
+import uuid
+from app.core.log import get_logger, request_id_var
+
+REQUEST_ID_HEADER = "X-Request-ID"
+# Requests slower than this are logged as warnings.
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", 1.0))
+# Share of requests that get a stack snapshot if they run past the threshold.
+SLOW_REQUEST_TRACE_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_TRACE_SAMPLE_RATE", 0.1))
+
+logger = get_logger("request")
+
+def _snapshot(task: asyncio.Task, request_id: str, method: str, path: str) -> None:
+    # Runs on the loop while the request is still in flight, so the stack
+    # shows what it is waiting on.
+    stack = io.StringIO()
+    task.print_stack(file=stack)
+    logger.warning(
+        "slow request trace",
+        extra={"fields": {
+            "request_id": request_id, "method": method, "path": path,
+            "after_s": SLOW_REQUEST_SECONDS, "stack": stack.getvalue(),
+        }},
+    )
+
+class RequestLoggingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        method, path = scope["method"], scope["path"]
+        status = 500
+        start = time.perf_counter()
+
+        trace_handle = None
+        if SLOW_REQUEST_TRACE_SAMPLE_RATE and random.random() < SLOW_REQUEST_TRACE_SAMPLE_RATE:
+            trace_handle = asyncio.get_running_loop().call_later(
+                SLOW_REQUEST_SECONDS, _snapshot, asyncio.current_task(), request_id, method, path
+            )
+
+        async def send_with_request_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        except Exception:
+            logger.exception(
+                "unhandled error", extra={"fields": {"method": method, "path": path}}
+            )
+            raise
+        finally:
+            if trace_handle is not None:
+                trace_handle.cancel()
+            duration = time.perf_counter() - start
+            fields = {"method": method, "path": path, "status": status, "duration_ms": round(duration * 1000, 2)}
+            if duration >= SLOW_REQUEST_SECONDS:
+                logger.warning("slow request", extra={"fields": fields})
+            else:
+                logger.info("request", extra={"fields": fields})
+            request_id_var.reset(token)
@@ -1 +1 @@
-from .models import User, MoodLog, ChatMessage, ExerciseCompleted, CommunityGroup, CommunityPost, UserPreference
+from .models import User, MoodLog, MoodAggregate, MoodInsight, InsightJob, ChatMessage, ChatSummary, ExerciseCompleted, CommunityGroup, CommunityPost, PostLike, PostComment, GroupMember, UserPreference
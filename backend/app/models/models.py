@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Date, Text, JSON, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -12,7 +12,8 @@ class User(Base):
     name = Column(String)
     timezone = Column(String, default="UTC")
     onboarding_completed = Column(Boolean, default=False)
-    onboarding_data = Column(JSON, default={})
+    # Only the onboarding/profile endpoints and chat personalization need this.
+    onboarding_data = deferred(Column(JSON, default={}))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -21,29 +22,103 @@ class User(Base):
     exercises_completed = relationship("ExerciseCompleted", back_populates="user")
     community_posts = relationship("CommunityPost", back_populates="user")
     preferences = relationship("UserPreference", uselist=False, back_populates="user")
+    mood_aggregate = relationship("MoodAggregate", uselist=False, back_populates="user")
 
 class MoodLog(Base):
+    """Partitioned by month on created_at (see scripts/manage_partitions.py)."""
     __tablename__ = "mood_logs"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     mood_level = Column(Integer)  # 1-5
     notes = Column(Text)  # Encrypted
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Part of the table's primary key because it is the partition key.
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     user = relationship("User", back_populates="mood_logs")
 
+    __table_args__ = (
+        Index("ix_mood_logs_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    # ids are unique on their own (one sequence), so rows are identified by id alone.
+    __mapper_args__ = {"primary_key": [id]}
+
+class MoodAggregate(Base):
+    """Running per-user mood totals, maintained on every new MoodLog."""
+    __tablename__ = "mood_aggregates"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    entry_count = Column(Integer, default=0, nullable=False)
+    mood_sum = Column(Integer, default=0, nullable=False)
+    level_1_count = Column(Integer, default=0, nullable=False)
+    level_2_count = Column(Integer, default=0, nullable=False)
+    level_3_count = Column(Integer, default=0, nullable=False)
+    level_4_count = Column(Integer, default=0, nullable=False)
+    level_5_count = Column(Integer, default=0, nullable=False)
+    last_logged_date = Column(Date)  # In the user's timezone
+    current_streak = Column(Integer, default=0, nullable=False)
+    daily_buckets = Column(JSON, default=dict)  # {"YYYY-MM-DD": [mood_sum, count]} for recent days
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    user = relationship("User", back_populates="mood_aggregate")
+
+class MoodInsight(Base):
+    """Latest precomputed mood insight per user (see app/services/insights.py)."""
+    __tablename__ = "mood_insights"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    content = Column(Text)
+    entry_count = Column(Integer, default=0, nullable=False)  # MoodAggregate.entry_count when generated
+    generated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class InsightJob(Base):
+    """Queued insight regeneration. Rows are deleted once the job succeeds, failed ones after a retention period."""
+    __tablename__ = "insight_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    status = Column(String, default="pending", nullable=False)  # pending/running/failed
+    attempts = Column(Integer, default=0, nullable=False)
+    run_after = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_until = Column(DateTime(timezone=True))  # Lease of the worker running it
+    last_error = deferred(Column(Text))  # Written by the worker, read only when debugging
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # At most one pending job per user, so enqueueing again is a no-op.
+        Index("uq_insight_jobs_user_id_pending", user_id, unique=True, postgresql_where=status == "pending"),
+        Index("ix_insight_jobs_status_run_after", status, run_after),
+    )
+
 class ChatMessage(Base):
+    """Partitioned by month on created_at (see scripts/manage_partitions.py)."""
     __tablename__ = "chat_messages"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     role = Column(String)  # user/assistant
     content = Column(Text)  # Encrypted
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     user = relationship("User", back_populates="chat_messages")
 
+    __table_args__ = (
+        Index("ix_chat_messages_user_id_created_at_id", user_id, created_at.desc(), id.desc()),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+class ChatSummary(Base):
+    """Rolling summary of a user's older chat turns (see app/services/chat_context.py)."""
+    __tablename__ = "chat_summaries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    summary = Column(Text, default="")
+    summarized_through_id = Column(Integer, default=0, nullable=False)  # Last ChatMessage.id folded in
+    token_count = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
 class ExerciseCompleted(Base):
     __tablename__ = "exercises_completed"
 
@@ -55,6 +130,10 @@ class ExerciseCompleted(Base):
 
     user = relationship("User", back_populates="exercises_completed")
 
+    __table_args__ = (
+        Index("ix_exercises_completed_user_id_completed_at_id", user_id, completed_at.desc(), id.desc()),
+    )
+
 class CommunityGroup(Base):
     __tablename__ = "community_groups"
 
@@ -81,6 +160,42 @@ class CommunityPost(Base):
     user = relationship("User", back_populates="community_posts")
     group = relationship("CommunityGroup", back_populates="posts")
 
+    __table_args__ = (
+        Index("ix_community_posts_group_id_created_at_id", group_id, created_at.desc(), id.desc()),
+        # Global feed (no group filter)
+        Index("ix_community_posts_created_at_id", created_at.desc(), id.desc()),
+    )
+
+# Source of truth for the denormalized counters above, which are maintained
+# by app.services.counters and can be recomputed from these tables.
+class PostLike(Base):
+    __tablename__ = "post_likes"
+
+    post_id = Column(Integer, ForeignKey("community_posts.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class PostComment(Base):
+    __tablename__ = "post_comments"
+
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("community_posts.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    content = Column(Text)
+    is_anonymous = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_post_comments_post_id_created_at_id", post_id, created_at.desc(), id.desc()),
+    )
+
+class GroupMember(Base):
+    __tablename__ = "group_members"
+
+    group_id = Column(Integer, ForeignKey("community_groups.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    joined_at = Column(DateTime(timezone=True), server_default=func.now())
+
 class UserPreference(Base):
     __tablename__ = "user_preferences"
 
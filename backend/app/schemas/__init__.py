@@ -1,5 +1,5 @@
-from .user import User, UserCreate, UserUpdate, Token, TokenData
-from .mood import MoodLog, MoodLogCreate, MoodStats
+from .user import User, UserCreate, UserUpdate, Identity, Token, TokenData, TokenRefresh
+from .mood import MoodLog, MoodLogCreate, MoodLogBatchItem, MoodStats, MoodInsight
 from .chat import ChatMessage, ChatMessageCreate, ChatRequest
-from .exercises import ExerciseCompleted, ExerciseCompletedCreate, ExerciseStats
-from .community import CommunityGroup, CommunityPost, CommunityPostCreate
+from .exercises import ExerciseCompleted, ExerciseCompletedCreate, ExerciseCompletedBatchItem, ExerciseStats
+from .community import CommunityGroup, CommunityPost, CommunityPostCreate, PostComment, PostCommentCreate, PostLikeStatus, GroupMembership
@@ -30,3 +30,29 @@ class CommunityPost(CommunityPostBase):
     # We might want to return user name if not anonymous, but keep simple for now
 
     model_config = ConfigDict(from_attributes=True)
+
+class PostCommentBase(BaseModel):
+    content: str
+    is_anonymous: bool = False
+
+class PostCommentCreate(PostCommentBase):
+    pass
+
+class PostComment(PostCommentBase):
+    id: int
+    post_id: int
+    user_id: int
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+# Counts may trail recent likes/joins by up to one counter flush interval.
+class PostLikeStatus(BaseModel):
+    post_id: int
+    liked: bool
+    likes_count: int
+
+class GroupMembership(BaseModel):
+    group_id: int
+    is_member: bool
+    member_count: int
@@ -9,6 +9,9 @@ class ExerciseCompletedBase(BaseModel):
 class ExerciseCompletedCreate(ExerciseCompletedBase):
     pass
 
+class ExerciseCompletedBatchItem(ExerciseCompletedBase):
+    completed_at: Optional[datetime] = None  # When completed on the device; defaults to upload time
+
 class ExerciseCompleted(ExerciseCompletedBase):
     id: int
     user_id: int
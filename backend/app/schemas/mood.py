@@ -9,6 +9,9 @@ class MoodLogBase(BaseModel):
 class MoodLogCreate(MoodLogBase):
     pass
 
+class MoodLogBatchItem(MoodLogBase):
+    created_at: Optional[datetime] = None  # When logged on the device; defaults to upload time
+
 class MoodLog(MoodLogBase):
     id: int
     user_id: int
@@ -22,3 +25,10 @@ class MoodStats(BaseModel):
     streak: int
     weekly_trend: List[int]
     mood_distribution: dict
+
+class MoodInsight(BaseModel):
+    content: str
+    entry_count: int  # Entries logged when the insight was generated
+    generated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
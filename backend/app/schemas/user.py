@@ -24,10 +24,25 @@ class User(UserBase):
 
     model_config = ConfigDict(from_attributes=True)
 
+class Identity(BaseModel):
+    """Who the bearer token belongs to: the `users` columns most endpoints need."""
+    id: int
+    email: EmailStr
+    name: Optional[str] = None
+    timezone: Optional[str] = "UTC"
+    onboarding_completed: Optional[bool] = False
+    updated_at: Optional[datetime] = None  # Keys the user's compiled chat prompt
+
+    model_config = ConfigDict(from_attributes=True)
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     refresh_token: str
 
+class TokenRefresh(BaseModel):
+    refresh_token: str
+
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
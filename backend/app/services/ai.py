@@ -1,78 +1,268 @@
+import asyncio
 import os
-from groq import Groq
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+import httpx
+from groq import AsyncGroq, DefaultAsyncHttpxClient
 from dotenv import load_dotenv
+from app.core import metrics, rate_limit
+from app.core.rate_limit import RateLimited
+from app.services import llm_cache, llm_scheduler, prompts
 
 load_dotenv()
 
-client = Groq(
+CHAT_MODEL = "moonshotai/kimi-k2-instruct-0905"
+INSIGHTS_MODEL = "llama-3.3-70b-versatile"
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "llama-3.1-8b-instant")
+FALLBACK_RESPONSE = "I'm having a little trouble connecting right now, but I'm here for you. Can we try again in a moment?"
+INSIGHTS_FALLBACK = "Keep tracking your mood to see more insights!"
+CHAT_PARAMS = {"temperature": 0.7, "max_tokens": 1024}
+INSIGHTS_PARAMS = {"temperature": 0.7, "max_tokens": 200}
+
+# Upper bound on completions in flight at once; extra calls wait for a slot.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 16))
+# How long a call may wait for a free slot before giving up.
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 10))
+# The provider's tokens-per-minute quota for our key (0 = not enforced here).
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 0))
+# Calls one user (or background kind) may have waiting for a slot.
+LLM_MAX_QUEUED_PER_FLOW = int(os.getenv("LLM_MAX_QUEUED_PER_FLOW", 2))
+# Share of LLM capacity per kind when queueing; background work yields to chat.
+KIND_WEIGHTS = {"chat": 1.0, "chat_stream": 1.0, "insights": 0.5, "summary": 0.25}
+# Total time allowed for one non-streaming completion.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 30))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 32))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 1))
+# Point at benchmarks/fake_groq.py (e.g. http://127.0.0.1:8090) for load tests.
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# Shared by every request so connections to Groq are pooled and kept alive.
+async_client = AsyncGroq(
     api_key=os.environ.get("GROQ_API_KEY"),
+    base_url=GROQ_BASE_URL,
+    timeout=LLM_TIMEOUT_SECONDS,
+    max_retries=LLM_MAX_RETRIES,
+    http_client=DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=LLM_MAX_CONNECTIONS,
+        ),
+    ),
+)
+
+scheduler = llm_scheduler.FairScheduler(
+    LLM_MAX_CONCURRENCY,
+    rate_limit.Rate(LLM_TOKENS_PER_MINUTE, 60) if LLM_TOKENS_PER_MINUTE > 0 else None,
+    rate_limit.buckets,
+    LLM_MAX_QUEUED_PER_FLOW,
+)
+
+metrics.Gauge(
+    "neeva_llm_slots",
+    "LLM concurrency slots; waiting > 0 means completions are queueing.",
+    lambda: {
+        ("in_use",): scheduler.in_flight,
+        ("waiting",): scheduler.waiting,
+        ("capacity",): LLM_MAX_CONCURRENCY,
+    },
+    labelnames=("state",),
 )
 
-def get_personalized_system_prompt(user_data: dict) -> str:
-    """Generate a personalized system prompt based on user's onboarding data."""
-    base_prompt = """You are Neeva, a compassionate, empathetic, and supportive AI mental wellness companion for young Indians.
-Your goal is to provide a safe space for users to express their feelings.
-- Listen actively and validate their emotions.
-- Offer gentle, evidence-based CBT (Cognitive Behavioral Therapy) guidance.
-- Keep responses concise, warm, and conversational.
-- Do NOT provide medical advice. If a user seems to be in crisis, gently encourage them to seek professional help or use the emergency resources.
-- Use simple, relatable language.
-"""
-    
-    # Add personalization based on onboarding data
-    if user_data:
-        personalization = "\n\nUser Context:\n"
-        
-        if user_data.get('goals'):
-            goals = user_data.get('goals', [])
-            if goals:
-                personalization += f"- The user wants to work on: {', '.join(goals)}\n"
-        
-        if user_data.get('communication_style'):
-            style = user_data.get('communication_style')
-            personalization += f"- Preferred communication style: {style}\n"
-        
-        if user_data.get('sleep_quality'):
-            sleep = user_data.get('sleep_quality')
-            personalization += f"- Current sleep quality: {sleep}\n"
-        
-        personalization += "\nTailor your responses to address these specific needs and preferences."
-        base_prompt += personalization
-    
-    return base_prompt
-
-def get_chat_response(message_history: list, user_data: dict = None) -> str:
+@asynccontextmanager
+async def _completion_slot(model: str, kind: str, messages: list, max_tokens: int, user_id: int = None):
+    """Hold a scheduler slot for one completion and record its latency and errors.
+
+    Yields the `llm_scheduler.Grant`; pass the provider's usage to
+    `_record_usage(..., grant)` so unused reserved tokens go back to the budget.
+    Raises `RateLimited` if the call is not admitted in time.
+    """
+    reserved = sum(prompts.count_tokens(msg["content"]) + prompts.MESSAGE_OVERHEAD_TOKENS for msg in messages) + max_tokens
+    flow = f"user:{user_id}" if user_id is not None else kind
+    try:
+        grant = await scheduler.acquire(flow, reserved, KIND_WEIGHTS.get(kind, 1.0), LLM_QUEUE_TIMEOUT_SECONDS)
+    except RateLimited:
+        metrics.LLM_ERRORS.inc(model=model, kind=kind, error="QueueTimeout")
+        raise
+    start = time.perf_counter()
     try:
-        system_prompt = get_personalized_system_prompt(user_data or {})
-        messages = [{"role": "system", "content": system_prompt}] + message_history
-        
-        chat_completion = client.chat.completions.create(
-            messages=messages,
-            model="moonshotai/kimi-k2-instruct-0905",
-            temperature=0.7,
-            max_tokens=1024,
-        )
-        return chat_completion.choices[0].message.content
+        yield grant
     except Exception as e:
-        print(f"Error generating AI response: {e}")
-        return "I'm having a little trouble connecting right now, but I'm here for you. Can we try again in a moment?"
+        metrics.LLM_ERRORS.inc(model=model, kind=kind, error=type(e).__name__)
+        raise
+    else:
+        metrics.LLM_REQUEST_DURATION.observe(time.perf_counter() - start, model=model, kind=kind)
+    finally:
+        await scheduler.release(grant)
+
+async def close_clients() -> None:
+    await async_client.close()
+
+def _build_chat_messages(message_history: list, system_prompt: str, conversation_summary: str = None) -> list:
+    # Most stable first: template base + user context, then the summary, then turns.
+    messages = [{"role": "system", "content": system_prompt}]
+    history_tokens = sum(
+        prompts.count_tokens(msg["content"]) + prompts.MESSAGE_OVERHEAD_TOKENS for msg in message_history
+    )
+    system_tokens = prompts.count_tokens(system_prompt) + prompts.MESSAGE_OVERHEAD_TOKENS
+    summary_tokens = 0
+    if conversation_summary:
+        summary_message = f"Summary of the earlier conversation:\n{conversation_summary}"
+        messages.append({"role": "system", "content": summary_message})
+        summary_tokens = prompts.count_tokens(summary_message) + prompts.MESSAGE_OVERHEAD_TOKENS
+    metrics.PROMPT_TOKENS.observe(system_tokens, segment="system")
+    metrics.PROMPT_TOKENS.observe(summary_tokens, segment="summary")
+    metrics.PROMPT_TOKENS.observe(history_tokens, segment="history")
+    metrics.PROMPT_TOKENS.observe(system_tokens + summary_tokens + history_tokens, segment="total")
+    return messages + message_history
+
+def _record_usage(model: str, usage, grant: llm_scheduler.Grant = None) -> None:
+    if usage is None:
+        return
+    metrics.LLM_USAGE_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+    metrics.LLM_USAGE_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+    if grant is not None:
+        grant.record((usage.prompt_tokens or 0) + (usage.completion_tokens or 0))
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    if cached:
+        metrics.LLM_USAGE_TOKENS.inc(cached, model=model, kind="cached_prompt")
 
-def get_mood_insights(mood_logs: list) -> str:
+def _build_summary_messages(previous_summary: str, transcript: list) -> list:
+    lines = "\n".join(f"{msg['role']}: {msg['content']}" for msg in transcript)
+    prompt = (
+        f"Current summary:\n{previous_summary or '(none yet)'}\n\n"
+        f"New messages to fold in:\n{lines}"
+    )
+    return [
+        {"role": "system", "content": "You maintain a running summary of a conversation between a user and Neeva, a mental wellness companion. Rewrite the summary to include the new messages. Keep the user's feelings, key events, goals and anything Neeva suggested. Be brief and factual, third person, no advice."},
+        {"role": "user", "content": prompt}
+    ]
+
+def _build_mood_insights_messages(mood_logs: list) -> list:
     # Construct a prompt based on recent mood logs
     prompt = "Analyze these recent mood entries and provide a brief, encouraging insight:\n"
     for log in mood_logs:
         prompt += f"- Mood: {log.mood_level}/5, Note: {log.notes}\n"
-        
+    return [
+        {"role": "system", "content": "You are a helpful mood analyst. Provide short, warm, and actionable insights based on mood patterns."},
+        {"role": "user", "content": prompt}
+    ]
+
+async def get_chat_response_async(
+    message_history: list, system_prompt: str, conversation_summary: str = None, user_id: int = None
+) -> str:
+    """Neeva's reply to the conversation, admitted by the fair scheduler.
+
+    `system_prompt` is the user's compiled prompt (`prompts.chat_system_prompt`).
+    Answered from `llm_cache` when the same prompt was seen recently. Raises
+    `RateLimited` when the scheduler turns the call away; other errors give the
+    fallback reply (which is not cached).
+    """
+    messages = _build_chat_messages(message_history, system_prompt, conversation_summary)
+    cached = await llm_cache.lookup("chat", CHAT_MODEL, CHAT_PARAMS, messages)
+    if cached.content is not None:
+        return cached.content
+    try:
+        async with _completion_slot(CHAT_MODEL, "chat", messages, CHAT_PARAMS["max_tokens"], user_id) as grant:
+            async with asyncio.timeout(LLM_TIMEOUT_SECONDS):
+                chat_completion = await async_client.chat.completions.create(
+                    messages=messages,
+                    model=CHAT_MODEL,
+                    **CHAT_PARAMS,
+                )
+            _record_usage(CHAT_MODEL, getattr(chat_completion, "usage", None), grant)
+        content = chat_completion.choices[0].message.content
+    except RateLimited:
+        raise
+    except Exception as e:
+        print(f"Error generating AI response: {e!r}")
+        return FALLBACK_RESPONSE
+    await cached.store(content, grant.used)
+    return content
+
+async def stream_chat_response(
+    message_history: list, system_prompt: str, conversation_summary: str = None, user_id: int = None
+) -> AsyncIterator[str]:
+    """Yield the assistant reply token by token as Groq streams it back.
+
+    If the completion cannot be started at all the fallback message is yielded
+    as a single chunk, mirroring `get_chat_response_async`. Errors after the first
+    token propagate so the caller can tell the client the reply was cut short.
+    The scheduler slot is held until the stream is exhausted or closed;
+    `RateLimited` is raised if it is not granted. A cached reply is yielded as
+    a single chunk, and a reply streamed to the end is cached.
+    """
+    started = False
+    parts = []
+    messages = _build_chat_messages(message_history, system_prompt, conversation_summary)
+    cached = await llm_cache.lookup("chat", CHAT_MODEL, CHAT_PARAMS, messages)
+    if cached.content is not None:
+        yield cached.content
+        return
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a helpful mood analyst. Provide short, warm, and actionable insights based on mood patterns."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=200,
-        )
-        return chat_completion.choices[0].message.content
+        async with _completion_slot(CHAT_MODEL, "chat_stream", messages, CHAT_PARAMS["max_tokens"], user_id) as grant:
+            stream = await async_client.chat.completions.create(
+                messages=messages,
+                model=CHAT_MODEL,
+                **CHAT_PARAMS,
+                stream=True,
+            )
+            try:
+                async for chunk in stream:
+                    # Groq reports usage on the final chunk of a stream.
+                    x_groq = getattr(chunk, "x_groq", None)
+                    if x_groq is not None:
+                        _record_usage(CHAT_MODEL, getattr(x_groq, "usage", None), grant)
+                    if not chunk.choices:
+                        continue
+                    token = chunk.choices[0].delta.content
+                    if token:
+                        started = True
+                        parts.append(token)
+                        yield token
+            finally:
+                await stream.close()
     except Exception as e:
-        return "Keep tracking your mood to see more insights!"
+        if started or isinstance(e, RateLimited):
+            raise
+        print(f"Error starting AI response stream: {e!r}")
+        yield FALLBACK_RESPONSE
+        return
+    await cached.store("".join(parts), grant.used)
+
+async def generate_mood_insights_async(mood_logs: list) -> str:
+    """A short insight on the given mood logs. Raises on failure, for jobs that retry."""
+    messages = _build_mood_insights_messages(mood_logs)
+    cached = await llm_cache.lookup("insights", INSIGHTS_MODEL, INSIGHTS_PARAMS, messages)
+    if cached.content is not None:
+        return cached.content
+    async with _completion_slot(INSIGHTS_MODEL, "insights", messages, INSIGHTS_PARAMS["max_tokens"]) as grant:
+        async with asyncio.timeout(LLM_TIMEOUT_SECONDS):
+            chat_completion = await async_client.chat.completions.create(
+                messages=messages,
+                model=INSIGHTS_MODEL,
+                **INSIGHTS_PARAMS,
+            )
+        _record_usage(INSIGHTS_MODEL, getattr(chat_completion, "usage", None), grant)
+    content = chat_completion.choices[0].message.content
+    await cached.store(content, grant.used)
+    return content
+
+async def summarize_conversation_async(previous_summary: str, transcript: list, max_tokens: int = 400) -> str:
+    """Fold `transcript` ({role, content} dicts, oldest first) into the running summary.
+
+    Unlike the chat helpers this raises on failure, so the caller can keep the
+    old summary and retry later instead of storing a fallback message.
+    """
+    messages = _build_summary_messages(previous_summary, transcript)
+    async with _completion_slot(SUMMARY_MODEL, "summary", messages, max_tokens) as grant:
+        async with asyncio.timeout(LLM_TIMEOUT_SECONDS):
+            chat_completion = await async_client.chat.completions.create(
+                messages=messages,
+                model=SUMMARY_MODEL,
+                temperature=0.3,
+                max_tokens=max_tokens,
+            )
+        _record_usage(SUMMARY_MODEL, getattr(chat_completion, "usage", None), grant)
+    return chat_completion.choices[0].message.content.strip()
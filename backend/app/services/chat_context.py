@@ -0,0 +1,142 @@
+"""Builds the conversation context sent to the chat model.
+
+The most recent turns are packed newest-first into CHAT_CONTEXT_TOKEN_BUDGET
+tokens. Turns older than that are represented by a per-user rolling summary
+(`chat_summaries`), which `update_summary` extends incrementally in the
+background once a reply has gone out, so summarization never adds latency to
+the request itself.
+"""
+import os
+from dataclasses import dataclass
+from typing import List, Set
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.models import ChatMessage, ChatSummary
+from app.services import ai
+from app.services.prompts import MESSAGE_OVERHEAD_TOKENS, count_tokens
+
+# Prompt tokens available for the summary plus recent turns.
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 2000))
+# Upper bound on recent turns considered per request, whatever their size.
+CHAT_CONTEXT_MAX_MESSAGES = int(os.getenv("CHAT_CONTEXT_MAX_MESSAGES", 40))
+CHAT_SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_SUMMARY_MAX_TOKENS", 400))
+# Older turns folded into the summary per background update.
+CHAT_SUMMARY_BATCH_MESSAGES = int(os.getenv("CHAT_SUMMARY_BATCH_MESSAGES", 50))
+
+def message_tokens(content: str) -> int:
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+@dataclass
+class ConversationContext:
+    messages: List[dict]  # {"role", "content"}, oldest first
+    summary: str
+    token_count: int
+    oldest_message_id: int
+    # Older turns exist that are neither in `messages` nor in the summary yet.
+    has_unsummarized_overflow: bool
+
+# Users whose summary this process is updating; a second update is skipped.
+_updating: Set[int] = set()
+
+def recent_turns_query(user_id: int, summarized_through_id: int):
+    """Newest turns not yet in the summary, plus one to detect overflow."""
+    return (
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+        .where(ChatMessage.user_id == user_id, ChatMessage.id > summarized_through_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        .limit(CHAT_CONTEXT_MAX_MESSAGES + 1)
+    )
+
+def summary_batch_query(user_id: int, summarized_through_id: int, before_id: int):
+    """The oldest turns not yet in the summary, up to the context window."""
+    return (
+        select(ChatMessage.id, ChatMessage.role, ChatMessage.content)
+        .where(
+            ChatMessage.user_id == user_id,
+            ChatMessage.id > summarized_through_id,
+            ChatMessage.id < before_id,
+        )
+        .order_by(ChatMessage.created_at, ChatMessage.id)
+        .limit(CHAT_SUMMARY_BATCH_MESSAGES)
+    )
+
+async def build_context(db: AsyncSession, user_id: int) -> ConversationContext:
+    summary_row = await db.get(ChatSummary, user_id)
+    summary = summary_row.summary if summary_row else ""
+    summarized_through_id = summary_row.summarized_through_id if summary_row else 0
+    summary_tokens = count_tokens(summary) if summary else 0
+
+    result = await db.execute(recent_turns_query(user_id, summarized_through_id))
+    rows = result.all()
+
+    budget = max(0, CHAT_CONTEXT_TOKEN_BUDGET - summary_tokens)
+    kept, used = [], 0
+    for row in rows[:CHAT_CONTEXT_MAX_MESSAGES]:
+        cost = message_tokens(row.content)
+        # The newest message (the user's turn) is always sent.
+        if kept and used + cost > budget:
+            break
+        kept.append(row)
+        used += cost
+    kept.reverse()
+
+    return ConversationContext(
+        messages=[{"role": row.role, "content": row.content} for row in kept],
+        summary=summary,
+        token_count=used + summary_tokens,
+        oldest_message_id=kept[0].id if kept else 0,
+        has_unsummarized_overflow=len(rows) > len(kept),
+    )
+
+async def update_summary(user_id: int) -> None:
+    """Fold the next batch of turns that fell out of the window into the summary.
+
+    Runs after the response. The summary and the batch are read up front and
+    no connection is held during the LLM call; the result is written only if
+    `summarized_through_id` has not moved meanwhile, so a concurrent update
+    (e.g. on another worker) wins and this one is dropped. A failed LLM call
+    leaves the old summary in place for the next turn to retry.
+    """
+    if user_id in _updating:
+        return
+    _updating.add(user_id)
+    try:
+        async with AsyncSessionLocal() as db:
+            context = await build_context(db, user_id)
+            if not context.has_unsummarized_overflow:
+                return
+            row = await db.get(ChatSummary, user_id)
+            previous = row.summary if row else ""
+            through_id = row.summarized_through_id if row else 0
+            result = await db.execute(summary_batch_query(user_id, through_id, context.oldest_message_id))
+            batch = result.all()
+        if not batch:
+            return
+
+        summary = await ai.summarize_conversation_async(
+            previous,
+            [{"role": msg.role, "content": msg.content} for msg in batch],
+            max_tokens=CHAT_SUMMARY_MAX_TOKENS,
+        )
+
+        async with AsyncSessionLocal() as db:
+            values = {"summary": summary, "summarized_through_id": batch[-1].id, "token_count": count_tokens(summary)}
+            if row is None:
+                db.add(ChatSummary(user_id=user_id, **values))
+                try:
+                    await db.commit()
+                except IntegrityError:
+                    await db.rollback()  # Another update created it first
+                return
+            await db.execute(
+                update(ChatSummary)
+                .where(ChatSummary.user_id == user_id, ChatSummary.summarized_through_id == through_id)
+                .values(**values)
+            )
+            await db.commit()
+    except Exception as e:
+        print(f"Chat summary update failed for user {user_id}: {e!r}")
+    finally:
+        _updating.discard(user_id)
@@ -0,0 +1,107 @@
+"""Denormalized community counters without hot-row contention.
+
+Likes, comments and group joins are stored as rows (`post_likes`,
+`post_comments`, `group_members`); inserts on different keys never wait on
+each other. The count columns are not touched in the request. Instead the
+net change per row is added to an in-process buffer, and `buffer` applies it
+every COUNTER_FLUSH_SECONDS with one batched UPDATE per column, in id order so
+flushes from several workers lock rows in the same order. A viral post's row
+is therefore updated at most once per interval per worker, however many
+likes it gets. Counts lag by up to one interval.
+
+Deltas not yet flushed are lost if the process dies; run
+`python -m scripts.reconcile_counters` to recompute the columns from the
+relation tables.
+"""
+import asyncio
+import os
+from typing import Dict, Optional
+from sqlalchemy import bindparam, update
+from app.core.database import AsyncSessionLocal
+from app.core.log import get_logger
+from app.models import CommunityGroup, CommunityPost
+
+COUNTER_FLUSH_SECONDS = float(os.getenv("COUNTER_FLUSH_SECONDS", 1.0))
+
+logger = get_logger("counters")
+
+# Counter name -> the column it maintains.
+COLUMNS = {
+    "likes": CommunityPost.__table__.c.likes_count,
+    "comments": CommunityPost.__table__.c.comment_count,
+    "members": CommunityGroup.__table__.c.member_count,
+}
+
+class CounterBuffer:
+    """Net per-row deltas waiting to be written, flushed by a background task."""
+
+    def __init__(self, flush_interval: float = COUNTER_FLUSH_SECONDS):
+        self.flush_interval = flush_interval
+        self._deltas: Dict[str, Dict[int, int]] = {name: {} for name in COLUMNS}
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, counter: str, row_id: int, delta: int = 1) -> None:
+        deltas = self._deltas[counter]
+        deltas[row_id] = deltas.get(row_id, 0) + delta
+
+    def pending(self, counter: str, row_id: int) -> int:
+        """Unflushed change for one row in this process."""
+        return self._deltas[counter].get(row_id, 0)
+
+    async def flush(self) -> int:
+        """Write all pending deltas in one transaction; returns rows updated."""
+        batch, self._deltas = self._deltas, {name: {} for name in COLUMNS}
+        if not any(batch.values()):
+            return 0
+        updated, committed = 0, False
+        try:
+            async with AsyncSessionLocal() as db:
+                conn = await db.connection()
+                for counter, deltas in batch.items():
+                    params = [{"row_id": row_id, "delta": delta} for row_id, delta in sorted(deltas.items()) if delta]
+                    if not params:
+                        continue
+                    column = COLUMNS[counter]
+                    table = column.table
+                    await conn.execute(
+                        update(table)
+                        .where(table.c.id == bindparam("row_id"))
+                        .values({column.key: column + bindparam("delta")}),
+                        params,
+                    )
+                    updated += len(params)
+                await db.commit()
+                committed = True
+        except BaseException:
+            if committed:
+                raise
+            # Keep the deltas for the next attempt.
+            for counter, deltas in batch.items():
+                for row_id, delta in deltas.items():
+                    self.add(counter, row_id, delta)
+            raise
+        return updated
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.warning("Final counter flush failed", exc_info=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.warning("Counter flush failed, will retry", exc_info=True)
+
+buffer = CounterBuffer()
@@ -0,0 +1,70 @@
+"""Cache of the first page of each community feed, as ready-to-send JSON.
+
+One entry per feed (the global feed and each group) holds its newest
+FEED_CACHE_POSTS posts plus one lookahead row, one line per post:
+`<next cursor> <post json>`. A first-page request for up to FEED_CACHE_POSTS
+posts is answered by joining the first `limit` lines, without touching the
+database or re-serializing. `create_post` writes new posts through to the
+cached feeds; the short TTL bounds staleness from anything that is not written
+through (concurrent writers racing on Redis, counters, deletes).
+"""
+import hashlib
+import os
+from typing import Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.pagination import encode_cursor, paginate
+from app.core.cache import create_cache
+from app.models import CommunityPost
+from app.schemas import CommunityPost as PostSchema
+
+FEED_CACHE_POSTS = int(os.getenv("FEED_CACHE_POSTS", 50))
+FEED_CACHE_TTL_SECONDS = float(os.getenv("FEED_CACHE_TTL_SECONDS", 30))
+FEED_CACHE_MAX_FEEDS = int(os.getenv("FEED_CACHE_MAX_FEEDS", 1000))
+
+cache = create_cache("feed", maxsize=FEED_CACHE_MAX_FEEDS)
+
+def feed_key(group_id: Optional[int]) -> str:
+    return f"group:{group_id}" if group_id else "all"
+
+def _line(post) -> bytes:
+    cursor = encode_cursor(post.created_at, post.id)
+    return cursor.encode() + b" " + PostSchema.model_validate(post).model_dump_json().encode()
+
+async def _load(db: AsyncSession, group_id: Optional[int]) -> bytes:
+    query = select(*[getattr(CommunityPost, name) for name in PostSchema.model_fields])
+    if group_id:
+        query = query.where(CommunityPost.group_id == group_id)
+    result = await db.execute(paginate(query, CommunityPost.created_at, CommunityPost.id, FEED_CACHE_POSTS))
+    entry = b"\n".join(_line(post) for post in result.all())
+    await cache.set(feed_key(group_id), entry, FEED_CACHE_TTL_SECONDS)
+    return entry
+
+async def first_page(db: AsyncSession, group_id: Optional[int], limit: int) -> Tuple[bytes, Optional[str]]:
+    """JSON body of the newest `limit` posts and the next-page cursor, if any.
+
+    `limit` must be between 1 and FEED_CACHE_POSTS.
+    """
+    entry = await cache.get(feed_key(group_id))
+    if entry is None:
+        entry = await _load(db, group_id)
+    lines = [line for line in entry.split(b"\n") if line]
+    next_cursor = None
+    if len(lines) > limit:
+        next_cursor = lines[limit - 1].split(b" ", 1)[0].decode()
+        lines = lines[:limit]
+    return b"[" + b",".join(line.split(b" ", 1)[1] for line in lines) + b"]", next_cursor
+
+def etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+async def add_post(post: CommunityPost) -> None:
+    """Write a newly committed post through to its group feed and the global feed."""
+    line = _line(post)
+    for key in (feed_key(post.group_id), feed_key(None)):
+        entry = await cache.get(key)
+        if entry is None:
+            # Not cached; the next read loads it with this post included.
+            continue
+        lines = [line] + [existing for existing in entry.split(b"\n") if existing]
+        await cache.set(key, b"\n".join(lines[:FEED_CACHE_POSTS + 1]), FEED_CACHE_TTL_SECONDS)
@@ -0,0 +1,237 @@
+"""Precomputed mood insights, generated by background workers.
+
+Creating a mood log enqueues a job (in the same transaction) once
+MOOD_INSIGHTS_EVERY_N_LOGS entries have arrived since the last insight, so
+`/mood/insights` only ever reads the stored result. The queue is the
+`insight_jobs` table: a partial unique index keeps at most one pending job per
+user, workers claim jobs with `FOR UPDATE SKIP LOCKED`, and failures are
+retried with exponential backoff. Jobs are deleted once they succeed; a job
+that fails INSIGHTS_MAX_ATTEMPTS times (including attempts whose worker died
+or hung past its lease) is marked failed and deleted after
+INSIGHTS_FAILED_RETENTION_DAYS.
+
+Workers run inside the API process (`pool`, started from the app lifespan,
+INSIGHTS_WORKERS of them) or out of process with
+`python -m scripts.insights_worker`; both claim from the same table, so they
+can be mixed. Set INSIGHTS_WORKERS=0 to leave all jobs to external workers.
+"""
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import AsyncSessionLocal
+from app.core.log import get_logger
+from app.models import InsightJob, MoodAggregate, MoodInsight, MoodLog
+from app.services import ai
+
+# Regenerate after this many new mood logs.
+MOOD_INSIGHTS_EVERY_N_LOGS = int(os.getenv("MOOD_INSIGHTS_EVERY_N_LOGS", 5))
+# Most recent logs shown to the model.
+MOOD_INSIGHTS_RECENT_LOGS = int(os.getenv("MOOD_INSIGHTS_RECENT_LOGS", 10))
+INSIGHTS_WORKERS = int(os.getenv("INSIGHTS_WORKERS", 2))
+# Idle workers look for new or retryable jobs this often.
+INSIGHTS_POLL_SECONDS = float(os.getenv("INSIGHTS_POLL_SECONDS", 2))
+INSIGHTS_MAX_ATTEMPTS = int(os.getenv("INSIGHTS_MAX_ATTEMPTS", 5))
+INSIGHTS_BACKOFF_SECONDS = float(os.getenv("INSIGHTS_BACKOFF_SECONDS", 10))
+INSIGHTS_BACKOFF_MAX_SECONDS = float(os.getenv("INSIGHTS_BACKOFF_MAX_SECONDS", 600))
+# A running job whose worker died is picked up again after this long.
+INSIGHTS_LEASE_SECONDS = float(os.getenv("INSIGHTS_LEASE_SECONDS", 120))
+# Failed jobs are kept this long for debugging, then purged by idle workers.
+INSIGHTS_FAILED_RETENTION_DAYS = float(os.getenv("INSIGHTS_FAILED_RETENTION_DAYS", 7))
+INSIGHTS_PURGE_INTERVAL_SECONDS = 3600
+
+logger = get_logger("insights")
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def backoff_seconds(attempts: int) -> float:
+    delay = min(INSIGHTS_BACKOFF_SECONDS * 2 ** (attempts - 1), INSIGHTS_BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+async def enqueue(db: AsyncSession, user_id: int) -> bool:
+    """Queue a regeneration unless one is already pending. The caller commits."""
+    try:
+        async with db.begin_nested():
+            db.add(InsightJob(user_id=user_id, status="pending", attempts=0, run_after=_now()))
+        return True
+    except IntegrityError:
+        return False
+
+async def enqueue_if_due(db: AsyncSession, user_id: int, entry_count: int) -> bool:
+    """Queue a regeneration if the user has enough new entries. The caller commits."""
+    insight = await db.get(MoodInsight, user_id)
+    if insight is not None and entry_count - insight.entry_count < MOOD_INSIGHTS_EVERY_N_LOGS:
+        return False
+    return await enqueue(db, user_id)
+
+async def claim_job() -> Optional[Tuple[int, int]]:
+    """Lease the next runnable job; returns `(job_id, user_id)`."""
+    now = _now()
+    async with AsyncSessionLocal() as db:
+        # A lease that expired on the last attempt means the job crashed or hung
+        # its worker every time; give up on it instead of leasing it again.
+        await db.execute(
+            update(InsightJob)
+            .where(
+                InsightJob.status == "running",
+                InsightJob.locked_until < now,
+                InsightJob.attempts >= INSIGHTS_MAX_ATTEMPTS,
+            )
+            .values(status="failed", locked_until=None, last_error="Lease expired on the final attempt")
+        )
+        result = await db.execute(
+            select(InsightJob)
+            .where(
+                or_(
+                    and_(InsightJob.status == "pending", InsightJob.run_after <= now),
+                    and_(InsightJob.status == "running", InsightJob.locked_until < now),
+                )
+            )
+            .order_by(InsightJob.run_after)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalars().first()
+        if job is None:
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=INSIGHTS_LEASE_SECONDS)
+        await db.commit()
+        return job.id, job.user_id
+
+async def purge_failed() -> int:
+    """Delete failed jobs older than INSIGHTS_FAILED_RETENTION_DAYS; returns how many."""
+    cutoff = _now() - timedelta(days=INSIGHTS_FAILED_RETENTION_DAYS)
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            delete(InsightJob).where(InsightJob.status == "failed", InsightJob.created_at < cutoff)
+        )
+        await db.commit()
+        return result.rowcount
+
+async def _load_inputs(user_id: int) -> Tuple[List[MoodLog], int]:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(MoodLog)
+            .where(MoodLog.user_id == user_id)
+            .order_by(MoodLog.created_at.desc(), MoodLog.id.desc())
+            .limit(MOOD_INSIGHTS_RECENT_LOGS)
+        )
+        logs = list(reversed(result.scalars().all()))
+        agg = await db.get(MoodAggregate, user_id)
+        return logs, agg.entry_count if agg else len(logs)
+
+async def _store(job_id: int, user_id: int, content: str, entry_count: int) -> None:
+    async with AsyncSessionLocal() as db:
+        insight = await db.get(MoodInsight, user_id)
+        if insight is None:
+            insight = MoodInsight(user_id=user_id)
+            db.add(insight)
+        insight.content = content
+        insight.entry_count = entry_count
+        insight.generated_at = _now()
+        await db.execute(delete(InsightJob).where(InsightJob.id == job_id))
+        await db.commit()
+
+async def _fail(job_id: int, error: Exception) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await db.get(InsightJob, job_id)
+        if job is None:
+            return
+        job.last_error = repr(error)
+        job.locked_until = None
+        if job.attempts >= INSIGHTS_MAX_ATTEMPTS:
+            job.status = "failed"
+            await db.commit()
+            return
+        job.status = "pending"
+        job.run_after = _now() + timedelta(seconds=backoff_seconds(job.attempts))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A newer job is already pending for this user and will cover it.
+            await db.rollback()
+            await db.execute(delete(InsightJob).where(InsightJob.id == job_id))
+            await db.commit()
+
+async def run_job(job_id: int, user_id: int) -> bool:
+    # Logs are read up front so no connection is held during the LLM call.
+    try:
+        logs, entry_count = await _load_inputs(user_id)
+        content = await ai.generate_mood_insights_async(logs) if logs else ai.INSIGHTS_FALLBACK
+        await _store(job_id, user_id, content, entry_count)
+        return True
+    except Exception as e:
+        logger.warning("Mood insights job %d failed for user %d", job_id, user_id, exc_info=True)
+        await _fail(job_id, e)
+        return False
+
+class WorkerPool:
+    """`concurrency` asyncio tasks draining the job table.
+
+    While jobs cannot be claimed (e.g. the database is down) the workers back
+    off exponentially and the failure is logged once, not on every poll.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float = INSIGHTS_POLL_SECONDS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+        self._next_purge = 0.0
+        self._claim_failures = 0
+
+    def start(self) -> None:
+        if self._tasks or self.concurrency <= 0:
+            return
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers instead of waiting for the next poll."""
+        self._wakeup.set()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                claimed = await claim_job()
+            except Exception:
+                self._claim_failures += 1
+                if self._claim_failures == 1:
+                    logger.warning("Mood insights workers could not claim a job, backing off", exc_info=True)
+                await self._sleep(backoff_seconds(self._claim_failures))
+                continue
+            if self._claim_failures:
+                logger.info("Mood insights workers claim jobs again after %d failed attempts", self._claim_failures)
+                self._claim_failures = 0
+            if claimed is not None:
+                await run_job(*claimed)
+                continue
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + INSIGHTS_PURGE_INTERVAL_SECONDS
+                try:
+                    await purge_failed()
+                except Exception:
+                    logger.warning("Mood insights workers could not purge failed jobs", exc_info=True)
+            await self._sleep(self.poll_interval)
+
+    async def _sleep(self, seconds: float) -> None:
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
+
+pool = WorkerPool(INSIGHTS_WORKERS)
@@ -0,0 +1,177 @@
+"""Cache of LLM completions, keyed by exactly what was sent to the provider.
+
+The key is a SHA-256 of the model, the sampling parameters and the messages,
+serialized canonically (sorted keys, runs of whitespace collapsed), so two
+requests that would produce the same prompt share an entry: the same mood-log
+window sent for insights, or a first "hi" from users with the same onboarding
+answers. Entries live in `app.core.cache` ("llm" namespace), so eviction is
+TTL + LRU in memory and TTL in Redis, where every worker shares them. A hit is
+returned without queueing for the scheduler or calling the provider.
+
+The optional semantic layer (LLM_CACHE_SEMANTIC=true) also answers first turns,
+a lone user message after the system prompt, from a stored reply to a similar
+message under the same model, parameters and system prompt. Similarity is the
+cosine of `embed` vectors, a hashed bag of words and word pairs standing in
+for a real embedding model; it is lexical, so keep the threshold high. The
+vectors are kept in-process even with the Redis backend.
+
+`neeva_llm_cache_lookups_total` counts hits, semantic hits and misses per kind;
+`neeva_llm_cache_saved_tokens_total` the provider tokens the hits did not spend.
+"""
+import hashlib
+import math
+import os
+import re
+import zlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import orjson
+from dotenv import load_dotenv
+from app.core import metrics
+from app.core.cache import create_cache
+from app.core.log import get_logger
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+# Kinds whose completions are cached (chat covers streamed replies too).
+LLM_CACHE_KINDS = set(os.getenv("LLM_CACHE_KINDS", "chat,insights").split(","))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 5000))
+LLM_CACHE_SEMANTIC = os.getenv("LLM_CACHE_SEMANTIC", "false").lower() == "true"
+LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", 0.9))
+LLM_CACHE_SEMANTIC_MAX_ENTRIES = int(os.getenv("LLM_CACHE_SEMANTIC_MAX_ENTRIES", 2000))
+
+EMBEDDING_DIMENSIONS = 1 << 18
+
+logger = get_logger("llm_cache")
+
+cache = create_cache("llm", maxsize=LLM_CACHE_MAX_ENTRIES)
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+def _digest(payload) -> str:
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+def request_key(model: str, params: dict, messages: list) -> str:
+    return _digest({
+        "model": model,
+        "params": params,
+        "messages": [[msg["role"], _normalize(msg["content"])] for msg in messages],
+    })
+
+def first_turn(messages: list) -> Optional[str]:
+    """The user's message if `messages` is system prompt(s) plus one user message."""
+    turns = [msg for msg in messages if msg["role"] != "system"]
+    if len(turns) == 1 and turns[0]["role"] == "user":
+        return turns[0]["content"]
+    return None
+
+def embed(text: str) -> Dict[int, float]:
+    """Sparse unit vector of hashed words and adjacent word pairs."""
+    words = re.findall(r"[a-z0-9']+", text.lower())
+    vector: Dict[int, float] = {}
+    for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        index = zlib.crc32(feature.encode()) % EMBEDDING_DIMENSIONS
+        vector[index] = vector.get(index, 0.0) + 1.0
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    return {index: value / norm for index, value in vector.items()} if norm else {}
+
+def _cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(value * b.get(index, 0.0) for index, value in a.items())
+
+class SemanticIndex:
+    """First-turn vectors -> cache key, LRU-bounded; searched linearly within a scope."""
+
+    def __init__(self, threshold: float = LLM_CACHE_SEMANTIC_THRESHOLD, maxsize: int = LLM_CACHE_SEMANTIC_MAX_ENTRIES):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        # cache key -> (scope, vector)
+        self._entries: "OrderedDict[str, Tuple[str, Dict[int, float]]]" = OrderedDict()
+
+    def nearest(self, scope: str, vector: Dict[int, float]) -> Optional[str]:
+        best, best_score = None, self.threshold
+        for key, (entry_scope, entry_vector) in self._entries.items():
+            if entry_scope == scope:
+                score = _cosine(vector, entry_vector)
+                if score >= best_score:
+                    best, best_score = key, score
+        if best is not None:
+            self._entries.move_to_end(best)
+        return best
+
+    def add(self, scope: str, vector: Dict[int, float], key: str) -> None:
+        if not vector:
+            return
+        self._entries[key] = (scope, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def discard(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+semantic = SemanticIndex() if LLM_CACHE_SEMANTIC else None
+
+class Lookup:
+    """Result of `lookup`: `content` on a hit; otherwise `store` the reply once it is complete."""
+
+    def __init__(self, key: Optional[str] = None, scope: str = None, vector: Dict[int, float] = None):
+        self.key = key
+        self.scope = scope
+        self.vector = vector
+        self.content: Optional[str] = None
+
+    async def store(self, content: str, tokens: Optional[float] = None) -> None:
+        if self.key is None or not content:
+            return
+        try:
+            await cache.set(self.key, orjson.dumps({"content": content, "tokens": tokens}), LLM_CACHE_TTL_SECONDS)
+        except Exception:
+            logger.warning("LLM cache write failed", exc_info=True)
+            return
+        if semantic is not None and self.vector is not None:
+            semantic.add(self.scope, self.vector, self.key)
+
+async def _get(key: str) -> Optional[dict]:
+    try:
+        raw = await cache.get(key)
+    except Exception:
+        logger.warning("LLM cache read failed", exc_info=True)
+        return None
+    return orjson.loads(raw) if raw is not None else None
+
+async def lookup(kind: str, model: str, params: dict, messages: list) -> Lookup:
+    """Look the request up; a miss returns a `Lookup` to store the reply through."""
+    if not LLM_CACHE_ENABLED or kind not in LLM_CACHE_KINDS:
+        return Lookup()
+    result = Lookup(request_key(model, params, messages))
+    entry = await _get(result.key)
+    outcome = "hit"
+
+    text = first_turn(messages) if semantic is not None else None
+    if entry is None and text is not None:
+        result.scope = _digest({
+            "model": model,
+            "params": params,
+            "system": [_normalize(msg["content"]) for msg in messages if msg["role"] == "system"],
+        })
+        result.vector = embed(text)
+        similar = semantic.nearest(result.scope, result.vector)
+        if similar is not None:
+            entry = await _get(similar)
+            outcome = "semantic_hit"
+            if entry is None:
+                semantic.discard(similar)  # Expired or evicted from the cache
+
+    if entry is None:
+        metrics.LLM_CACHE_LOOKUPS.inc(kind=kind, result="miss")
+        return result
+    metrics.LLM_CACHE_LOOKUPS.inc(kind=kind, result=outcome)
+    if entry.get("tokens"):
+        metrics.LLM_CACHE_SAVED_TOKENS.inc(entry["tokens"], model=model)
+    result.content = entry["content"]
+    return result
@@ -0,0 +1,165 @@
+"""Fair admission of LLM completions under a concurrency cap and a token budget.
+
+Completions are admitted in weighted fair queuing order rather than first
+come, first served. Each waiting call belongs to a flow (one per user for chat,
+one per background kind otherwise) and gets a virtual finish tag,
+`max(virtual clock, flow's previous finish) + cost / weight`. The call with the
+smallest tag goes next. A user firing many long prompts therefore only delays
+their own later calls, and everyone else keeps getting turns in proportion to
+their weight.
+
+Admission also needs the call's reserved tokens (prompt estimate plus
+max_tokens) from a tokens-per-minute bucket in `rate_limit.buckets`. With the
+Redis backend the budget is shared by every worker, like the provider's quota.
+Unused reservation is refunded when the call reports its usage. A flow may
+have only `max_queued_per_flow` calls waiting, and a call that cannot be
+admitted within its timeout raises `RateLimited`.
+"""
+import asyncio
+import heapq
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app.core import metrics
+from app.core.log import get_logger
+from app.core.rate_limit import Buckets, Rate, RateLimited
+
+BUDGET_KEY = "llm:tokens"
+
+logger = get_logger("llm_scheduler")
+
+@dataclass(order=True)
+class _Waiter:
+    finish: float
+    seq: int
+    start: float = field(compare=False)
+    flow: str = field(compare=False)
+    cost: float = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+
+class Grant:
+    """An admitted call; report the provider's token count with `record`."""
+
+    def __init__(self, reserved: float):
+        self.reserved = reserved
+        self.used: Optional[float] = None
+
+    def record(self, total_tokens: Optional[int]) -> None:
+        if total_tokens is not None:
+            self.used = total_tokens
+
+class FairScheduler:
+    def __init__(self, max_concurrency: int, budget: Optional[Rate], buckets: Buckets, max_queued_per_flow: int):
+        self.max_concurrency = max_concurrency
+        # Token budget, e.g. Rate(tokens_per_minute, 60); None leaves only concurrency and fairness.
+        self.budget = budget
+        self.buckets = buckets
+        self.max_queued_per_flow = max_queued_per_flow
+        self.in_flight = 0
+        self._queue: List[_Waiter] = []
+        self._queued: Dict[str, int] = {}
+        self._finish: Dict[str, float] = {}
+        self._virtual = 0.0
+        self._seq = itertools.count()
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._wakeup: Optional[asyncio.Task] = None
+
+    @property
+    def waiting(self) -> int:
+        return sum(self._queued.values())
+
+    async def acquire(self, flow: str, cost: float, weight: float, timeout: float) -> Grant:
+        if self.budget is not None:
+            # A reservation larger than the whole bucket could never be admitted.
+            cost = min(cost, self.budget.capacity)
+        if self._queued.get(flow, 0) >= self.max_queued_per_flow:
+            metrics.RATE_LIMITED.inc(scope="llm")
+            raise RateLimited(self._estimated_wait(), "llm")
+        if len(self._finish) > 10000:
+            self._forget_idle_flows()
+
+        start = max(self._virtual, self._finish.get(flow, 0.0))
+        waiter = _Waiter(start + cost / weight, next(self._seq), start, flow, cost, asyncio.get_running_loop().create_future())
+        self._finish[flow] = waiter.finish
+        self._queued[flow] = self._queued.get(flow, 0) + 1
+        heapq.heappush(self._queue, waiter)
+        await self._dispatch()
+        try:
+            await asyncio.wait_for(waiter.future, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Admitted in the same instant the wait ended; hand the slot back.
+                await self.release(Grant(cost))
+            else:
+                waiter.future.cancel()
+                self._dequeued(flow)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            metrics.RATE_LIMITED.inc(scope="llm")
+            raise RateLimited(self._estimated_wait(), "llm") from None
+        return Grant(cost)
+
+    async def release(self, grant: Grant) -> None:
+        self.in_flight -= 1
+        if self.budget is not None and grant.used is not None and grant.used < grant.reserved:
+            try:
+                await self.buckets.take(BUDGET_KEY, self.budget, grant.used - grant.reserved)
+            except Exception:
+                logger.warning("LLM token budget refund failed", exc_info=True)
+        await self._dispatch()
+
+    async def _dispatch(self) -> None:
+        async with self._lock:
+            while self._queue and self.in_flight < self.max_concurrency:
+                head = self._queue[0]
+                if head.future.done():  # Timed out or cancelled
+                    heapq.heappop(self._queue)
+                    continue
+                if self.budget is not None:
+                    wait = await self.buckets.take(BUDGET_KEY, self.budget, head.cost)
+                    if wait:
+                        self._wake_after(wait)
+                        return
+                heapq.heappop(self._queue)
+                if head.future.done():
+                    # Gave up while the budget was being checked; return its tokens.
+                    if self.budget is not None:
+                        await self.buckets.take(BUDGET_KEY, self.budget, -head.cost)
+                    continue
+                self._virtual = max(self._virtual, head.start)
+                self.in_flight += 1
+                self._dequeued(head.flow)
+                head.future.set_result(None)
+
+    def _dequeued(self, flow: str) -> None:
+        self._queued[flow] -= 1
+        if not self._queued[flow]:
+            del self._queued[flow]
+
+    def _wake_after(self, delay: float) -> None:
+        loop = asyncio.get_running_loop()
+        when = loop.time() + delay
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return  # An earlier wake-up is already pending
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._wake)
+
+    def _wake(self) -> None:
+        self._timer = None
+        # Keep a reference so the task is not garbage collected mid-run.
+        self._wakeup = asyncio.get_running_loop().create_task(self._dispatch())
+
+    def _estimated_wait(self) -> float:
+        """Rough Retry-After: time for the budget to cover everything queued."""
+        if self.budget is None:
+            return 1.0
+        queued = sum(waiter.cost for waiter in self._queue if not waiter.future.done())
+        return max(1.0, queued / self.budget.per_second)
+
+    def _forget_idle_flows(self) -> None:
+        # A flow whose last finish tag is behind the clock would restart at the clock anyway.
+        for flow, finish in list(self._finish.items()):
+            if finish <= self._virtual and flow not in self._queued:
+                del self._finish[flow]
@@ -0,0 +1,138 @@
+"""Incrementally maintained mood statistics (the `mood_aggregates` table).
+
+`record_mood_log` folds one new entry into the user's aggregate row inside the
+caller's transaction, so `/mood/stats` is a single primary-key read no matter
+how much history a user has. `rebuild_user` recomputes a row from `mood_logs`;
+it backs the rebuild command and heals users that have no row yet. Day
+boundaries follow the user's timezone, so a change of timezone needs a rebuild.
+
+Every writer first makes sure the row exists (`INSERT ... ON CONFLICT DO
+NOTHING`) and then locks it, so concurrent first entries and rebuilds queue on
+the row instead of racing to insert it.
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import MoodAggregate
+from app.services import stats
+from app.services.stats import WEEKLY_TREND_DAYS, user_zone
+
+MOOD_LEVELS = (1, 2, 3, 4, 5)
+
+def local_date(moment: datetime, tz_name: Optional[str]) -> date:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(user_zone(tz_name)).date()
+
+def _apply(agg: MoodAggregate, mood_level: int, day: date) -> None:
+    agg.entry_count += 1
+    agg.mood_sum += mood_level
+    if mood_level in MOOD_LEVELS:
+        column = f"level_{mood_level}_count"
+        setattr(agg, column, getattr(agg, column) + 1)
+
+    # Only the window needed for weekly_trend is kept.
+    oldest = (day - timedelta(days=WEEKLY_TREND_DAYS - 1)).isoformat()
+    buckets = {k: v for k, v in (agg.daily_buckets or {}).items() if k >= oldest}
+    mood_sum, count = buckets.get(day.isoformat(), [0, 0])
+    buckets[day.isoformat()] = [mood_sum + mood_level, count + 1]
+    # Reassigned rather than mutated so the JSON column is flagged dirty.
+    agg.daily_buckets = buckets
+
+    last = agg.last_logged_date
+    if last is None or day > last + timedelta(days=1):
+        agg.current_streak = 1
+    elif day == last + timedelta(days=1):
+        agg.current_streak += 1
+    if last is None or day > last:
+        agg.last_logged_date = day
+
+async def _lock(db: AsyncSession, user_id: int) -> Tuple[MoodAggregate, bool]:
+    """Lock the user's aggregate row, creating an empty one if there is none.
+
+    Returns the row and whether it was just created (and so still needs to be
+    built from history).
+    """
+    created = await db.scalar(
+        insert(MoodAggregate)
+        .values(user_id=user_id)
+        .on_conflict_do_nothing(index_elements=[MoodAggregate.user_id])
+        .returning(MoodAggregate.user_id)
+    )
+    result = await db.execute(
+        select(MoodAggregate)
+        .where(MoodAggregate.user_id == user_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().one(), created is not None
+
+async def record_mood_log(
+    db: AsyncSession, user_id: int, mood_level: int, tz_name: Optional[str], logged_at: Optional[datetime] = None
+) -> MoodAggregate:
+    """Add one new entry to the user's aggregate. The caller commits."""
+    agg, created = await _lock(db, user_id)
+    if created:
+        # First entry, or a user from before aggregates existed: build the row
+        # from history, which already includes the pending log once flushed.
+        await db.flush()
+        return await _rebuild(db, agg, tz_name)
+    _apply(agg, mood_level, local_date(logged_at or datetime.now(timezone.utc), tz_name))
+    return agg
+
+async def record_mood_logs(
+    db: AsyncSession, user_id: int, entries: Sequence[Tuple[int, datetime]], tz_name: Optional[str]
+) -> MoodAggregate:
+    """Add several `(mood_level, logged_at)` entries, already inserted, to the aggregate. The caller commits.
+
+    Entries older than the user's last logged day (offline backfill) can
+    change the streak, so the row is rebuilt from history in that case.
+    """
+    agg, created = await _lock(db, user_id)
+    days = sorted((local_date(logged_at, tz_name), mood_level) for mood_level, logged_at in entries)
+    if created or (agg.last_logged_date is not None and days[0][0] < agg.last_logged_date):
+        await db.flush()
+        return await _rebuild(db, agg, tz_name)
+    for day, mood_level in days:
+        _apply(agg, mood_level, day)
+    return agg
+
+async def rebuild_user(db: AsyncSession, user_id: int, tz_name: Optional[str]) -> MoodAggregate:
+    """Recompute the user's aggregate from `mood_logs` in one query. The caller commits."""
+    agg, _ = await _lock(db, user_id)
+    return await _rebuild(db, agg, tz_name)
+
+async def _rebuild(db: AsyncSession, agg: MoodAggregate, tz_name: Optional[str]) -> MoodAggregate:
+    summary = await stats.mood_summary(db, agg.user_id, tz_name)
+    agg.entry_count = summary["total"]
+    agg.mood_sum = summary["value_sum"]
+    for level in MOOD_LEVELS:
+        setattr(agg, f"level_{level}_count", summary["distribution"].get(level, 0))
+    agg.daily_buckets = summary["daily_buckets"]
+    agg.last_logged_date = summary["last_active_day"]
+    agg.current_streak = summary["streak_length"]
+    return agg
+
+def to_stats(agg: MoodAggregate, tz_name: Optional[str], today: Optional[date] = None) -> dict:
+    """Shape an aggregate row like the `MoodStats` schema."""
+    today = today or datetime.now(user_zone(tz_name)).date()
+    buckets = agg.daily_buckets or {}
+    weekly_trend = []
+    for offset in range(WEEKLY_TREND_DAYS - 1, -1, -1):
+        mood_sum, count = buckets.get((today - timedelta(days=offset)).isoformat(), [0, 0])
+        weekly_trend.append(round(mood_sum / count) if count else 0)
+
+    # A streak survives until the end of the day after the last entry.
+    streak = agg.current_streak
+    if agg.last_logged_date is None or agg.last_logged_date < today - timedelta(days=1):
+        streak = 0
+
+    return {
+        "total_entries": agg.entry_count,
+        "average_mood": round(agg.mood_sum / agg.entry_count, 1) if agg.entry_count else 0,
+        "streak": streak,
+        "weekly_trend": weekly_trend,
+        "mood_distribution": {level: getattr(agg, f"level_{level}_count") for level in MOOD_LEVELS},
+    }
@@ -0,0 +1,109 @@
+"""Versioned system-prompt templates and per-user compiled prompts.
+
+A chat prompt is laid out so its prefix stays byte-identical for as long as
+possible, which is what provider-side prompt caching keys on: the template's
+static base (the same for every user) comes first, then the user's context
+block (the same for every turn of that user), then the conversation summary
+and history. Compiled prompts are kept per user, keyed on the template
+version and the user's `updated_at`, and dropped by `/users/onboarding`
+through `invalidate_user`.
+"""
+import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+CHAT_PROMPT_VERSION = os.getenv("CHAT_PROMPT_VERSION", "v1")
+PROMPT_CACHE_MAX_USERS = int(os.getenv("PROMPT_CACHE_MAX_USERS", 10000))
+
+# Role/formatting tokens the chat template adds around each message.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def count_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token).
+
+    We do not ship the hosted models' tokenizers; this estimate is only used
+    for budgeting and metrics, where being a little off is harmless.
+    """
+    return (len(text or "") + 3) // 4
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    name: str
+    version: str
+    base: str
+    user_context: Callable[[dict], str]
+
+    def render(self, user_data: Optional[dict]) -> str:
+        if not user_data:
+            return self.base
+        return self.base + self.user_context(user_data)
+
+TEMPLATES: Dict[Tuple[str, str], PromptTemplate] = {}
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    TEMPLATES[(template.name, template.version)] = template
+    return template
+
+def get_template(name: str, version: Optional[str] = None) -> PromptTemplate:
+    version = version or (CHAT_PROMPT_VERSION if name == "chat" else "v1")
+    try:
+        return TEMPLATES[(name, version)]
+    except KeyError:
+        raise LookupError(f"Unknown prompt template {name!r} version {version!r}")
+
+CHAT_BASE_V1 = """You are Neeva, a compassionate, empathetic, and supportive AI mental wellness companion for young Indians.
+Your goal is to provide a safe space for users to express their feelings.
+- Listen actively and validate their emotions.
+- Offer gentle, evidence-based CBT (Cognitive Behavioral Therapy) guidance.
+- Keep responses concise, warm, and conversational.
+- Do NOT provide medical advice. If a user seems to be in crisis, gently encourage them to seek professional help or use the emergency resources.
+- Use simple, relatable language.
+"""
+
+def _chat_user_context_v1(user_data: dict) -> str:
+    personalization = "\n\nUser Context:\n"
+    goals = user_data.get('goals')
+    if goals:
+        personalization += f"- The user wants to work on: {', '.join(goals)}\n"
+    if user_data.get('communication_style'):
+        personalization += f"- Preferred communication style: {user_data['communication_style']}\n"
+    if user_data.get('sleep_quality'):
+        personalization += f"- Current sleep quality: {user_data['sleep_quality']}\n"
+    personalization += "\nTailor your responses to address these specific needs and preferences."
+    return personalization
+
+register(PromptTemplate("chat", "v1", CHAT_BASE_V1, _chat_user_context_v1))
+
+# user_id -> (template version, profile stamp, compiled prompt)
+_compiled: "OrderedDict[int, Tuple[str, Optional[datetime], str]]" = OrderedDict()
+
+def cached_chat_system_prompt(user_id: int, stamp: Optional[datetime]) -> Optional[str]:
+    """The user's compiled chat prompt if it was compiled at profile version `stamp`, else None.
+
+    `stamp` is the user's `updated_at` as carried by their identity; a prompt
+    compiled from onboarding data another worker has since replaced is
+    recompiled once that worker's new `updated_at` reaches the identity.
+    """
+    entry = _compiled.get(user_id)
+    if entry is None or entry[0] != get_template("chat").version or entry[1] != stamp:
+        return None
+    _compiled.move_to_end(user_id)
+    return entry[2]
+
+def chat_system_prompt(
+    user_data: Optional[dict], user_id: Optional[int] = None, stamp: Optional[datetime] = None
+) -> str:
+    """Compile the user's chat system prompt, kept for `cached_chat_system_prompt` under `stamp`."""
+    template = get_template("chat")
+    prompt = template.render(user_data)
+    if user_id is not None:
+        _compiled[user_id] = (template.version, stamp, prompt)
+        _compiled.move_to_end(user_id)
+        while len(_compiled) > PROMPT_CACHE_MAX_USERS:
+            _compiled.popitem(last=False)
+    return prompt
+
+def invalidate_user(user_id: int) -> None:
+    _compiled.pop(user_id, None)
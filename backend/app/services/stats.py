@@ -0,0 +1,115 @@
+"""Single-round-trip SQL aggregations for per-user activity stats.
+
+Each summary is one statement: totals, per-level distribution (GROUP BY, mood only),
+recent daily buckets in the user's timezone (date_trunc) and the current
+streak (gaps-and-islands over distinct active days). Only the aggregated
+values come back; no ORM rows are loaded. The SQL is PostgreSQL-specific.
+"""
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import JSON, BigInteger, Date, Integer, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+WEEKLY_TREND_DAYS = 7
+
+def user_zone(tz_name: Optional[str]) -> ZoneInfo:
+    try:
+        return ZoneInfo(tz_name or "UTC")
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo("UTC")
+
+# {table}, {time_column} and {value_column} are fixed identifiers from the
+# callers below, never user input.
+_SUMMARY_SQL = """
+WITH entries AS (
+    SELECT {value_column} AS value,
+           CAST(date_trunc('day', {time_column} AT TIME ZONE :tz) AS date) AS day
+    FROM {table}
+    WHERE user_id = :user_id
+),
+islands AS (
+    SELECT day, day - CAST(ROW_NUMBER() OVER (ORDER BY day) AS integer) AS island
+    FROM (SELECT DISTINCT day FROM entries) AS active_days
+),
+latest_streak AS (
+    SELECT COUNT(*) AS length, MAX(day) AS last_day
+    FROM islands
+    GROUP BY island
+    ORDER BY MAX(day) DESC
+    LIMIT 1
+)
+SELECT
+    (SELECT COUNT(*) FROM entries) AS total,
+    (SELECT COALESCE(SUM(value), 0) FROM entries) AS value_sum,
+    {distribution} AS distribution,
+    (SELECT json_object_agg(day, json_build_array(value_sum, n))
+       FROM (SELECT day, SUM(value) AS value_sum, COUNT(*) AS n
+               FROM entries WHERE day >= :window_start GROUP BY day) AS recent) AS daily_buckets,
+    (SELECT length FROM latest_streak) AS streak_length,
+    (SELECT last_day FROM latest_streak) AS last_active_day
+"""
+
+# json_object_agg fails on a NULL key, so entries without a value are left out.
+_DISTRIBUTION_SQL = """(SELECT json_object_agg(value, n)
+       FROM (SELECT value, COUNT(*) AS n FROM entries WHERE value IS NOT NULL GROUP BY value) AS levels)"""
+
+_RESULT_TYPES = dict(
+    total=BigInteger,
+    value_sum=BigInteger,
+    distribution=JSON,
+    daily_buckets=JSON,
+    streak_length=Integer,
+    last_active_day=Date,
+)
+
+def _summary_statement(table: str, time_column: str, value_column: str, distribution: bool = False):
+    sql = _SUMMARY_SQL.format(
+        table=table,
+        time_column=time_column,
+        value_column=value_column,
+        distribution=_DISTRIBUTION_SQL if distribution else "NULL",
+    )
+    # Typed columns so json results are decoded the same way on every driver.
+    return text(sql).columns(**_RESULT_TYPES)
+
+MOOD_SUMMARY = _summary_statement("mood_logs", "created_at", "mood_level", distribution=True)
+EXERCISE_SUMMARY = _summary_statement("exercises_completed", "completed_at", "duration_completed")
+
+async def _summary(db: AsyncSession, statement, user_id: int, tz_name: Optional[str]) -> dict:
+    zone = user_zone(tz_name)
+    today = datetime.now(zone).date()
+    row = (
+        await db.execute(
+            statement,
+            {
+                "user_id": user_id,
+                "tz": zone.key,
+                "window_start": today - timedelta(days=WEEKLY_TREND_DAYS - 1),
+            },
+        )
+    ).mappings().one()
+    return {
+        "total": row["total"],
+        "value_sum": int(row["value_sum"]),
+        "distribution": {int(k): v for k, v in (row["distribution"] or {}).items()},
+        "daily_buckets": row["daily_buckets"] or {},
+        "streak_length": row["streak_length"] or 0,
+        "last_active_day": row["last_active_day"],
+        "today": today,
+    }
+
+async def mood_summary(db: AsyncSession, user_id: int, tz_name: Optional[str]) -> dict:
+    """Totals over `mood_logs`; `value_sum` is the sum of mood levels."""
+    return await _summary(db, MOOD_SUMMARY, user_id, tz_name)
+
+async def exercise_summary(db: AsyncSession, user_id: int, tz_name: Optional[str]) -> dict:
+    """Totals over `exercises_completed`; `value_sum` is seconds completed. No distribution."""
+    return await _summary(db, EXERCISE_SUMMARY, user_id, tz_name)
+
+def current_streak(summary: dict) -> int:
+    """The latest run of active days counts while it ends today or yesterday."""
+    last_active_day: Optional[date] = summary["last_active_day"]
+    if last_active_day is None or last_active_day < summary["today"] - timedelta(days=1):
+        return 0
+    return summary["streak_length"]
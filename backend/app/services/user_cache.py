@@ -0,0 +1,29 @@
+"""Cache of authenticated user identities, keyed by the token subject (email).
+
+`deps.get_current_user` reads from here before touching the users table.
+Anything that changes a user row must call `invalidate` after committing.
+"""
+import os
+from typing import Optional
+from app.core.cache import create_cache
+from app.schemas import Identity
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+
+cache = create_cache("user", maxsize=USER_CACHE_MAX_ENTRIES)
+
+async def get(subject: str) -> Optional[Identity]:
+    raw = await cache.get(subject)
+    if raw is None:
+        return None
+    return Identity.model_validate_json(raw)
+
+async def set(user) -> Identity:
+    """Cache the identity of `user` (a User row, or a row with at least the Identity columns)."""
+    identity = Identity.model_validate(user)
+    await cache.set(user.email, identity.model_dump_json().encode(), USER_CACHE_TTL_SECONDS)
+    return identity
+
+async def invalidate(subject: str) -> None:
+    await cache.delete(subject)
@@ -0,0 +1,69 @@
+"""Per-request authentication overhead, before and after the token cache.
+
+Times, per call:
+
+  jose decode        the old path: full signature verification every request
+  token miss         tokens.decode_token on a token it has not seen
+  token hit          tokens.decode_token on a cached token
+  get_current_user   the whole dependency with warm token and identity caches
+
+No database is touched (the identity cache is warmed directly):
+
+    python -m benchmarks.auth_benchmark --calls 20000
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from jose import jwt
+from app.api import deps
+from app.core import tokens
+from app.models import User
+from app.services import user_cache
+
+def _report(name: str, calls: int, elapsed: float) -> None:
+    print(f"{name:<18} {elapsed / calls * 1e6:>9.1f} us/call {calls / elapsed:>12,.0f} calls/s")
+
+def _time(func, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return time.perf_counter() - start
+
+async def _time_dependency(token: str, calls: int) -> float:
+    start = time.perf_counter()
+    for _ in range(calls):
+        await deps.get_current_user(db=None, token=token)
+    return time.perf_counter() - start
+
+def run(calls: int) -> None:
+    user = User(
+        id=1, email="bench@example.com", name="bench", timezone="UTC",
+        onboarding_completed=True, onboarding_data={}, created_at=datetime.now(timezone.utc),
+    )
+    token = tokens.create_access_token(user.email, user_id=user.id)
+    key = tokens.JWT_KEYS[tokens.JWT_ACTIVE_KID]
+
+    _report("jose decode", calls, _time(lambda: jwt.decode(token, key, algorithms=[tokens.ALGORITHM]), calls))
+
+    def miss():
+        tokens._verified.clear()
+        tokens.decode_token(token)
+    _report("token miss", calls, _time(miss, calls))
+
+    tokens.decode_token(token)
+    _report("token hit", calls, _time(lambda: tokens.decode_token(token), calls))
+
+    async def dependency() -> float:
+        await user_cache.set(user)
+        return await _time_dependency(token, calls)
+    _report("get_current_user", calls, asyncio.run(dependency()))
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+    run(args.calls)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Local stand-in for the Groq chat completions API, for load tests.
+
+Answers `POST /openai/v1/chat/completions` (plain and streaming) with filler
+text after a configurable time to first token, then at a fixed token rate, and
+reports usage the way Groq does (`usage`, or `x_groq.usage` on the last stream
+chunk). Start it, then run the API with GROQ_BASE_URL pointing at it:
+
+    python -m benchmarks.fake_groq --port 8090 --latency 0.4 --tokens-per-second 150
+    GROQ_BASE_URL=http://127.0.0.1:8090 uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "that sounds really hard and it makes sense you feel this way let us take "
+    "a slow breath together and notice what is here right now"
+).split()
+
+def _estimate_tokens(messages: list) -> int:
+    return sum(len(str(m.get("content") or "")) // 4 + 4 for m in messages)
+
+def create_app(latency: float, tokens_per_second: float, reply_tokens: int, jitter: float, error_rate: float) -> FastAPI:
+    app = FastAPI(title="fake-groq")
+    token_interval = 1 / tokens_per_second if tokens_per_second > 0 else 0.0
+
+    def _first_token_delay() -> float:
+        return max(latency * (1 + random.uniform(-jitter, jitter)), 0.0)
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        if error_rate and random.random() < error_rate:
+            return JSONResponse({"error": {"message": "fake overload", "type": "server_error"}}, status_code=503)
+
+        model = body.get("model", "fake")
+        n_tokens = min(reply_tokens, int(body.get("max_tokens") or reply_tokens))
+        words = [WORDS[i % len(WORDS)] for i in range(n_tokens)]
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": _estimate_tokens(body.get("messages", [])),
+            "completion_tokens": n_tokens,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if not body.get("stream"):
+            await asyncio.sleep(_first_token_delay() + n_tokens * token_interval)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": " ".join(words)},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            }
+
+        def chunk(delta: dict, finish_reason=None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            await asyncio.sleep(_first_token_delay())
+            yield chunk({"role": "assistant", "content": ""})
+            for i, word in enumerate(words):
+                yield chunk({"content": word if i == 0 else f" {word}"})
+                if token_interval:
+                    await asyncio.sleep(token_interval)
+            yield chunk({}, "stop", x_groq={"id": f"req_{uuid.uuid4().hex}", "usage": usage})
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.4, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=150)
+    parser.add_argument("--reply-tokens", type=int, default=80, help="Tokens per reply (capped by max_tokens)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative +/- spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 503")
+    args = parser.parse_args()
+    app = create_app(args.latency, args.tokens_per_second, args.reply_tokens, args.jitter, args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Password verification throughput for Argon2 parameter sets.
+
+For each `time_cost,memory_cost_kib,parallelism` set, hashes one password and
+then verifies it repeatedly through an executor of `--workers` threads (the
+same setup as `security.verify_password_async`) for `--seconds`. Reports
+single-verify latency, logins/sec and logins/sec per worker thread. With
+workers <= cores the last column is logins/sec per core. No database needed:
+
+    python -m benchmarks.hashing_benchmark
+    python -m benchmarks.hashing_benchmark --params 2,19456,1 --params 3,65536,4 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core import security
+
+DEFAULT_PARAMS = [
+    (2, 19456, 1),  # OWASP minimum for argon2id
+    (security.ARGON2_TIME_COST, security.ARGON2_MEMORY_COST, security.ARGON2_PARALLELISM),  # Current settings
+    (3, 65536, 1),
+    (4, 131072, 4),
+]
+
+def _parse_params(value: str) -> tuple:
+    time_cost, memory_cost, parallelism = (int(part) for part in value.split(","))
+    return time_cost, memory_cost, parallelism
+
+async def _throughput(context, stored_hash: str, workers: int, seconds: float) -> int:
+    loop = asyncio.get_running_loop()
+    deadline = time.perf_counter() + seconds
+    done = 0
+
+    async def login_loop(executor):
+        nonlocal done
+        while time.perf_counter() < deadline:
+            await loop.run_in_executor(executor, context.verify, "correct horse battery staple", stored_hash)
+            done += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        await asyncio.gather(*(login_loop(executor) for _ in range(workers)))
+    return done
+
+def run(param_sets: list, workers: int, seconds: float) -> None:
+    print(f"{workers} worker thread(s), {os.cpu_count()} CPU(s), {seconds:.0f}s per set")
+    print(f"{'t,m(KiB),p':>16} {'verify ms':>10} {'logins/s':>10} {'per worker':>11}")
+    for time_cost, memory_cost, parallelism in param_sets:
+        context = security.make_pwd_context(time_cost, memory_cost, parallelism)
+        stored_hash = context.hash("correct horse battery staple")
+        latencies = []
+        for _ in range(5):
+            start = time.perf_counter()
+            context.verify("correct horse battery staple", stored_hash)
+            latencies.append((time.perf_counter() - start) * 1000)
+        completed = asyncio.run(_throughput(context, stored_hash, workers, seconds))
+        per_second = completed / seconds
+        print(
+            f"{f'{time_cost},{memory_cost},{parallelism}':>16} {statistics.median(latencies):>10.1f} "
+            f"{per_second:>10.1f} {per_second / workers:>11.1f}"
+        )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--params", type=_parse_params, action="append", help="time_cost,memory_cost_kib,parallelism (repeatable)")
+    parser.add_argument("--workers", type=int, default=security.PASSWORD_HASH_WORKERS)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+    run(args.params or DEFAULT_PARAMS, args.workers, args.seconds)
+
+if __name__ == "__main__":
+    main()
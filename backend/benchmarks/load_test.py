@@ -0,0 +1,230 @@
+"""Load test the API and report p50/p95/p99 latency and throughput per endpoint.
+
+Run against a server started with the fake LLM (see benchmarks.fake_groq) and
+a database seeded by benchmarks.seed:
+
+    python -m benchmarks.fake_groq --port 8090 &
+    GROQ_BASE_URL=http://127.0.0.1:8090 uvicorn main:app --workers 4 &
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 \\
+        --users 200 --duration 60 --json results.json
+
+Virtual users each log in as a random seeded user, then loop over a weighted
+mix of mood, chat, exercise and community calls. A separate phase times
+registration. `--baseline old.json` compares against an earlier run and exits
+non-zero if any endpoint's p95 or throughput regressed by more than
+`--tolerance`, so it can gate a deploy. `--in-process` drives main.app over
+httpx's ASGI transport instead (no uvicorn, single process).
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+import httpx
+
+# Accounts created by benchmarks.seed (not imported: this runs without database access).
+SEEDED_EMAIL = "loadtest-{}@example.com"
+SEEDED_PASSWORD = "loadtest-password"
+
+# (name, weight) of the steady-state mix; chat is the expensive call.
+SCENARIOS = (
+    ("POST /mood", 10),
+    ("GET /mood", 15),
+    ("GET /mood/stats", 10),
+    ("POST /chat", 4),
+    ("GET /chat/history", 10),
+    ("POST /exercises", 5),
+    ("GET /exercises/stats", 8),
+    ("POST /community/posts", 3),
+    ("GET /community/posts", 15),
+)
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    async def call(self, name: str, request) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await request
+        except httpx.HTTPError:
+            if self.recording:
+                self.errors[name] += 1
+            raise
+        if self.recording:
+            self.latencies[name].append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                self.errors[name] += 1
+        return response
+
+def percentile(sorted_values: list, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(p / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    results = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies[name])
+        results[name] = {
+            "requests": len(values),
+            "errors": recorder.errors[name],
+            "rps": len(values) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    return results
+
+def print_table(title: str, results: dict) -> None:
+    print(f"\n{title}")
+    print(f"{'endpoint':<24} {'reqs':>7} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<24} {r['requests']:>7} {r['errors']:>6} {r['rps']:>8.1f} "
+            f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}"
+        )
+
+async def _login(client: httpx.AsyncClient, recorder: Recorder, seeded_users: int) -> dict:
+    response = await recorder.call("POST /auth/login", client.post(
+        "/api/auth/login", data={"username": SEEDED_EMAIL.format(random.randint(1, seeded_users)), "password": SEEDED_PASSWORD},
+    ))
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+async def _scenario(name: str, client: httpx.AsyncClient, recorder: Recorder, headers: dict, group_ids: list) -> None:
+    if name == "POST /mood":
+        request = client.post("/api/mood/", headers=headers, json={"mood_level": random.randint(1, 5), "notes": "load test"})
+    elif name == "GET /mood":
+        request = client.get("/api/mood/", headers=headers, params={"limit": 20})
+    elif name == "GET /mood/stats":
+        request = client.get("/api/mood/stats", headers=headers)
+    elif name == "POST /chat":
+        request = client.post("/api/chat/", headers=headers, json={"message": "I had a stressful day at work."})
+    elif name == "GET /chat/history":
+        request = client.get("/api/chat/history", headers=headers, params={"limit": 50})
+    elif name == "POST /exercises":
+        request = client.post("/api/exercises/", headers=headers, json={"exercise_id": "breathing", "duration_completed": 120})
+    elif name == "GET /exercises/stats":
+        request = client.get("/api/exercises/stats", headers=headers)
+    elif name == "POST /community/posts":
+        request = client.post("/api/community/posts", headers=headers, json={
+            "content": "Load test post", "is_anonymous": False, "group_id": random.choice(group_ids),
+        })
+    else:
+        params = {"limit": 20}
+        if random.random() < 0.7:
+            params["group_id"] = random.choice(group_ids)
+        request = client.get("/api/community/posts", headers=headers, params=params)
+    await recorder.call(name, request)
+
+async def _virtual_user(client, recorder: Recorder, seeded_users: int, group_ids: list, stop_at: float) -> None:
+    names = [name for name, _ in SCENARIOS]
+    weights = [weight for _, weight in SCENARIOS]
+    headers = await _login(client, recorder, seeded_users)
+    while time.perf_counter() < stop_at:
+        try:
+            await _scenario(random.choices(names, weights)[0], client, recorder, headers, group_ids)
+        except httpx.HTTPError:
+            pass
+
+async def _register(client, recorder: Recorder, count: int, concurrency: int) -> None:
+    remaining = iter(range(count))
+
+    async def worker():
+        for _ in remaining:
+            await recorder.call("POST /auth/register", client.post("/api/auth/register", json={
+                "email": f"loadtest-reg-{uuid.uuid4().hex[:12]}@example.com",
+                "password": SEEDED_PASSWORD, "name": "Load Test", "timezone": "UTC",
+            }))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+def _client(args) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    if args.in_process:
+        from main import app
+
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app, raise_app_exceptions=False), base_url="http://loadtest", timeout=args.timeout)
+    return httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout)
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before["p95_ms"] and current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if before["rps"] and current["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {before['rps']:.1f} -> {current['rps']:.1f} req/s")
+    return regressions
+
+async def run(args) -> dict:
+    async with _client(args) as client:
+        registration = Recorder()
+        registration.recording = True
+        start = time.perf_counter()
+        await _register(client, registration, args.registrations, min(args.users, 20))
+        register_results = summarize(registration, time.perf_counter() - start)
+        print_table("registration", register_results)
+
+        headers = await _login(client, Recorder(), args.seeded_users)
+        groups = (await client.get("/api/community/groups", headers=headers, params={"limit": 100})).json()
+        group_ids = [group["id"] for group in groups] or [1]
+
+        recorder = Recorder()
+        begin = time.perf_counter()
+        stop_at = begin + args.warmup + args.duration
+        users = [
+            asyncio.create_task(_virtual_user(client, recorder, args.seeded_users, group_ids, stop_at))
+            for _ in range(args.users)
+        ]
+        await asyncio.sleep(args.warmup)
+        recorder.recording = True
+        start = time.perf_counter()
+        for outcome in await asyncio.gather(*users, return_exceptions=True):
+            if isinstance(outcome, Exception):
+                print(f"virtual user failed: {outcome!r}")
+        results = summarize(recorder, time.perf_counter() - start)
+        print_table(f"mixed load: {args.users} users, {args.duration:.0f}s after {args.warmup:.0f}s warm-up", results)
+        total = sum(r["requests"] for r in results.values())
+        print(f"\ntotal {total} requests, {total / args.duration:.1f} req/s")
+        return {**register_results, **results}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--in-process", action="store_true", help="Drive main.app in this process")
+    parser.add_argument("--users", type=int, default=100, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=60, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=10, help="Unmeasured seconds first")
+    parser.add_argument("--registrations", type=int, default=50)
+    parser.add_argument("--seeded-users", type=int, default=100_000, help="Users created by benchmarks.seed")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Results file of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
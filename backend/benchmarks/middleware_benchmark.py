@@ -0,0 +1,120 @@
+"""Throughput of /health and /mood with the old and new logging middleware.
+
+Runs the API in-process over httpx's ASGI transport with three middleware
+setups: none, the previous print-based BaseHTTPMiddleware, and
+RequestLoggingMiddleware. Log output of both goes to /dev/null so terminal
+speed does not skew the numbers. Needs a migrated database (a throwaway user
+with some mood logs is created and removed):
+
+    python -m benchmarks.middleware_benchmark --requests 2000 --concurrency 20
+"""
+import argparse
+import asyncio
+import contextlib
+import os
+import statistics
+import time
+import traceback
+import uuid
+import httpx
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from sqlalchemy import delete
+from app.api.api import api_router
+from app.core import log, tokens
+from app.core.database import AsyncSessionLocal, async_engine
+from app.middleware.request_logging import RequestLoggingMiddleware
+from app.models import MoodLog, User
+
+class LegacyErrorLoggingMiddleware(BaseHTTPMiddleware):
+    """The middleware this benchmark compares against, as it was."""
+
+    async def dispatch(self, request: Request, call_next):
+        try:
+            print(f"\n{'='*60}")
+            print(f"REQUEST: {request.method} {request.url.path}")
+            print(f"{'='*60}")
+            response = await call_next(request)
+            print(f"RESPONSE STATUS: {response.status_code}")
+            print(f"{'='*60}\n")
+            return response
+        except Exception as e:
+            traceback.print_exc()
+            with open(os.devnull, "w") as f:
+                f.write(f"Error: {str(e)}\n")
+            raise
+
+def _build_app(middleware) -> FastAPI:
+    app = FastAPI()
+    if middleware is not None:
+        app.add_middleware(middleware)
+    app.include_router(api_router, prefix="/api")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    return app
+
+async def _seed(logs: int) -> tuple:
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", name="bench", timezone="UTC")
+        db.add(user)
+        await db.flush()
+        db.add_all(MoodLog(user_id=user.id, mood_level=1 + i % 5, notes=f"note {i}") for i in range(logs))
+        await db.commit()
+        return user.id, user.email
+
+async def _load(app: FastAPI, path: str, headers: dict, requests: int, concurrency: int) -> tuple:
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    return requests / elapsed, statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1]
+
+async def run(requests: int, concurrency: int, logs: int) -> None:
+    devnull = open(os.devnull, "w")
+    log.setup_logging(stream=devnull)
+    user_id, email = await _seed(logs)
+    auth = {"Authorization": f"Bearer {tokens.create_access_token(email, user_id=user_id)}"}
+    variants = [("none", None), ("legacy", LegacyErrorLoggingMiddleware), ("asgi", RequestLoggingMiddleware)]
+    try:
+        print(f"{requests} requests per run, concurrency {concurrency}")
+        print(f"{'endpoint':<12} {'middleware':<10} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for path, headers in (("/health", {}), ("/api/mood/", auth)):
+            for name, middleware in variants:
+                app = _build_app(middleware)
+                with contextlib.redirect_stdout(devnull):
+                    await _load(app, path, headers, min(requests, 100), concurrency)  # Warm-up
+                    rps, p50, p99 = await _load(app, path, headers, requests, concurrency)
+                print(f"{path:<12} {name:<10} {rps:>9.0f} {p50:>8.2f} {p99:>8.2f}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(MoodLog).where(MoodLog.user_id == user_id))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await async_engine.dispose()
+        log.stop_logging()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--logs", type=int, default=50, help="Mood logs for the /mood user")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.logs))
+
+if __name__ == "__main__":
+    main()
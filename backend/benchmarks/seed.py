@@ -0,0 +1,154 @@
+"""Seed a PostgreSQL database with load-test data at production-like volumes.
+
+Creates users `loadtest-<n>@example.com` (all with the password printed at the
+end) plus their mood logs, chat history and exercises, community groups and
+posts, spread over the last `--days` days. Everything is generated server-side
+with generate_series, so millions of rows take seconds, not hours:
+
+    python -m benchmarks.seed --users 100000 --mood-logs 20 --chat-messages 10
+    python -m benchmarks.seed --reset   # remove previously seeded data only
+
+Users get no mood_aggregates row; pass --rebuild-stats (slow at 100k users) or
+let /mood/stats build rows on first use, which the load test's warm-up does.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from app.core import security
+from app.core.database import AsyncSessionLocal, async_engine
+from scripts import manage_partitions
+
+EMAIL_PREFIX = "loadtest-"
+EMAIL_DOMAIN = "@example.com"
+GROUP_PREFIX = "loadtest group "
+PASSWORD = "loadtest-password"
+
+_SEEDED_USERS = f"SELECT id FROM users WHERE email LIKE '{EMAIL_PREFIX}%{EMAIL_DOMAIN}'"
+
+def email(n: int) -> str:
+    return f"{EMAIL_PREFIX}{n}{EMAIL_DOMAIN}"
+
+async def _step(db, label: str, statement: str, **params) -> None:
+    start = time.perf_counter()
+    result = await db.execute(text(statement), params)
+    await db.commit()
+    rows = f"{result.rowcount:>12,} rows" if result.rowcount >= 0 else " " * 17
+    print(f"{label:<28} {rows} {time.perf_counter() - start:>8.1f}s")
+
+async def reset(db) -> None:
+    seeded_posts = f"""
+        SELECT id FROM community_posts WHERE user_id IN ({_SEEDED_USERS})
+        OR group_id IN (SELECT id FROM community_groups WHERE name LIKE '{GROUP_PREFIX}%')
+    """
+    for table in ("post_likes", "post_comments"):
+        await _step(db, f"delete {table} on seeded posts", f"DELETE FROM {table} WHERE post_id IN ({seeded_posts})")
+    await _step(db, "delete group_members", f"""
+        DELETE FROM group_members
+        WHERE group_id IN (SELECT id FROM community_groups WHERE name LIKE '{GROUP_PREFIX}%')
+    """)
+    for table in (
+        "post_likes", "post_comments", "group_members", "insight_jobs", "mood_insights", "mood_aggregates",
+        "mood_logs", "chat_summaries", "chat_messages", "exercises_completed", "community_posts", "user_preferences",
+    ):
+        await _step(db, f"delete {table}", f"DELETE FROM {table} WHERE user_id IN ({_SEEDED_USERS})")
+    await _step(db, "delete posts in seeded groups", f"""
+        DELETE FROM community_posts
+        WHERE group_id IN (SELECT id FROM community_groups WHERE name LIKE '{GROUP_PREFIX}%')
+    """)
+    await _step(db, "delete community_groups", f"DELETE FROM community_groups WHERE name LIKE '{GROUP_PREFIX}%'")
+    await _step(db, "delete users", f"DELETE FROM users WHERE id IN ({_SEEDED_USERS})")
+
+async def seed(db, users: int, mood_logs: int, chat_messages: int, exercises: int, groups: int, posts: int, days: int) -> None:
+    # One Argon2 hash shared by every seeded user; hashing 100k passwords would take hours.
+    hashed = await security.get_password_hash_async(PASSWORD)
+    await _step(db, "users", f"""
+        INSERT INTO users (email, hashed_password, name, timezone, onboarding_completed, onboarding_data, created_at)
+        SELECT '{EMAIL_PREFIX}' || i || '{EMAIL_DOMAIN}', :hashed, 'Load Test ' || i,
+               (ARRAY['UTC', 'Asia/Kolkata', 'America/New_York', 'Europe/Berlin'])[1 + i % 4],
+               true, '{{"goals": ["sleep better"], "stress_level": "medium"}}'::json,
+               now() - random() * make_interval(days => :days)
+        FROM generate_series(1, :users) AS i
+        ON CONFLICT (email) DO NOTHING
+    """, hashed=hashed, users=users, days=days)
+    # Month partitions for the backdated history, so it does not all land in the DEFAULT partitions.
+    now = datetime.now(timezone.utc)
+    conn = await db.connection()
+    for table in ("mood_logs", "chat_messages"):
+        await manage_partitions.ensure_months(
+            conn, table, (now - timedelta(days=days)).date().replace(day=1), now.date().replace(day=1)
+        )
+    await _step(db, "mood_logs", f"""
+        INSERT INTO mood_logs (user_id, mood_level, notes, created_at)
+        SELECT u.id, 1 + (random() * 4)::int,
+               CASE WHEN i % 3 = 0 THEN 'felt okay after a walk, slept about ' || (5 + i % 4) || ' hours' END,
+               now() - random() * make_interval(days => :days)
+        FROM ({_SEEDED_USERS}) AS u CROSS JOIN generate_series(1, :n) AS i
+    """, n=mood_logs, days=days)
+    await _step(db, "chat_messages", f"""
+        INSERT INTO chat_messages (user_id, role, content, created_at)
+        SELECT u.id, CASE WHEN i % 2 = 1 THEN 'user' ELSE 'assistant' END,
+               CASE WHEN i % 2 = 1 THEN 'I have been feeling a bit overwhelmed with work this week.'
+                    ELSE 'That sounds like a lot to carry. What part of the week has felt heaviest?' END,
+               now() - make_interval(days => :days) + i * interval '1 minute'
+        FROM ({_SEEDED_USERS}) AS u CROSS JOIN generate_series(1, :n) AS i
+    """, n=chat_messages, days=days)
+    await _step(db, "exercises_completed", f"""
+        INSERT INTO exercises_completed (user_id, exercise_id, duration_completed, completed_at)
+        SELECT u.id, (ARRAY['breathing', 'body-scan', 'gratitude', 'grounding'])[1 + i % 4],
+               60 + (random() * 600)::int, now() - random() * make_interval(days => :days)
+        FROM ({_SEEDED_USERS}) AS u CROSS JOIN generate_series(1, :n) AS i
+    """, n=exercises, days=days)
+    await _step(db, "community_groups", f"""
+        INSERT INTO community_groups (name, description, member_count)
+        SELECT '{GROUP_PREFIX}' || i, 'Seeded group for load tests', 0
+        FROM generate_series(1, :n) AS i
+    """, n=groups)
+    await _step(db, "community_posts", f"""
+        WITH g AS (SELECT array_agg(id) AS ids FROM community_groups WHERE name LIKE '{GROUP_PREFIX}%'),
+             u AS (SELECT array_agg(id) AS ids FROM ({_SEEDED_USERS}) AS s)
+        INSERT INTO community_posts (user_id, group_id, content, is_anonymous, likes_count, comment_count, created_at)
+        SELECT u.ids[1 + (random() * (cardinality(u.ids) - 1))::int],
+               g.ids[1 + (random() * (cardinality(g.ids) - 1))::int],
+               'Small win today: ' || i, i % 4 = 0, (random() * 40)::int, (random() * 8)::int,
+               now() - random() * make_interval(days => :days)
+        FROM g, u, generate_series(1, :n) AS i
+    """, n=posts, days=days)
+    await _step(db, "analyze", "ANALYZE")
+
+async def run(args) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            if args.reset:
+                await reset(db)
+                return
+            await seed(
+                db, args.users, args.mood_logs, args.chat_messages,
+                args.exercises, args.groups, args.posts, args.days,
+            )
+        if args.rebuild_stats:
+            from scripts.rebuild_mood_stats import rebuild
+
+            start = time.perf_counter()
+            count = await rebuild([])
+            print(f"{'mood_aggregates':<28} {count:>12,} users {time.perf_counter() - start:>7.1f}s")
+        print(f"\nLog in as {email(1)} .. {email(args.users)} with password {PASSWORD!r}")
+    finally:
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--mood-logs", type=int, default=20, help="Per user")
+    parser.add_argument("--chat-messages", type=int, default=10, help="Per user")
+    parser.add_argument("--exercises", type=int, default=5, help="Per user")
+    parser.add_argument("--groups", type=int, default=20)
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=180, help="History spread over this many days")
+    parser.add_argument("--rebuild-stats", action="store_true", help="Build mood_aggregates for every user")
+    parser.add_argument("--reset", action="store_true", help="Delete seeded data and exit")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Per-page cost of fetching and serializing a GET /mood page, before and after.
+
+Seeds a throwaway user with mood logs, then times one page (`--page` rows)
+two ways:
+
+  legacy    select(MoodLog) ORM objects, validated and encoded the way
+            response_model does it (dump to Python, stdlib json)
+  columns   column row tuples through app.api.serialization.ListSerializer
+
+Each is reported as fetch+serialize and serialize only. Needs a migrated
+database:
+
+    python -m benchmarks.serialization_benchmark --page 100 --runs 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import delete, select
+from app.api.endpoints.mood import mood_logs_json
+from app.api.pagination import paginate
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import MoodLog, User
+from app.schemas import MoodLog as MoodLogSchema
+
+_response_model = TypeAdapter(List[MoodLogSchema])
+
+def _legacy(objects) -> bytes:
+    return JSONResponse(_response_model.dump_python(_response_model.validate_python(objects, from_attributes=True), mode="json")).body
+
+STRATEGIES = (
+    ("legacy", lambda: select(MoodLog), lambda result: result.scalars().all(), _legacy),
+    ("columns", lambda: select(*mood_logs_json.columns(MoodLog)), lambda result: result.all(), mood_logs_json.dump),
+)
+
+async def _seed(logs: int) -> int:
+    async with AsyncSessionLocal() as db:
+        user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", name="bench", timezone="UTC")
+        db.add(user)
+        await db.flush()
+        db.add_all(MoodLog(user_id=user.id, mood_level=1 + i % 5, notes=f"benchmark note {i} ✓") for i in range(logs))
+        await db.commit()
+        return user.id
+
+async def _time(user_id: int, page: int, runs: int, build, rows, encode) -> tuple:
+    total, encoding = [], []
+    async with AsyncSessionLocal() as db:
+        for _ in range(runs):
+            start = time.perf_counter()
+            result = await db.execute(
+                paginate(build().where(MoodLog.user_id == user_id), MoodLog.created_at, MoodLog.id, page)
+            )
+            fetched = rows(result)[:page]
+            encoded = time.perf_counter()
+            body = encode(fetched)
+            end = time.perf_counter()
+            db.expunge_all()
+            total.append((end - start) * 1000)
+            encoding.append((end - encoded) * 1000)
+    return total, encoding, len(body)
+
+async def run(page: int, runs: int) -> None:
+    user_id = await _seed(page + 1)
+    try:
+        print(f"{page} rows per page, {runs} runs (ms per page)")
+        print(f"{'strategy':<10} {'total p50':>10} {'total p95':>10} {'encode p50':>11} {'bytes':>8}")
+        for name, build, rows, encode in STRATEGIES:
+            await _time(user_id, page, 10, build, rows, encode)  # Warm up
+            total, encoding, size = await _time(user_id, page, runs, build, rows, encode)
+            p95 = statistics.quantiles(total, n=20)[-1]
+            print(f"{name:<10} {statistics.median(total):>10.3f} {p95:>10.3f} {statistics.median(encoding):>11.3f} {size:>8}")
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(MoodLog).where(MoodLog.user_id == user_id))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--page", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.page, args.runs))
+
+if __name__ == "__main__":
+    main()
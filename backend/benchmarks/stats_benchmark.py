@@ -0,0 +1,113 @@
+"""Compare query count and latency of the mood/exercise stats strategies.
+
+Seeds a throwaway user with many mood logs and exercises (PostgreSQL only),
+then times:
+
+  legacy     the old endpoint: COUNT, AVG, 7-day fetch, load every row
+  summary    app.services.stats, one aggregation statement
+  aggregate  the mood_aggregates primary-key read behind /mood/stats
+
+    python -m benchmarks.stats_benchmark --logs 10000 --runs 20
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, event, func, select, text
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import ExerciseCompleted, MoodAggregate, MoodLog, User
+from app.services import mood_stats, stats
+
+_queries = 0
+
+def _count_query(*args):
+    global _queries
+    _queries += 1
+
+async def _seed(db, logs: int) -> int:
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", name="bench", timezone="Asia/Kolkata")
+    db.add(user)
+    await db.flush()
+    # One log roughly every 2 hours going back in time, with a few gap days.
+    params = {"user_id": user.id, "n": logs}
+    await db.execute(text("""
+        INSERT INTO mood_logs (user_id, mood_level, notes, created_at)
+        SELECT :user_id, 1 + (i % 5), 'benchmark note ' || i, now() - (i * interval '2 hours')
+        FROM generate_series(0, :n - 1) AS i
+        WHERE (i / 12) % 17 <> 16
+    """), params)
+    await db.execute(text("""
+        INSERT INTO exercises_completed (user_id, exercise_id, duration_completed, completed_at)
+        SELECT :user_id, 'breathing', 60 + (i % 600), now() - (i * interval '2 hours')
+        FROM generate_series(0, :n - 1) AS i
+    """), params)
+    await mood_stats.rebuild_user(db, user.id, user.timezone)
+    await db.commit()
+    return user.id
+
+async def _legacy_mood_stats(db, user_id: int) -> dict:
+    total = await db.scalar(select(func.count(MoodLog.id)).where(MoodLog.user_id == user_id))
+    avg = await db.scalar(select(func.avg(MoodLog.mood_level)).where(MoodLog.user_id == user_id)) or 0
+    week_ago = datetime.utcnow().date() - timedelta(days=6)
+    (await db.execute(select(MoodLog).where(MoodLog.user_id == user_id, MoodLog.created_at >= week_ago))).scalars().all()
+    distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
+    for log in (await db.execute(select(MoodLog).where(MoodLog.user_id == user_id))).scalars().all():
+        if log.mood_level in distribution:
+            distribution[log.mood_level] += 1
+    return {"total": total, "avg": avg, "distribution": distribution}
+
+async def _legacy_exercise_stats(db, user_id: int) -> dict:
+    seconds = await db.scalar(
+        select(func.sum(ExerciseCompleted.duration_completed)).where(ExerciseCompleted.user_id == user_id)
+    )
+    sessions = await db.scalar(select(func.count(ExerciseCompleted.id)).where(ExerciseCompleted.user_id == user_id))
+    return {"seconds": seconds, "sessions": sessions}
+
+async def _aggregate_read(db, user_id: int) -> dict:
+    agg = await db.get(MoodAggregate, user_id, populate_existing=True)
+    return mood_stats.to_stats(agg, "Asia/Kolkata")
+
+async def _measure(name: str, fn, user_id: int, runs: int) -> None:
+    global _queries
+    timings = []
+    for _ in range(runs):
+        async with AsyncSessionLocal() as db:
+            _queries = 0
+            start = time.perf_counter()
+            await fn(db, user_id)
+            timings.append((time.perf_counter() - start) * 1000)
+            queries = _queries
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:<28} queries={queries:<3} p50={statistics.median(timings):8.2f}ms p95={p95:8.2f}ms")
+
+async def run(logs: int, runs: int) -> None:
+    event.listen(async_engine.sync_engine, "before_cursor_execute", _count_query)
+    async with AsyncSessionLocal() as db:
+        user_id = await _seed(db, logs)
+    try:
+        print(f"user {user_id}: ~{logs} mood logs, {logs} exercises, {runs} runs each")
+        await _measure("mood legacy", _legacy_mood_stats, user_id, runs)
+        await _measure("mood summary (1 query)", lambda db, uid: stats.mood_summary(db, uid, "Asia/Kolkata"), user_id, runs)
+        await _measure("mood aggregate (PK read)", _aggregate_read, user_id, runs)
+        await _measure("exercise legacy", _legacy_exercise_stats, user_id, runs)
+        await _measure("exercise summary (1 query)", lambda db, uid: stats.exercise_summary(db, uid, "Asia/Kolkata"), user_id, runs)
+    finally:
+        async with AsyncSessionLocal() as db:
+            for model in (MoodAggregate, MoodLog, ExerciseCompleted):
+                await db.execute(delete(model).where(model.user_id == user_id))
+            await db.execute(delete(User).where(User.id == user_id))
+            await db.commit()
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.logs, args.runs))
+
+if __name__ == "__main__":
+    main()
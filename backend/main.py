@@ -1,11 +1,40 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Header, HTTPException, Response, status
+from fastapi.security.utils import get_authorization_scheme_param
 from fastapi.middleware.cors import CORSMiddleware
-from app.middleware.error_logging import ErrorLoggingMiddleware
+from app.core import metrics, profiling
+from app.core.log import setup_logging, stop_logging
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.profiling import ProfilingMiddleware
+from app.middleware.request_logging import REQUEST_ID_HEADER, RequestLoggingMiddleware
+from app.services import ai, counters, insights
 
-app = FastAPI(title="Neeva API", description="AI Mental Wellness Companion API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    insights.pool.start()
+    counters.buffer.start()
+    yield
+    await insights.pool.stop()
+    await counters.buffer.stop()
+    await ai.close_clients()
+    stop_logging()
 
-# Add error logging middleware FIRST
-app.add_middleware(ErrorLoggingMiddleware)
+setup_logging()
+
+app = FastAPI(
+    title="Neeva API",
+    description="AI Mental Wellness Companion API",
+    lifespan=lifespan,
+)
+
+# Profiling sits inside request logging so captures carry the request ID
+if profiling.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+# Request logging first, so it sees every request
+app.add_middleware(RequestLoggingMiddleware)
+if metrics.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # CORS Configuration - Allow all origins for now (configure specific origins for production security)
 app.add_middleware(
@@ -14,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", REQUEST_ID_HEADER],
 )
 
 from app.api.api import api_router
@@ -27,3 +57,15 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    if not metrics.METRICS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+    if not metrics.scrape_authorized(*get_authorization_scheme_param(authorization)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,129 @@
+"""Check that community counters stay exact under parallel likes, comments and joins.
+
+Creates throwaway users, a group and a post, then drives the real endpoints
+concurrently in-process: every user likes the post (some twice), a share
+unlike it again, users comment and join and leave the group, while the
+counter buffer is flushed every few milliseconds so flushes race with the
+requests. After the final flush the stored counts must equal the relation
+tables. Needs a migrated database; exits non-zero on a mismatch:
+
+    python -m scripts.check_counters --users 500 --concurrency 100
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+import uuid
+import httpx
+from sqlalchemy import delete, func, insert, select
+from app.core import tokens
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import CommunityGroup, CommunityPost, GroupMember, PostComment, PostLike, User
+from app.services import counters
+
+async def _seed(users: int) -> tuple:
+    tag = uuid.uuid4().hex[:8]
+    async with AsyncSessionLocal() as db:
+        group = CommunityGroup(name=f"counter check {tag}", description="", member_count=0)
+        db.add(group)
+        await db.flush()
+        result = await db.execute(
+            insert(User).returning(User.id, User.email),
+            [{"email": f"counters-{tag}-{i}@example.com", "name": "counters", "timezone": "UTC"} for i in range(users)],
+        )
+        accounts = result.all()
+        post = CommunityPost(user_id=accounts[0].id, group_id=group.id, content="hot post", likes_count=0, comment_count=0)
+        db.add(post)
+        await db.commit()
+        return group.id, post.id, accounts
+
+async def _cleanup(group_id: int, post_id: int, user_ids: list) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(PostLike).where(PostLike.post_id == post_id))
+        await db.execute(delete(PostComment).where(PostComment.post_id == post_id))
+        await db.execute(delete(GroupMember).where(GroupMember.group_id == group_id))
+        await db.execute(delete(CommunityPost).where(CommunityPost.id == post_id))
+        await db.execute(delete(CommunityGroup).where(CommunityGroup.id == group_id))
+        await db.execute(delete(User).where(User.id.in_(user_ids)))
+        await db.commit()
+
+async def _drive(app, group_id: int, post_id: int, accounts: list, concurrency: int) -> tuple:
+    calls = []
+    for account in accounts:
+        auth = {"Authorization": f"Bearer {tokens.create_access_token(account.email, user_id=account.id)}"}
+        calls.append(("POST", f"/api/community/posts/{post_id}/like", auth, None))
+        if random.random() < 0.3:
+            calls.append(("POST", f"/api/community/posts/{post_id}/like", auth, None))  # Duplicate
+        if random.random() < 0.2:
+            calls.append(("DELETE", f"/api/community/posts/{post_id}/like", auth, None))
+        if random.random() < 0.5:
+            calls.append(("POST", f"/api/community/posts/{post_id}/comments", auth, {"content": "same here"}))
+        calls.append(("POST", f"/api/community/groups/{group_id}/join", auth, None))
+        if random.random() < 0.1:
+            calls.append(("DELETE", f"/api/community/groups/{group_id}/join", auth, None))
+    random.shuffle(calls)
+    # A user's like and unlike may run in either order; the counts must match either way.
+    pending = iter(calls)
+    failures = 0
+
+    async def worker(client):
+        nonlocal failures
+        for method, path, headers, body in pending:
+            response = await client.request(method, path, headers=headers, json=body)
+            if response.status_code != 200:
+                failures += 1
+
+    async def flusher():
+        while True:
+            await asyncio.sleep(0.005)
+            await counters.buffer.flush()
+
+    flushing = asyncio.create_task(flusher())
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    finally:
+        flushing.cancel()
+        await asyncio.gather(flushing, return_exceptions=True)
+    await counters.buffer.flush()
+    return len(calls), failures
+
+async def run(users: int, concurrency: int) -> bool:
+    from main import app
+
+    group_id, post_id, accounts = await _seed(users)
+    try:
+        start = time.perf_counter()
+        calls, failures = await _drive(app, group_id, post_id, accounts, concurrency)
+        elapsed = time.perf_counter() - start
+        async with AsyncSessionLocal() as db:
+            post = await db.get(CommunityPost, post_id)
+            group = await db.get(CommunityGroup, group_id)
+            checks = (
+                ("likes", post.likes_count, await db.scalar(select(func.count()).where(PostLike.post_id == post_id))),
+                ("comments", post.comment_count, await db.scalar(select(func.count()).where(PostComment.post_id == post_id))),
+                ("members", group.member_count, await db.scalar(select(func.count()).where(GroupMember.group_id == group_id))),
+            )
+        print(f"{calls} calls at concurrency {concurrency} in {elapsed:.1f}s, {failures} non-200 responses")
+        ok = failures == 0
+        for label, stored, actual in checks:
+            status = "ok" if stored == actual else "MISMATCH"
+            ok = ok and stored == actual
+            print(f"{label:<9} stored {stored:>6} actual {actual:>6}  {status}")
+        return ok
+    finally:
+        await _cleanup(group_id, post_id, [account.id for account in accounts])
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    if not asyncio.run(run(args.users, args.concurrency)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
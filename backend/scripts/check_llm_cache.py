@@ -0,0 +1,126 @@
+"""Check the LLM response cache against a fake provider.
+
+Runs without the API or a database: `ai.async_client` is replaced by a fake
+that takes --latency seconds per completion and counts calls. Repeated chat
+and insights requests must be answered from the cache (also across the
+streaming and non-streaming paths and whitespace differences), different
+prompts must not be, and with --semantic a reworded first turn must hit while
+a later turn must not. Entries are stored in memory, a local fake Redis (the
+`fakeredis` package) or the real Redis at REDIS_URL. Exits non-zero if a check
+fails:
+
+    python -m scripts.check_llm_cache --backend fake --semantic
+"""
+import argparse
+import asyncio
+import sys
+import time
+from types import SimpleNamespace as NS
+from app.core import cache, metrics
+from app.services import ai, llm_cache, prompts
+
+class FakeProvider:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def create(self, messages, model, stream=False, **params):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        content = f"reply {self.calls} to {messages[-1]['content']!r}"
+        usage = NS(prompt_tokens=100, completion_tokens=20, prompt_tokens_details=None)
+        if not stream:
+            return NS(choices=[NS(message=NS(content=content))], usage=usage)
+        return FakeStream([content[:6], content[6:]], usage)
+
+class FakeStream:
+    def __init__(self, tokens: list, usage):
+        self.chunks = [NS(choices=[NS(delta=NS(content=token))], x_groq=None) for token in tokens]
+        self.chunks.append(NS(choices=[], x_groq=NS(usage=usage)))
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self) -> None:
+        pass
+
+def _cache(backend: str) -> cache.CacheBackend:
+    namespace = f"llm-check-{time.time_ns()}"
+    if backend == "fake":
+        import fakeredis
+
+        return cache.RedisCache(fakeredis.FakeAsyncRedis(), namespace)
+    if backend == "redis":
+        return cache.RedisCache(cache.get_redis_client(), namespace)
+    return cache.MemoryCache()
+
+SYSTEM_PROMPT = prompts.chat_system_prompt({"name": "Sam"})
+
+async def _chat(text: str, history: list = ()) -> tuple:
+    start = time.perf_counter()
+    reply = await ai.get_chat_response_async([*history, {"role": "user", "content": text}], SYSTEM_PROMPT, user_id=1)
+    return reply, time.perf_counter() - start
+
+async def _stream(text: str) -> str:
+    return "".join([token async for token in ai.stream_chat_response([{"role": "user", "content": text}], SYSTEM_PROMPT, user_id=1)])
+
+def _check(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{'ok  ' if ok else 'FAIL'} {name}{': ' + detail if detail else ''}")
+    return ok
+
+async def run(backend: str, latency: float, semantic: bool) -> bool:
+    provider = FakeProvider(latency)
+    ai.async_client = NS(chat=NS(completions=NS(create=provider.create)))
+    llm_cache.cache = _cache(backend)
+    llm_cache.semantic = llm_cache.SemanticIndex() if semantic else None
+    results = []
+
+    first, miss_time = await _chat("I feel anxious")
+    again, hit_time = await _chat("  I feel\nanxious ")
+    results.append(_check("repeat is a hit", again == first and provider.calls == 1,
+                          f"{miss_time * 1000:.1f}ms -> {hit_time * 1000:.2f}ms"))
+    results.append(_check("stream served from the chat entry", await _stream("I feel anxious") == first and provider.calls == 1))
+
+    streamed = await _stream("hi")
+    results.append(_check("streamed reply cached", (await _chat("hi"))[0] == streamed and provider.calls == 2))
+
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": streamed}]
+    followup, _ = await _chat("I feel anxious", history)
+    results.append(_check("different history misses", followup != first and provider.calls == 3))
+
+    logs = [NS(mood_level=2, notes="tired"), NS(mood_level=4, notes="better")]
+    insight = await ai.generate_mood_insights_async(logs)
+    results.append(_check("insights repeat is a hit", await ai.generate_mood_insights_async(logs) == insight and provider.calls == 4))
+
+    if semantic:
+        reworded, _ = await _chat("i feel ANXIOUS!")
+        results.append(_check("reworded first turn hits semantically", reworded == first and provider.calls == 4))
+        different, _ = await _chat("I don't feel anxious at all")
+        results.append(_check("different first turn misses", different != first and provider.calls == 5))
+        later, _ = await _chat("i feel ANXIOUS!", history)
+        results.append(_check("later turn never matched semantically", later != followup and provider.calls == 6))
+
+    counts = {key: value for key, value in metrics.LLM_CACHE_LOOKUPS.values.items()}
+    hits = sum(value for (kind, result), value in counts.items() if result != "miss")
+    total = sum(counts.values())
+    saved = sum(metrics.LLM_CACHE_SAVED_TOKENS.values.values())
+    print(f"hit rate {hits}/{total}, provider calls {provider.calls}, tokens saved {saved:g}")
+    return all(results)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("memory", "fake", "redis"), default="memory")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per fake completion")
+    parser.add_argument("--semantic", action="store_true", help="Also check the semantic first-turn layer")
+    args = parser.parse_args()
+    if not asyncio.run(run(args.backend, args.latency, args.semantic)):
+        print("FAIL")
+        sys.exit(1)
+    print("ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Fail when a hot per-user / per-group list query stops using an index.
+
+Runs EXPLAIN (FORMAT JSON) for each query below against DATABASE_URL
+(PostgreSQL) with sequential scans disabled for the transaction. The planner
+then only picks a Seq Scan when no index can serve the query, so the check is
+meaningful on small dev databases too. A Sort node means the index no longer
+provides the ORDER BY. Exits non-zero on any regression, for CI:
+
+    python -m scripts.check_query_plans
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timezone
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from app.api.pagination import encode_cursor, paginate
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import ChatMessage, CommunityPost, ExerciseCompleted, MoodLog, PostComment
+from app.services import chat_context
+
+SAMPLE_USER_ID = 1
+SAMPLE_GROUP_ID = 1
+SAMPLE_POST_ID = 1
+SAMPLE_MESSAGE_ID = 1000
+SAMPLE_CURSOR = encode_cursor(datetime(2025, 1, 1, tzinfo=timezone.utc), 1000)
+
+def _feeds(name: str, query, time_column, id_column, limit: int) -> dict:
+    """First page, an offset page and a cursor page of one feed."""
+    return {
+        f"{name}": paginate(query, time_column, id_column, limit),
+        f"{name} (offset)": paginate(query, time_column, id_column, limit, skip=limit),
+        f"{name} (cursor)": paginate(query, time_column, id_column, limit, before=SAMPLE_CURSOR),
+    }
+
+# Keep in step with the list queries in app/api/endpoints.
+HOT_QUERIES = {
+    **_feeds("mood.read_mood_logs", select(MoodLog).where(MoodLog.user_id == SAMPLE_USER_ID),
+             MoodLog.created_at, MoodLog.id, 100),
+    **_feeds("chat.get_chat_history", select(ChatMessage).where(ChatMessage.user_id == SAMPLE_USER_ID),
+             ChatMessage.created_at, ChatMessage.id, 50),
+    "chat_context.build_context": chat_context.recent_turns_query(SAMPLE_USER_ID, SAMPLE_MESSAGE_ID),
+    "chat_context.update_summary": chat_context.summary_batch_query(SAMPLE_USER_ID, SAMPLE_MESSAGE_ID, SAMPLE_MESSAGE_ID + 500),
+    **_feeds("exercises.get_exercise_history",
+             select(ExerciseCompleted).where(ExerciseCompleted.user_id == SAMPLE_USER_ID),
+             ExerciseCompleted.completed_at, ExerciseCompleted.id, 50),
+    **_feeds("community.get_posts (group)", select(CommunityPost).where(CommunityPost.group_id == SAMPLE_GROUP_ID),
+             CommunityPost.created_at, CommunityPost.id, 50),
+    **_feeds("community.get_posts (all)", select(CommunityPost), CommunityPost.created_at, CommunityPost.id, 50),
+    **_feeds("community.get_comments", select(PostComment).where(PostComment.post_id == SAMPLE_POST_ID),
+             PostComment.created_at, PostComment.id, 50),
+}
+
+FORBIDDEN_NODES = {"Seq Scan", "Sort"}
+
+def _walk(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+def _problems(plan: dict) -> list:
+    return [
+        f"{node['Node Type']}" + (f" on {node['Relation Name']}" if "Relation Name" in node else "")
+        for node in _walk(plan)
+        if node["Node Type"] in FORBIDDEN_NODES
+    ]
+
+async def check() -> int:
+    failures = 0
+    dialect = postgresql.dialect()
+    async with AsyncSessionLocal() as db:
+        await db.execute(text("SET LOCAL enable_seqscan = off"))
+        for name, statement in HOT_QUERIES.items():
+            sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+            raw = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar_one()
+            plan = (json.loads(raw) if isinstance(raw, str) else raw)[0]["Plan"]
+            problems = _problems(plan)
+            status = "FAIL" if problems else "ok"
+            print(f"{status:<5} {name:<46} {plan['Node Type']}" + (f"  ({', '.join(problems)})" if problems else ""))
+            failures += bool(problems)
+        await db.rollback()
+    await async_engine.dispose()
+    return failures
+
+def main() -> None:
+    failures = asyncio.run(check())
+    if failures:
+        print(f"{failures} hot quer{'y' if failures == 1 else 'ies'} not served by an index")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
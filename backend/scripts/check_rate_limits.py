@@ -0,0 +1,95 @@
+"""Check the token buckets and the LLM scheduler's fairness and token budget.
+
+Runs without the API or a database. Buckets are exercised on the chosen
+backend: memory, a local fake (the `fakeredis` package, with `lupa` for Lua
+scripting), or the real Redis at REDIS_URL. The scheduler is driven with
+simulated completions: one greedy user floods it with long prompts while
+light users send short ones, under a small token budget. Exits
+non-zero if a check fails:
+
+    python -m scripts.check_rate_limits --backend fake
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from app.core import cache, rate_limit
+from app.core.rate_limit import Rate, RateLimited
+from app.services.llm_scheduler import FairScheduler
+
+def _buckets(backend: str) -> rate_limit.Buckets:
+    if backend == "fake":
+        import fakeredis
+
+        return rate_limit.RedisBuckets(fakeredis.FakeAsyncRedis(), namespace=f"check-{time.time_ns()}")
+    if backend == "redis":
+        return rate_limit.RedisBuckets(cache.get_redis_client(), namespace=f"check-{time.time_ns()}")
+    return rate_limit.MemoryBuckets()
+
+async def check_buckets(buckets: rate_limit.Buckets) -> bool:
+    rate = Rate(5, 1)  # 5 burst, 5 per second
+    waits = [await buckets.take("bucket", rate) for _ in range(7)]
+    allowed = sum(1 for wait in waits if not wait)
+    await asyncio.sleep(0.45)
+    refilled = await buckets.take("bucket", rate, 2)
+    refunded = await buckets.take("bucket", rate, -5)
+    full = await buckets.take("bucket", rate, 5)
+    ok = allowed == 5 and 0 < waits[-1] <= 0.2 + 1e-6 and not refilled and not refunded and not full
+    print(f"buckets    burst allowed {allowed}/7, retry after {waits[-1]:.3f}s, refill/refund ok: {ok}")
+    return ok
+
+async def check_scheduler(buckets: rate_limit.Buckets, light_users: int) -> bool:
+    # 300 tokens per second (and at most 300 at once): the calls below reserve
+    # 1400 and use 700, so the budget must hold them back for over a second.
+    budget = Rate(300, 1)
+    scheduler = FairScheduler(max_concurrency=2, budget=budget, buckets=buckets, max_queued_per_flow=20)
+    admitted = []
+    refused = Counter()
+
+    async def call(flow: str, cost: int) -> None:
+        try:
+            grant = await scheduler.acquire(flow, cost, 1.0, timeout=30)
+        except RateLimited:
+            refused[flow] += 1
+            return
+        admitted.append(flow)
+        try:
+            await asyncio.sleep(0.01)
+            grant.record(cost // 2)  # Half the reservation used; the rest is refunded
+        finally:
+            await scheduler.release(grant)
+
+    start = time.perf_counter()
+    greedy = [call("user:greedy", 60) for _ in range(20)]
+    light = [call(f"user:light-{i}", 20) for i in range(light_users) for _ in range(2)]
+    await asyncio.gather(*greedy, *light)
+    elapsed = time.perf_counter() - start
+
+    # Every light call should be admitted before the greedy user's backlog drains.
+    last_light = max(i for i, flow in enumerate(admitted) if flow != "user:greedy")
+    greedy_before = admitted[:last_light].count("user:greedy")
+    used = (20 * 60 + 2 * light_users * 20) // 2
+    minimum = (used - budget.capacity) / budget.per_second
+    ok = len(admitted) == 20 + 2 * light_users and greedy_before < 20 and not refused and elapsed >= minimum
+    print(f"scheduler  {len(admitted)} calls in {elapsed:.2f}s (budget allows no less than {minimum:.2f}s); "
+          f"greedy calls admitted before the last light one: {greedy_before}/20; refused {sum(refused.values())}")
+    return ok
+
+async def run(backend: str, light_users: int) -> bool:
+    ok = await check_buckets(_buckets(backend))
+    ok = await check_scheduler(_buckets(backend), light_users) and ok
+    return ok
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=("memory", "fake", "redis"), default="memory")
+    parser.add_argument("--light-users", type=int, default=5)
+    args = parser.parse_args()
+    if not asyncio.run(run(args.backend, args.light_users)):
+        print("FAIL")
+        sys.exit(1)
+    print("ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Run mood insight workers outside the API process.
+
+Claims jobs from the insight_jobs table alongside (or instead of) the API's
+in-process workers. Run from the backend directory; stop with Ctrl+C:
+
+    INSIGHTS_WORKERS=0 uvicorn main:app        # API only enqueues
+    python -m scripts.insights_worker --concurrency 4
+"""
+import argparse
+import asyncio
+from app.core.database import async_engine
+from app.services import ai, insights
+
+async def run(concurrency: int) -> None:
+    pool = insights.WorkerPool(concurrency)
+    pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+        await ai.close_clients()
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=max(insights.INSIGHTS_WORKERS, 1), help="Jobs run at once")
+    args = parser.parse_args()
+    print(f"Mood insights worker running with {args.concurrency} task(s)")
+    try:
+        asyncio.run(run(args.concurrency))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+"""Create upcoming monthly partitions and archive expired ones (PostgreSQL only).
+
+chat_messages and mood_logs are partitioned by UTC month on created_at
+(partitions named <table>_yYYYYmMM, see the b6d2e9f4a1c8 migration). Run
+daily from cron, from the backend directory:
+
+    python -m scripts.manage_partitions
+    python -m scripts.manage_partitions --dry-run
+
+Each run makes sure the current month and the next PARTITION_MONTHS_AHEAD
+exist, so inserts never fall into the DEFAULT partition. Retention is tiered
+per table: the newest `hot_months` months stay attached and queryable; older
+partitions are detached, written to PARTITION_ARCHIVE_DIR as
+<table>_yYYYYmMM.csv.gz and dropped once the file's row count matches. Archive
+files older than another `archive_months` are deleted (0 keeps them forever).
+A run interrupted after the detach picks the detached table up next time.
+
+Detaching takes a brief exclusive lock on the parent table (CONCURRENTLY is
+not allowed next to a DEFAULT partition), bounded by PARTITION_LOCK_TIMEOUT;
+if it times out the partition is left for the next run.
+"""
+import argparse
+import asyncio
+import gzip
+import os
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import List
+from dotenv import load_dotenv
+from sqlalchemy import text
+from app.core.database import async_engine
+
+load_dotenv()
+
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+PARTITION_ARCHIVE_DIR = os.getenv("PARTITION_ARCHIVE_DIR", "partition-archive")
+PARTITION_LOCK_TIMEOUT = os.getenv("PARTITION_LOCK_TIMEOUT", "5s")
+
+@dataclass(frozen=True)
+class Tier:
+    table: str
+    hot_months: int  # Attached months, counting the current one
+    archive_months: int  # How long archive files are kept after that; 0 = forever
+
+TIERS = (
+    Tier("chat_messages", int(os.getenv("CHAT_HOT_MONTHS", 12)), int(os.getenv("CHAT_ARCHIVE_MONTHS", 0))),
+    Tier("mood_logs", int(os.getenv("MOOD_HOT_MONTHS", 24)), int(os.getenv("MOOD_ARCHIVE_MONTHS", 0))),
+)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month:%Y}m{month:%m}"
+
+def partition_month(table: str, name: str):
+    """The month a partition or archive name stands for, or None."""
+    match = re.fullmatch(rf"{re.escape(table)}_y(\d{{4}})m(\d{{2}})(?:\.csv\.gz)?", name)
+    return date(int(match[1]), int(match[2]), 1) if match else None
+
+def _bound(month: date) -> str:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc).isoformat()
+
+async def _attached(conn, table: str) -> List[str]:
+    result = await conn.execute(text("""
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = CAST(:table AS regclass)
+    """), {"table": table})
+    return list(result.scalars())
+
+async def _detached(conn, table: str) -> List[str]:
+    """Month tables no longer attached to `table`, left by an interrupted run."""
+    result = await conn.execute(text("""
+        SELECT relname FROM pg_class
+        WHERE relkind = 'r' AND NOT relispartition AND relname ~ :pattern
+    """), {"pattern": rf"^{table}_y[0-9]{{4}}m[0-9]{{2}}$"})
+    return list(result.scalars())
+
+async def ensure_months(conn, table: str, first: date, last: date, dry_run: bool = False) -> None:
+    """Create the missing month partitions from `first` through `last`.
+
+    Fails if the DEFAULT partition already holds rows for one of them.
+    """
+    attached = set(await _attached(conn, table))
+    month = first
+    while month <= last:
+        name = partition_name(table, month)
+        if name not in attached:
+            print(f"{table}: creating {name}")
+            if not dry_run:
+                await conn.execute(text(
+                    f"CREATE TABLE {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{_bound(month)}') TO ('{_bound(add_months(month, 1))}')"
+                ))
+        month = add_months(month, 1)
+
+async def _export(conn, name: str, path: str) -> int:
+    """COPY one table into a gzipped CSV, atomically; returns rows written."""
+    raw = await conn.get_raw_connection()
+    partial = path + ".partial"
+    with gzip.open(partial, "wb") as out:
+        async def write(chunk: bytes) -> None:
+            out.write(chunk)
+
+        status = await raw.driver_connection.copy_from_table(name, output=write, format="csv", header=True)
+    with open(partial, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(partial, path)
+    return int(status.split()[-1])
+
+async def archive_expired(conn, tier: Tier, this_month: date, dry_run: bool) -> None:
+    cutoff = add_months(this_month, -(tier.hot_months - 1))
+    for name in sorted(await _attached(conn, tier.table)):
+        month = partition_month(tier.table, name)
+        if month is None or month >= cutoff:
+            continue
+        print(f"{tier.table}: detaching {name}")
+        if not dry_run:
+            await conn.execute(text(f"ALTER TABLE {tier.table} DETACH PARTITION {name}"))
+
+    os.makedirs(PARTITION_ARCHIVE_DIR, exist_ok=True)
+    for name in sorted(await _detached(conn, tier.table)):
+        path = os.path.join(PARTITION_ARCHIVE_DIR, f"{name}.csv.gz")
+        print(f"{tier.table}: archiving {name} to {path}")
+        if dry_run:
+            continue
+        written = await _export(conn, name, path)
+        expected = (await conn.execute(text(f"SELECT count(*) FROM {name}"))).scalar_one()
+        if written != expected:
+            print(f"{tier.table}: {name} archive has {written} of {expected} rows, keeping the table")
+            continue
+        await conn.execute(text(f"DROP TABLE {name}"))
+
+    if tier.archive_months:
+        expiry = add_months(cutoff, -tier.archive_months)
+        for filename in sorted(os.listdir(PARTITION_ARCHIVE_DIR)):
+            month = partition_month(tier.table, filename)
+            if month is not None and month < expiry:
+                print(f"{tier.table}: deleting archive {filename}")
+                if not dry_run:
+                    os.remove(os.path.join(PARTITION_ARCHIVE_DIR, filename))
+
+async def run(dry_run: bool) -> None:
+    this_month = datetime.now(timezone.utc).date().replace(day=1)
+    try:
+        async with async_engine.connect() as conn:
+            # Every statement commits on its own, so locks are held only while it runs.
+            conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+            await conn.execute(text(f"SET lock_timeout = '{PARTITION_LOCK_TIMEOUT}'"))
+            for tier in TIERS:
+                await ensure_months(conn, tier.table, this_month, add_months(this_month, PARTITION_MONTHS_AHEAD), dry_run)
+                await archive_expired(conn, tier, this_month, dry_run)
+                stray = (await conn.execute(text(f"SELECT count(*) FROM {tier.table}_default"))).scalar_one()
+                if stray:
+                    print(f"{tier.table}: {stray} row(s) in {tier.table}_default (outside every attached month)")
+    finally:
+        await async_engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dry-run", action="store_true", help="Print what would be done")
+    args = parser.parse_args()
+    asyncio.run(run(args.dry_run))
+
+if __name__ == "__main__":
+    main()
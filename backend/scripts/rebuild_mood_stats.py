@@ -0,0 +1,37 @@
+"""Rebuild the mood_aggregates table from mood_logs.
+
+Run from the backend directory after deploying the aggregates migration, or
+whenever a user's timezone changes:
+
+    python -m scripts.rebuild_mood_stats             # every user
+    python -m scripts.rebuild_mood_stats --user-id 42
+"""
+import argparse
+import asyncio
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import User
+from app.services import mood_stats
+
+async def rebuild(user_ids: list) -> int:
+    async with AsyncSessionLocal() as db:
+        query = select(User.id, User.timezone).order_by(User.id)
+        if user_ids:
+            query = query.where(User.id.in_(user_ids))
+        users = (await db.execute(query)).all()
+        for user_id, tz_name in users:
+            await mood_stats.rebuild_user(db, user_id, tz_name)
+            # One transaction per user keeps row locks short on a live database.
+            await db.commit()
+    await async_engine.dispose()
+    return len(users)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user-id", type=int, action="append", dest="user_ids", help="Only rebuild this user (repeatable)")
+    args = parser.parse_args()
+    count = asyncio.run(rebuild(args.user_ids or []))
+    print(f"Rebuilt mood stats for {count} user(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Recompute community like, comment and member counts from their tables.
+
+Counter deltas are buffered in each API process (app.services.counters) and
+lost if a process dies before flushing. This rewrites only the rows whose
+stored count differs from the relation table. Run it while the API is
+stopped (e.g. after a crash, before restarting): deltas still buffered in a
+live process would be applied on top of the corrected value.
+
+    python -m scripts.reconcile_counters
+"""
+import argparse
+import asyncio
+from sqlalchemy import func, select, update
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models import CommunityGroup, CommunityPost, GroupMember, PostComment, PostLike
+
+# (label, model, counter column, relation table key column)
+COUNTS = (
+    ("likes", CommunityPost, CommunityPost.likes_count, PostLike.post_id),
+    ("comments", CommunityPost, CommunityPost.comment_count, PostComment.post_id),
+    ("members", CommunityGroup, CommunityGroup.member_count, GroupMember.group_id),
+)
+
+async def reconcile() -> dict:
+    fixed = {}
+    async with AsyncSessionLocal() as db:
+        for label, model, column, key in COUNTS:
+            actual = (
+                select(func.count())
+                .where(key == model.id)
+                .correlate(model)
+                .scalar_subquery()
+            )
+            result = await db.execute(
+                update(model)
+                .where(func.coalesce(column, -1) != actual)
+                .values({column.key: actual})
+                .execution_options(synchronize_session=False)
+            )
+            # One transaction per column keeps row locks short on a live database.
+            await db.commit()
+            fixed[label] = result.rowcount
+    await async_engine.dispose()
+    return fixed
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+    for label, rows in asyncio.run(reconcile()).items():
+        print(f"{label}: {rows} rows corrected")
+
+if __name__ == "__main__":
+    main()
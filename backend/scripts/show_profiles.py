@@ -0,0 +1,65 @@
+"""List or show request profiles from the on-disk ring buffer.
+
+    python -m scripts.show_profiles                 # newest captures
+    python -m scripts.show_profiles 0007 --limit 30 # SQL and call graph of slot 7
+    python -m scripts.show_profiles --request-id 3f2a...
+"""
+import argparse
+import json
+import os
+import pstats
+from app.core import profiling
+
+def _load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+def _list(paths: list) -> None:
+    print(f"{'slot':<6} {'started':<26} {'ms':>9} {'sql':>5} {'sql ms':>9} {'status':>6}  request")
+    for path in paths:
+        entry = _load(path)
+        print(
+            f"{entry['slot']:<6} {entry['started_at'][:26]:<26} {entry['duration_ms']:>9.1f} "
+            f"{entry['sql_count']:>5} {entry['sql_ms']:>9.1f} {entry['status']:>6}  "
+            f"{entry['method']} {entry['path']} ({entry['request_id']})"
+        )
+
+def _show(path: str, limit: int, sort: str) -> None:
+    entry = _load(path)
+    print(f"{entry['method']} {entry['path']} -> {entry['status']} in {entry['duration_ms']:.1f} ms")
+    print(f"request {entry['request_id']} at {entry['started_at']}")
+    print(f"\n{entry['sql_count']} SQL statements, {entry['sql_ms']:.1f} ms")
+    for query in entry["statements"]:
+        statement = " ".join(query["statement"].split())
+        print(f"  {query['duration_ms']:>9.3f} ms  {statement[:160]}")
+        print(f"  {'':>12}  {query['parameters']}")
+    if entry["sql_dropped"]:
+        print(f"  ... {entry['sql_dropped']} more not recorded")
+    print()
+    stats = pstats.Stats(os.path.join(os.path.dirname(path), entry["stats_file"]))
+    stats.sort_stats(sort).print_stats(limit)
+    stats.print_callees(limit)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("slot", nargs="?", help="Slot to show, e.g. 0007")
+    parser.add_argument("--request-id", help="Show the capture for this request ID")
+    parser.add_argument("--limit", type=int, default=25, help="Functions to print")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key")
+    parser.add_argument("--dir", default=profiling.PROFILE_DIR)
+    args = parser.parse_args()
+
+    ring = profiling.ProfileRing(args.dir, profiling.PROFILE_MAX_ENTRIES)
+    paths = ring.entries()
+    if args.request_id:
+        paths = [p for p in paths if _load(p)["request_id"] == args.request_id]
+        if not paths:
+            parser.error(f"no profile for request {args.request_id}")
+        _show(paths[0], args.limit, args.sort)
+    elif args.slot:
+        _show(os.path.join(args.dir, f"{int(args.slot):04d}.json"), args.limit, args.sort)
+    else:
+        _list(paths)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+from datetime import datetime
+import anyio
+from app.api.endpoints import chat
+from app.core import rate_limit
+from app.services import chat_context, prompts
+from conftest import USER, StubSession
+
+def test_cached_system_prompt_skips_the_database():
+    user = USER.model_copy(update={"updated_at": datetime(2025, 1, 1)})
+    compiled = prompts.chat_system_prompt({"goals": ["focus"]}, user.id, user.updated_at)
+    assert anyio.run(chat._system_prompt, StubSession(), user) == compiled
+
+def _refusing_chat(monkeypatch):
+    """Persist turns to an in-memory history and have the scheduler refuse the reply."""
+    history = []
+
+    async def save_user_message(db, user_id, message):
+        message_id = len(history) + 1
+        history.append((user_id, message_id, message))
+        context = chat_context.ConversationContext(
+            messages=[{"role": "user", "content": message}],
+            summary="",
+            token_count=0,
+            oldest_message_id=message_id,
+            has_unsummarized_overflow=False,
+        )
+        return message_id, context
+
+    async def discard_user_message(user_id, message_id):
+        history[:] = [turn for turn in history if turn[:2] != (user_id, message_id)]
+
+    async def system_prompt(db, user):
+        return prompts.get_template("chat").base
+
+    async def refuse(*args, **kwargs):
+        raise rate_limit.RateLimited(3, "llm")
+
+    async def refuse_stream(*args, **kwargs):
+        raise rate_limit.RateLimited(3, "llm")
+        yield
+
+    monkeypatch.setattr(chat, "_save_user_message_and_get_context", save_user_message)
+    monkeypatch.setattr(chat, "_discard_user_message", discard_user_message)
+    monkeypatch.setattr(chat, "_system_prompt", system_prompt)
+    monkeypatch.setattr(chat.ai, "get_chat_response_async", refuse)
+    monkeypatch.setattr(chat.ai, "stream_chat_response", refuse_stream)
+    return history
+
+def test_refused_reply_leaves_history_unchanged(client, monkeypatch):
+    history = _refusing_chat(monkeypatch)
+    response = client.post("/api/chat/", json={"message": "hello"})
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "3"
+    assert history == []
+
+def test_refused_stream_leaves_history_unchanged(client, monkeypatch):
+    history = _refusing_chat(monkeypatch)
+    response = client.post("/api/chat/stream", json={"message": "hello"})
+    assert "event: error" in response.text
+    assert history == []
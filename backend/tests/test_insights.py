@@ -0,0 +1,32 @@
+import asyncio
+import logging
+from app.services import insights
+
+def test_claim_failures_back_off_and_are_logged_once(monkeypatch, caplog):
+    attempts = []
+    delays = []
+
+    async def claim_job():
+        attempts.append(len(attempts) + 1)
+        if len(attempts) <= 3:
+            raise ConnectionError("database is down")
+        return None
+
+    async def purge_failed():
+        return 0
+
+    monkeypatch.setattr(insights, "claim_job", claim_job)
+    monkeypatch.setattr(insights, "purge_failed", purge_failed)
+    monkeypatch.setattr(insights, "backoff_seconds", lambda failures: delays.append(failures) or 0)
+
+    async def run():
+        pool = insights.WorkerPool(1, poll_interval=0)
+        pool.start()
+        while len(attempts) < 5:
+            await asyncio.sleep(0)
+        await pool.stop()
+
+    with caplog.at_level(logging.INFO, logger="neeva.insights"):
+        asyncio.run(run())
+    assert delays == [1, 2, 3]
+    assert [record.levelno for record in caplog.records] == [logging.WARNING, logging.INFO]
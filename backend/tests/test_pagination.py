@@ -0,0 +1,29 @@
+from datetime import datetime
+import pytest
+from fastapi import Response
+from app.api.pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, page
+
+LIST_ENDPOINTS = [
+    "/api/mood/",
+    "/api/chat/history",
+    "/api/exercises/history",
+    "/api/community/posts",
+    "/api/community/posts/1/comments",
+]
+
+@pytest.mark.parametrize("path", LIST_ENDPOINTS)
+@pytest.mark.parametrize("limit", [0, -1, MAX_PAGE_SIZE + 1])
+def test_out_of_range_limit_is_rejected(client, path, limit):
+    response = client.get(path, params={"limit": limit})
+    assert response.status_code == 422
+
+def test_page_trims_lookahead_row():
+    class Row:
+        def __init__(self, row_id):
+            self.id = row_id
+            self.created_at = datetime(2025, 1, 1)
+
+    response = Response()
+    rows = page([Row(3), Row(2), Row(1)], response, 2)
+    assert [row.id for row in rows] == [3, 2]
+    assert NEXT_CURSOR_HEADER in response.headers
@@ -0,0 +1,18 @@
+from datetime import datetime
+from app.services import prompts
+
+ONBOARDING = {"goals": ["sleep"], "communication_style": "direct"}
+
+def test_compiled_prompt_is_kept_per_stamp():
+    stamp = datetime(2025, 1, 1)
+    prompt = prompts.chat_system_prompt(ONBOARDING, 101, stamp)
+    assert "sleep" in prompt
+    assert prompts.cached_chat_system_prompt(101, stamp) == prompt
+    assert prompts.cached_chat_system_prompt(101, datetime(2025, 1, 2)) is None
+    assert prompts.cached_chat_system_prompt(102, stamp) is None
+
+def test_invalidate_user_drops_the_compiled_prompt():
+    prompts.chat_system_prompt(ONBOARDING, 103, None)
+    assert prompts.cached_chat_system_prompt(103, None) is not None
+    prompts.invalidate_user(103)
+    assert prompts.cached_chat_system_prompt(103, None) is None